@@ -7,7 +7,7 @@ from fastapi import Path
 from app.core import security
 from app.core.config import settings
 from app.db.database import get_db_session # Diganti dari database.py
-from app.crud import crud_user
+from app.crud import crud_user, crud_event
 from app.db.models.user_model import User as UserModel
 from app.schemas.token_schema import TokenPayload
 
@@ -37,10 +37,15 @@ async def get_current_user(
         print(f"Token 'sub' is not a valid integer: {token_payload.sub}")
         raise credentials_exception # Atau error spesifik lain
 
-    user = await crud_user.get_user_by_id(db, user_id=user_id)
+    # Snapshot user dari cache berumur pendek, tanpa query database di setiap request
+    token_version = token_payload.ver or 0
+    user = await crud_user.get_user_for_auth(db, user_id=user_id, token_version=token_version)
     if not user:
         print(f"User not found for id: {user_id} from token.")
         raise credentials_exception
+    if user.token_version != token_version:
+        # Token dibuat sebelum logout (token_version sudah dinaikkan)
+        raise credentials_exception
     return user
 
 async def get_current_active_user(
@@ -91,4 +96,34 @@ async def get_event_access_payload(
     if not payload or token_type != "event_access" or token_event_id != event_id:
         raise credentials_exception
     
-    return payload
\ No newline at end of file
+    return payload
+
+
+async def get_event_media_access(
+    event_id: int = Path(...),
+    db: AsyncSession = Depends(get_db_session),
+    token: str = Depends(reusable_oauth2)
+) -> int:
+    """
+    Dependensi untuk melindungi file foto event di /media/events/{event_id}/...
+    Akses diberikan jika token adalah Event Access Token yang valid untuk event ini,
+    atau access token biasa milik admin pemilik event.
+    """
+    event_payload = security.verify_jwt_token(token, settings.JWT_EVENT_SECRET_KEY)
+    if event_payload and event_payload.type == "event_access" and event_payload.event_id == event_id:
+        return event_id
+
+    # Access token biasa tidak memiliki klaim 'type'; token_version dicek seperti di get_current_user
+    user_payload = security.verify_jwt_token(token, settings.JWT_SECRET_KEY)
+    if user_payload and user_payload.type is None and user_payload.sub and user_payload.sub.isdigit():
+        token_version = user_payload.ver or 0
+        user = await crud_user.get_user_for_auth(db, user_id=int(user_payload.sub), token_version=token_version)
+        if user and user.token_version == token_version:
+            event = await crud_event.get_event_by_id(db, event_id=event_id)
+            if event and event.id_user == user.id:
+                return event_id
+
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="You do not have access to this event's media",
+    )
@@ -9,7 +9,7 @@ from app.crud import crud_activity
 from app.db.models import User as UserModel
 from app.schemas import event_schema
 # Kita akan butuh helper function yang sama dengan di event_router
-from app.api.routers.event_router import get_image_previews 
+from app.api.routers.event_router import attach_image_previews
 
 router = APIRouter()
 
@@ -25,7 +25,6 @@ async def get_my_recent_activities(
     events = await crud_activity.get_recent_accessed_events_for_user(db=db, user_id=current_user.id, limit=5)
     
     # Kita perlu membuat images_preview secara manual, sama seperti sebelumnya
-    for event in events:
-        event.images_preview = get_image_previews(event)
+    await attach_image_previews(db, events)
 
     return events
\ No newline at end of file
@@ -136,13 +136,18 @@ async def login_via_google(
 
     # Buat JWT internal
     # 'sub' untuk token internal sebaiknya adalah ID user di database Anda
-    internal_access_token = security.create_access_token(subject=user.id)
-    internal_refresh_token = security.create_refresh_token(subject=user.id)
+    internal_access_token = security.create_access_token(subject=user.id, token_version=user.token_version)
+    # Login baru selalu memulai family refresh token baru
+    refresh_token_family = security.new_refresh_token_family()
+    internal_refresh_token = security.create_refresh_token(subject=user.id, family=refresh_token_family)
 
-    # Simpan hash dari refresh token internal ke user
+    # Simpan digest HMAC dari refresh token internal ke user
     # Ini penting agar bisa di-revoke atau divalidasi
-    refresh_token_hash = security.get_password_hash(internal_refresh_token)
-    user = await crud_user.update_user(db, user=user, data_to_update={"internal_refresh_token_hash": refresh_token_hash})
+    refresh_token_hash = security.hash_refresh_token(internal_refresh_token)
+    user = await crud_user.update_user(db, user=user, data_to_update={
+        "internal_refresh_token_hash": refresh_token_hash,
+        "refresh_token_family": refresh_token_family,
+    })
     
     if not user: # Safety check setelah update terakhir
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update user with refresh token hash.")
@@ -168,12 +173,8 @@ async def refresh_access_token(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    if not token_payload or not token_payload.sub:
+    if not token_payload or not token_payload.sub or token_payload.type != "refresh":
         raise credentials_exception
-    
-    # Pastikan token ini adalah refresh token (jika Anda menambahkan klaim 'type' saat pembuatan)
-    # if token_payload.type != "refresh":
-    #     raise credentials_exception
 
     try:
         user_id = int(token_payload.sub)
@@ -183,22 +184,35 @@ async def refresh_access_token(
     user = await crud_user.get_user_by_id(db, user_id=user_id)
     if not user or not user.internal_refresh_token_hash:
         raise credentials_exception
-    
-    if not security.verify_password(refresh_token, user.internal_refresh_token_hash):
-        # Jika hash tidak cocok, mungkin token lama atau sudah dicabut/diganti
-        # Hapus hash token dari DB sebagai tindakan keamanan tambahan
-        await crud_user.update_user(db, user=user, data_to_update={"internal_refresh_token_hash": None})
+
+    stored_hash = user.internal_refresh_token_hash
+    if security.is_legacy_refresh_token_hash(stored_hash):
+        # Hash bcrypt lama: diverifikasi sekali di executor bcrypt, lalu langsung diganti digest HMAC di bawah
+        token_is_valid = await security.verify_password_async(refresh_token, stored_hash)
+    else:
+        token_is_valid = security.verify_refresh_token(refresh_token, stored_hash)
+
+    if not token_is_valid:
+        if token_payload.fam and token_payload.fam == user.refresh_token_family:
+            # Token lama dari family yang masih aktif dipakai lagi: kemungkinan token dicuri.
+            # Cabut seluruh family (dan access token yang sudah terbit).
+            await crud_user.revoke_refresh_token_family(db, user_id=user.id, family=token_payload.fam)
         raise credentials_exception
-        
-    new_access_token = security.create_access_token(subject=user.id)
-    
-    # Opsional: Implementasikan rolling refresh tokens (buat refresh token baru juga)
-    # new_refresh_token = security.create_refresh_token(subject=user.id)
-    # new_refresh_token_hash = security.get_password_hash(new_refresh_token)
-    # await crud_user.update_user(db, user=user, data_to_update={"internal_refresh_token_hash": new_refresh_token_hash})
-    # return token_schema.Token(access_token=new_access_token, refresh_token=new_refresh_token)
-    
-    return token_schema.Token(access_token=new_access_token, refresh_token=refresh_token) # Kembalikan refresh token lama jika tidak rolling
+
+    # Rolling refresh token: setiap refresh menerbitkan token baru di family yang sama
+    refresh_token_family = token_payload.fam or security.new_refresh_token_family()
+    new_refresh_token = security.create_refresh_token(subject=user.id, family=refresh_token_family)
+    rotated = await crud_user.rotate_refresh_token(
+        db, user_id=user.id, old_hash=stored_hash,
+        new_hash=security.hash_refresh_token(new_refresh_token), family=refresh_token_family
+    )
+    if not rotated:
+        # Token yang sama sudah dipakai oleh request lain lebih dulu
+        await crud_user.revoke_refresh_token_family(db, user_id=user.id, family=refresh_token_family)
+        raise credentials_exception
+
+    new_access_token = security.create_access_token(subject=user.id, token_version=user.token_version)
+    return token_schema.Token(access_token=new_access_token, refresh_token=new_refresh_token)
 
 @router.post("/logout", summary="Logout User")
 async def logout_user(
@@ -206,8 +220,9 @@ async def logout_user(
     current_user: UserModel = Depends(deps.get_current_active_user) # Memastikan user terautentikasi
 ):
     """
-    Logout pengguna dengan menghapus hash refresh token internal mereka.
+    Logout pengguna dengan menghapus hash refresh token internal mereka
+    dan menaikkan token_version, sehingga access token yang sudah terbit ikut tidak berlaku.
     Membutuhkan access token yang valid di header.
     """
-    await crud_user.update_user(db, user=current_user, data_to_update={"internal_refresh_token_hash": None})
+    await crud_user.revoke_user_tokens(db, user_id=current_user.id)
     return {"message": "Successfully logged out"}
\ No newline at end of file
@@ -1,14 +1,15 @@
 # app/api/routers/drive_search_router.py
 
 import re
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.api import deps
 from app.crud import crud_drive_search
 from app.db.models import User as UserModel, DriveSearch
 from app.schemas import drive_search_schema
-from app.services import drive_service
+from app.services import drive_service, drive_job_service
+from app.services.drive_scheduler import drive_scheduler
 
 router = APIRouter()
 
@@ -27,13 +28,13 @@ def _extract_folder_id(url: str) -> str:
 async def start_drive_search(
     *,
     request_data: drive_search_schema.DriveSearchRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(deps.get_db_session),
     current_user: UserModel = Depends(deps.get_current_active_user)
 ):
     """
     Memulai sesi pencarian wajah di sebuah folder Google Drive.
-    Proses akan berjalan di latar belakang.
+    Proses akan berjalan di latar belakang sebagai job yang tersimpan di database,
+    sehingga bisa dilanjutkan jika server restart.
     """
     if not current_user.selfie:
         raise HTTPException(status_code=400, detail="Please upload a selfie first.")
@@ -54,16 +55,12 @@ async def start_drive_search(
         user_id=current_user.id,
         folder_id=folder_id,
         original_url=str(request_data.drive_url),
-        drive_name=folder_name
+        drive_name=folder_name,
+        selfie_url=current_user.selfie
     )
 
-    # Jadwalkan tugas berat di latar belakang
-    background_tasks.add_task(
-        drive_service.run_drive_search_and_save,
-        search_id=new_search.id,
-        folder_id=folder_id,
-        user_selfie_url=current_user.selfie
-    )
+    # Jalankan tugas berat di latar belakang
+    drive_job_service.start_drive_search_job(new_search.id)
 
     return drive_search_schema.DriveSearchCreateResponse(
         search_id=new_search.id,
@@ -89,6 +86,16 @@ async def get_all_drive_searches(
     # Langsung kembalikan hasilnya.
     return all_searches
 
+@router.get("/admin/scheduler-metrics", summary="Get Drive Request Scheduler Metrics")
+async def get_drive_scheduler_metrics(
+    current_user: UserModel = Depends(deps.get_current_admin_user)
+):
+    """
+    Metrik penjadwal request Google Drive di proses (worker) ini: jumlah request,
+    retry, rate limit yang diterima, dan total waktu request tertahan (hanya untuk admin).
+    """
+    return drive_scheduler.metrics()
+
 @router.get("/{search_id}", response_model=drive_search_schema.DriveSearchResultResponse)
 async def get_search_results(
     search_id: int,
@@ -105,4 +112,34 @@ async def get_search_results(
     if search_session.id_user != current_user.id:
         raise HTTPException(status_code=403, detail="You do not have permission to view these results.")
 
-    return search_session
\ No newline at end of file
+    return search_session
+
+@router.post("/{search_id}/cancel", response_model=drive_search_schema.DriveSearchCreateResponse)
+async def cancel_search(
+    search_id: int,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """
+    Membatalkan sesi pencarian yang sedang berjalan.
+    Download & deteksi dihentikan secara kooperatif; hasil yang sudah ditemukan tetap disimpan.
+    """
+    search_session = await db.get(DriveSearch, search_id)
+
+    if not search_session:
+        raise HTTPException(status_code=404, detail="Search session not found.")
+    if search_session.id_user != current_user.id:
+        raise HTTPException(status_code=403, detail="You do not have permission to cancel this search.")
+
+    if not await crud_drive_search.cancel_drive_search(db, search_id=search_id):
+        raise HTTPException(status_code=409, detail=f"Search session is already {search_session.status}.")
+
+    # Hentikan worker jika pencarian berjalan di proses ini; proses lain
+    # akan melihat status 'cancelled' saat menyimpan progres berikutnya
+    drive_service.request_cancel(search_id)
+
+    return drive_search_schema.DriveSearchCreateResponse(
+        search_id=search_id,
+        status="cancelled",
+        message="Search has been cancelled."
+    )
\ No newline at end of file
@@ -1,38 +1,73 @@
 # app/api/routers/event_router.py
 
-import os
-import cv2
 import uuid
-import math
-import shutil
-import aiofiles
 import secrets
 from typing import Optional, List
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, BackgroundTasks
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, UploadFile, File, BackgroundTasks
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.crud import crud_event, crud_image, crud_activity
+from app.crud import crud_event, crud_image, crud_file_deletion
 from app.core import security
 from app.core.config import settings
-from app.core.model_loader import face_app
 from app.db.models import User as UserModel, Event as EventModel
 from app.schemas import event_schema, pagination_schema, image_schema, token_schema
-from app.services import face_recognition_service
-
-os.makedirs(settings.EVENT_STORAGE_PATH, exist_ok=True)
+from app.services import face_recognition_service, zip_stream_service, exif_service, activity_service, event_access_service
+from app.services.storage_service import get_storage, public_url_for_key, key_from_public_url
 
 router = APIRouter()
 
+# Ukuran potongan saat men-stream file upload ke storage
+UPLOAD_CHUNK_SIZE = 1024 * 1024 # 1 MB
+# Jumlah byte awal file yang disimpan untuk dibaca EXIF-nya (header EXIF JPEG maksimal 64 KB)
+EXIF_HEADER_BYTES = 256 * 1024
+
 # --- Helper Function untuk Logika Berulang ---
-def get_image_previews(event: EventModel, limit: int = 4) -> List[str]:
-    """Membuat daftar URL preview gambar dari sebuah event."""
-    preview_urls = [image.url for image in event.images[:limit]]
+async def attach_image_previews(db: AsyncSession, events: List[EventModel], limit: int = 4) -> None:
+    """
+    Mengisi images_preview untuk sekumpulan event dengan satu query preview,
+    tanpa eager-load seluruh gambar event.
+    """
+    previews = await crud_image.get_event_image_previews(db, event_ids=[event.id for event in events], limit=limit)
     placeholder_url = f"{settings.API_BASE_URL}/media/events/no_image.png"
-    while len(preview_urls) < limit:
-        preview_urls.append(placeholder_url)
-    return preview_urls
+    for event in events:
+        preview_urls = previews.get(event.id, [])
+        event.images_preview = preview_urls + [placeholder_url] * (limit - len(preview_urls))
+
+async def _get_event_images_page(
+    db: AsyncSession,
+    *,
+    event_id: int,
+    cursor: Optional[str],
+    limit: int,
+    sort_by: image_schema.ImageSortBy,
+    sort_order: image_schema.SortOrder,
+    taken_from: Optional[datetime],
+    taken_to: Optional[datetime],
+    include_total: bool,
+) -> pagination_schema.CursorPage[image_schema.ImagePublic]:
+    """Mengambil satu halaman galeri event dengan cursor, total hanya dihitung jika diminta."""
+    try:
+        items, next_cursor = await crud_image.get_images_by_event_cursor(
+            db=db,
+            event_id=event_id,
+            cursor=cursor, limit=limit, sort_by=sort_by.value, sort_order=sort_order.value,
+            taken_from=taken_from, taken_to=taken_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    total_items = None
+    if include_total:
+        total_items = await crud_image.count_images_in_event(
+            db, event_id=event_id, taken_from=taken_from, taken_to=taken_to
+        )
+
+    return pagination_schema.CursorPage(
+        limit=limit, next_cursor=next_cursor, total_items=total_items, items=items
+    )
 
 # --- Endpoint Definitions ---
 
@@ -61,13 +96,10 @@ async def create_event(
     
     # Generate link unik setelah event dibuat dan memiliki ID
     shareable_link = f"{settings.API_BASE_URL}/r/{share_code}"
-    event_updated = await crud_event.update_event(db, event_db_obj=event, event_in=event_schema.EventUpdate(link=shareable_link, share_code=share_code))
+    await crud_event.update_event(db, event_db_obj=event, event_in=event_schema.EventUpdate(link=shareable_link, share_code=share_code))
     
-    # Langsung buat folder event di storage
-    # event_folder_path = os.path.join(settings.EVENT_STORAGE_PATH, str(event_updated.id))
-    event_folder_path = f"{settings.EVENT_STORAGE_PATH}/{event_updated.id}"
-    os.makedirs(event_folder_path, exist_ok=True)
-    print(f"Created storage directory for event {event_updated.id} at {event_folder_path}")
+    # Folder event di storage tidak perlu dibuat di sini,
+    # backend storage akan membuatnya otomatis saat foto pertama diunggah.
     
     # Karena event baru belum punya gambar, kita buat preview placeholder secara manual
     placeholder_url = f"{settings.API_BASE_URL}/media/events/no_image.png"
@@ -91,21 +123,26 @@ async def create_event(
 
     return response_data
 
-@router.get("/search", response_model=List[event_schema.EventPublicDetail], summary="Search for Events")
+@router.get("/search", response_model=pagination_schema.CursorPage[event_schema.EventPublicDetail], summary="Search for Events")
 async def search_for_events(
     *,
     db: AsyncSession = Depends(deps.get_db_session),
-    q: str = Query(..., min_length=3, description="Search query for event name"),
+    q: str = Query(..., min_length=3, max_length=100, description="Search query for event name"),
+    cursor: Optional[str] = Query(None, description="Cursor dari next_cursor halaman sebelumnya"),
+    limit: int = Query(20, gt=0, le=50, description="Jumlah hasil per halaman (max: 50)"),
     # Endpoint ini bisa diakses semua user yang login, jadi kita pakai get_current_active_user
     current_user: UserModel = Depends(deps.get_current_active_user)
 ):
     """
-    Mencari event berdasarkan nama.
+    Mencari event berdasarkan nama (cocok sebagian maupun mirip/typo),
+    diurutkan dari yang paling relevan.
     """
-    events = await crud_event.search_events_by_name(db=db, query=q)
-    for event in events:
-        event.images_preview = get_image_previews(event)
-    return events
+    try:
+        events, next_cursor = await crud_event.search_events_by_name(db=db, query=q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await attach_image_previews(db, events)
+    return pagination_schema.CursorPage(limit=limit, next_cursor=next_cursor, items=events)
 
 @router.get("/my-events", response_model=List[event_schema.EventPublicDetail], summary="Get Events Created by Me")
 async def get_my_created_events(
@@ -116,8 +153,7 @@ async def get_my_created_events(
     Mengambil daftar semua event yang telah dibuat oleh admin yang sedang login.
     """
     events = await crud_event.get_events_by_owner(db=db, owner_id=admin_user.id)
-    for event in events:
-        event.images_preview = get_image_previews(event)
+    await attach_image_previews(db, events)
     return events
 
 @router.get("/{event_id}", response_model=event_schema.EventPublicDetail, summary="Get a Specific Event")
@@ -133,7 +169,7 @@ async def get_event_details(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    event.images_preview = get_image_previews(event)
+    await attach_image_previews(db, [event])
     return event
 
 @router.put("/{event_id}", response_model=event_schema.EventPublicDetail, summary="Update an Event")
@@ -155,7 +191,10 @@ async def update_an_event(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
     
     updated_event = await crud_event.update_event(db=db, event_db_obj=event, event_in=event_in)
-    updated_event.images_preview = get_image_previews(updated_event)
+    if event_in.password:
+        # Bersih-bersih unlock lama; entri basi memang tidak bisa cocok lagi karena hashed_password berubah
+        event_access_service.invalidate_event_unlocks(event.id)
+    await attach_image_previews(db, [updated_event])
     return updated_event
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete an Event")
@@ -168,6 +207,7 @@ async def delete_an_event(
     Menghapus sebuah event. Aksi ini akan menghapus event dan semua relasinya
     (termasuk foto di dalamnya, jika cascade di-setting dengan benar).
     Hanya bisa dilakukan oleh admin pemilik event.
+    File di storage dihapus oleh sweeper di latar belakang, sehingga request ini selesai seketika.
     """
     
     # Verifikasi kepemilikan user
@@ -177,43 +217,40 @@ async def delete_an_event(
     if event.id_user != admin_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
     
-    # Tentukan path folder yang akan dihapus secara absolut
-    event_folder_path = f"{settings.EVENT_STORAGE_PATH}/{event_id}"
-    
-    # Hapus folder dan isinya dari disk secara asinkron (di thread terpisah)
-    if os.path.exists(event_folder_path):
-        try:
-            # shutil.rmtree adalah operasi blocking, jalankan di thread pool
-            await run_in_threadpool(shutil.rmtree, event_folder_path)
-            print(f"Successfully deleted event folder: {event_folder_path}")
-        except Exception as e:
-            print(f"Failed to delete event folder {event_folder_path}. Error: {e}", exc_info=True)
-            # Jika gagal menghapus file, sebaiknya jangan lanjutkan ke penghapusan DB
-            # agar data tetap konsisten dan bisa diperbaiki manual.
-            raise HTTPException(status_code=500, detail="Failed to delete event assets from disk.")
-            
-    # 4. Jika file fisik berhasil dihapus (atau memang tidak ada), baru hapus record dari database
+    # Masukkan folder event ke antrean penghapusan file.
+    # Antrean ikut ter-commit dalam transaksi yang sama dengan penghapusan record event,
+    # jadi tidak ada file yang "terlupakan" meskipun proses mati di tengah jalan.
+    crud_file_deletion.enqueue_file_deletions(db, prefixes=[f"events/{event_id}/"])
     await crud_event.delete_event(db=db, event_to_delete=event)
 
 @router.post("/{event_id}/access", response_model=event_schema.EventAccessToken, summary="Get Event Access Token")
 async def get_event_access_token(
     event_id: int,
     request_data: event_schema.EventAccessRequest,
+    request: Request,
     db: AsyncSession = Depends(deps.get_db_session),
     current_user: UserModel = Depends(deps.get_current_active_user)
 ):
     """
     Memverifikasi password event.
     Jika berhasil, kembalikan sebuah Event Access Token (EAT) yang berumur pendek.
+    Terlalu banyak password salah dari IP/user yang sama akan ditolak dengan 429.
     """
+    client_ip = request.client.host if request.client else None
+    event_access_service.check_unlock_allowed(client_ip=client_ip, user_id=current_user.id)
+
     event = await crud_event.get_event_by_id(db, event_id=event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    if not security.verify_password(request_data.password, event.hashed_password):
+    if not await event_access_service.verify_event_password(
+        event_id=event.id, hashed_password=event.hashed_password, password=request_data.password
+    ):
+        event_access_service.record_failed_unlock(client_ip=client_ip, user_id=current_user.id)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
 
-    await crud_activity.log_user_activity(db=db, user_id=current_user.id, event_id=event.id)
+    # Dicatat di latar belakang (upsert per batch), respons tidak menunggu database
+    activity_service.record_event_access(user_id=current_user.id, event_id=event.id)
 
     # Buat Event Access Token (EAT) yang berlaku 2 jam
     expires_delta = timedelta(hours=2)
@@ -228,23 +265,27 @@ async def get_event_access_token(
     
     return event_schema.EventAccessToken(event_access_token=eat)
 
-@router.get("/{event_id}/my-event-images", response_model=pagination_schema.PaginatedResponse[image_schema.ImagePublic], summary="Get Images in an Event with Pagination")
+@router.get("/{event_id}/my-event-images", response_model=pagination_schema.CursorPage[image_schema.ImagePublic], summary="Get Images in an Event with Pagination")
 async def get_images_in_event(
     event_id: int,
     db: AsyncSession = Depends(deps.get_db_session),
     # Parameter query dengan validasi dan nilai default
-    page: int = Query(1, gt=0, description="Halaman yang diminta"),
+    cursor: Optional[str] = Query(None, description="Cursor dari next_cursor halaman sebelumnya"),
     limit: int = Query(10, gt=0, le=50, description="Jumlah item per halaman (max: 50)"),
     sort_by: image_schema.ImageSortBy = Query(image_schema.ImageSortBy.created_at, description="Field untuk sorting"),
     sort_order: image_schema.SortOrder = Query(image_schema.SortOrder.desc, description="Urutan sorting"),
+    taken_from: Optional[datetime] = Query(None, description="Hanya foto yang diambil sejak waktu ini (EXIF)"),
+    taken_to: Optional[datetime] = Query(None, description="Hanya foto yang diambil sampai waktu ini (EXIF)"),
+    include_total: bool = Query(False, description="Sertakan jumlah total item (di-cache sebentar)"),
     admin_user: UserModel = Depends(deps.get_current_admin_user)
 ):
     """
     [ WAJIB menggunakan Event Access Token (EAT) yang didapat dari endpoint /access! ]
     
     Mengambil daftar gambar dari sebuah event dengan fitur lengkap:
-    - **Pagination**: `page` dan `limit`
-    - **Sorting**: `sort_by` (`created_at`, `file_name`) dan `sort_order` (`asc`, `desc`)
+    - **Pagination**: `cursor` (ambil dari `next_cursor` respons sebelumnya) dan `limit`
+    - **Sorting**: `sort_by` (`created_at`, `taken_at`, `file_name`) dan `sort_order` (`asc`, `desc`)
+    - **Filter waktu pengambilan**: `taken_from` dan `taken_to` (berdasarkan EXIF)
     - **Searching**: `search` (berdasarkan nama file)
     
     Endpoint ini bisa digunakan untuk mengimplementasikan "infinite scroll" di Flutter.
@@ -258,34 +299,31 @@ async def get_images_in_event(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
 
     # Panggil fungsi CRUD yang canggih
-    items, total_items = await crud_image.get_images_by_event_paginated(
-        db=db,
-        event_id=event_id,
-        page=page, limit=limit, sort_by="created_at", sort_order="desc"
-    )
-    
-    total_pages = math.ceil(total_items / limit)
-
-    return pagination_schema.PaginatedResponse(
-        total_items=total_items, total_pages=total_pages, current_page=page, limit=limit, items=items
+    return await _get_event_images_page(
+        db, event_id=event_id, cursor=cursor, limit=limit, sort_by=sort_by, sort_order=sort_order,
+        taken_from=taken_from, taken_to=taken_to, include_total=include_total
     )
     
-@router.get("/{event_id}/images", response_model=pagination_schema.PaginatedResponse[image_schema.ImagePublic], summary="Get Images in an Event with Pagination")
+@router.get("/{event_id}/images", response_model=pagination_schema.CursorPage[image_schema.ImagePublic], summary="Get Images in an Event with Pagination")
 async def get_images_in_event(
     db: AsyncSession = Depends(deps.get_db_session),
     # Parameter query dengan validasi dan nilai default
-    page: int = Query(1, gt=0, description="Halaman yang diminta"),
+    cursor: Optional[str] = Query(None, description="Cursor dari next_cursor halaman sebelumnya"),
     limit: int = Query(10, gt=0, le=50, description="Jumlah item per halaman (max: 50)"),
     sort_by: image_schema.ImageSortBy = Query(image_schema.ImageSortBy.created_at, description="Field untuk sorting"),
     sort_order: image_schema.SortOrder = Query(image_schema.SortOrder.desc, description="Urutan sorting"),
+    taken_from: Optional[datetime] = Query(None, description="Hanya foto yang diambil sejak waktu ini (EXIF)"),
+    taken_to: Optional[datetime] = Query(None, description="Hanya foto yang diambil sampai waktu ini (EXIF)"),
+    include_total: bool = Query(False, description="Sertakan jumlah total item (di-cache sebentar)"),
     event_payload: token_schema.TokenPayload = Depends(deps.get_event_access_payload)
 ):
     """
     [ WAJIB menggunakan Event Access Token (EAT) yang didapat dari endpoint /access! ]
     
     Mengambil daftar gambar dari sebuah event dengan fitur lengkap:
-    - **Pagination**: `page` dan `limit`
-    - **Sorting**: `sort_by` (`created_at`, `file_name`) dan `sort_order` (`asc`, `desc`)
+    - **Pagination**: `cursor` (ambil dari `next_cursor` respons sebelumnya) dan `limit`
+    - **Sorting**: `sort_by` (`created_at`, `taken_at`, `file_name`) dan `sort_order` (`asc`, `desc`)
+    - **Filter waktu pengambilan**: `taken_from` dan `taken_to` (berdasarkan EXIF)
     - **Searching**: `search` (berdasarkan nama file)
     
     Endpoint ini bisa digunakan untuk mengimplementasikan "infinite scroll" di Flutter.
@@ -303,16 +341,9 @@ async def get_images_in_event(
     # DONE
 
     # Panggil fungsi CRUD yang canggih
-    items, total_items = await crud_image.get_images_by_event_paginated(
-        db=db,
-        event_id=event_id,
-        page=page, limit=limit, sort_by="created_at", sort_order="desc"
-    )
-    
-    total_pages = math.ceil(total_items / limit)
-
-    return pagination_schema.PaginatedResponse(
-        total_items=total_items, total_pages=total_pages, current_page=page, limit=limit, items=items
+    return await _get_event_images_page(
+        db, event_id=event_id, cursor=cursor, limit=limit, sort_by=sort_by, sort_order=sort_order,
+        taken_from=taken_from, taken_to=taken_to, include_total=include_total
     )
     
 @router.post("/{event_id}/images", response_model=List[image_schema.ImagePublic], status_code=status.HTTP_201_CREATED, summary="Upload Images to a Specific Event")
@@ -334,8 +365,7 @@ async def upload_images_to_event(
     if event.id_user != admin_user.id:
         raise HTTPException(status_code=403, detail="You do not own this event.")
 
-    event_photo_path = f"{settings.EVENT_STORAGE_PATH}/{event.id}"
-    os.makedirs(event_photo_path, exist_ok=True)
+    storage = get_storage()
     
     created_images = []
     for file in files:
@@ -343,38 +373,44 @@ async def upload_images_to_event(
             continue
 
         unique_filename = f"{uuid.uuid4()}.{file.filename.split('.')[-1]}"
-        file_path_on_disk = f"{event_photo_path}/{unique_filename}"
+        storage_key = f"events/{event.id}/{unique_filename}"
         
+        # Stream file ke storage per potongan, sambil menyimpan bagian awal file untuk EXIF
+        header_bytes = bytearray()
+        async def _iter_upload(upload: UploadFile = file):
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                if len(header_bytes) < EXIF_HEADER_BYTES:
+                    header_bytes.extend(chunk[:EXIF_HEADER_BYTES - len(header_bytes)])
+                yield chunk
+
         try:
-            async with aiofiles.open(file_path_on_disk, 'wb') as out_file:
-                content = await file.read()
-                await out_file.write(content)
+            file_size = await storage.save_stream(storage_key, _iter_upload(), content_type=file.content_type)
         except Exception as e:
             print(f"Failed to save uploaded file {file.filename}: {e}")
             continue
 
-        public_url = f"{settings.API_BASE_URL}/media/events/{event.id}/{unique_filename}"
+        # Ekstrak metadata EXIF sekali saja di sini, agar galeri tidak perlu membaca file lagi
+        metadata = await run_in_threadpool(exif_service.extract_image_metadata, bytes(header_bytes))
+
+        public_url = public_url_for_key(storage_key)
         
         db_image = await crud_image.create_event_image(
-            db=db, file_name=unique_filename, url=public_url, event_id=event.id
+            db=db, file_name=unique_filename, url=public_url, event_id=event.id,
+            file_size=file_size, metadata=metadata
         )
         created_images.append(db_image)
 
     if not created_images:
         raise HTTPException(status_code=400, detail="No valid image files were uploaded.")
+    crud_image.invalidate_image_count_cache(event.id)
 
     print(f"{len(created_images)} files uploaded to event {event_id}.")
     return created_images
 
-@router.get("/{event_id}/find-my-face", response_model=List[image_schema.MatchedImageResult], summary="Find My Photos in an Event")
-async def find_my_face_in_event(
-    event_id: int,
-    db: AsyncSession = Depends(deps.get_db_session),
-    current_user: UserModel = Depends(deps.get_current_active_user)
-):  
+async def _find_my_face_matches(db: AsyncSession, *, event_id: int, current_user: UserModel) -> List[dict]:
     """
-    Memulai proses pencarian wajah pengguna di semua foto dalam sebuah event.
-    Membutuhkan pengguna untuk sudah mengunggah foto selfie.
+    Logika inti pencarian wajah pengguna di sebuah event.
+    Dipakai bersama oleh endpoint hasil JSON dan endpoint unduhan ZIP.
     """
     # 1. Pastikan pengguna punya foto selfie referensi
     if not current_user.selfie:
@@ -389,44 +425,39 @@ async def find_my_face_in_event(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found.")
     
     # 3. Dapatkan Vektor dari foto selfie
-    selfie_path = face_recognition_service.convert_public_url_to_local_path(current_user.selfie)
     try:
-        img_selfie = cv2.imread(selfie_path)
-        if img_selfie is None: raise ValueError("Selfie file not readable")
-        
-        # Jalankan di thread terpisah
-        faces = await run_in_threadpool(face_app.app.get, img_selfie)
-        if not faces: raise ValueError("No face found in selfie")
-        
-        # Gunakan normed_embedding untuk perbandingan cosine similarity
-        target_embedding = faces[0].normed_embedding
-
+        target_embedding = await face_recognition_service.get_selfie_embedding(current_user.selfie)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not process selfie: {e}")
 
-    # 2. Panggil service pencarian berbasis folder
-    event_folder_path = f"{settings.EVENT_STORAGE_PATH}/{event_id}"
+    # 2. Panggil service pencarian berbasis folder di storage
+    face_counts = {}
     raw_matches = await face_recognition_service.find_similar_faces_in_folder_blocking(
         target_embedding=target_embedding,
-        event_storage_path=event_folder_path,
-        threshold=0.5 # Ambang batas kemiripan, bisa diatur
+        storage_prefix=f"events/{event_id}/",
+        threshold=0.5, # Ambang batas kemiripan, bisa diatur
+        face_counts=face_counts
     )
+
+    # Hasil deteksi sekalian dipakai untuk mengisi counter wajah/indexing event
+    if event.indexed_photo_count < event.photo_count:
+        await crud_image.record_image_face_counts(
+            db, event_id=event_id,
+            face_counts={public_url_for_key(key): count for key, count in face_counts.items()}
+        )
     
     if not raw_matches:
         return []
 
     # 3. Ambil metadata gambar dari DB (sama seperti sebelumnya)
-    matched_urls = [
-        path.replace(str(settings.STORAGE_ROOT_PATH), f"{settings.API_BASE_URL}/media", 1) 
-        for path in [match["disk_path"] for match in raw_matches]
-    ]
+    matched_urls = [public_url_for_key(match["key"]) for match in raw_matches]
     image_objects = await crud_image.get_images_by_urls(db, urls=matched_urls)
     image_map = {image.url: image for image in image_objects}
     
     # 4. Gabungkan data untuk respons akhir (sama seperti sebelumnya)
     final_results = []
     for match in raw_matches:
-        public_url = match["disk_path"].replace(str(settings.STORAGE_ROOT_PATH), f"{settings.API_BASE_URL}/media", 1)
+        public_url = public_url_for_key(match["key"])
         image_obj = image_map.get(public_url)
         if image_obj:
             result_item = {
@@ -434,10 +465,55 @@ async def find_my_face_in_event(
                 "file_name": image_obj.file_name,
                 "url": image_obj.url,
                 "id_event": image_obj.id_event,
+                "taken_at": image_obj.taken_at,
+                "orientation": image_obj.orientation,
+                "width": image_obj.width,
+                "height": image_obj.height,
+                "camera_make": image_obj.camera_make,
+                "camera_model": image_obj.camera_model,
                 "created_at": image_obj.created_at,
                 "updated_at": image_obj.updated_at,
                 "face": match["face_coords"]
             }
             final_results.append(result_item)
             
-    return final_results
\ No newline at end of file
+    return final_results
+
+@router.get("/{event_id}/find-my-face", response_model=List[image_schema.MatchedImageResult], summary="Find My Photos in an Event")
+async def find_my_face_in_event(
+    event_id: int,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):  
+    """
+    Memulai proses pencarian wajah pengguna di semua foto dalam sebuah event.
+    Membutuhkan pengguna untuk sudah mengunggah foto selfie.
+    """
+    return await _find_my_face_matches(db, event_id=event_id, current_user=current_user)
+
+@router.get("/{event_id}/find-my-face/download", summary="Download My Photos in an Event as ZIP")
+async def download_my_face_matches(
+    event_id: int,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """
+    Menjalankan pencarian wajah yang sama dengan `/find-my-face`, lalu mengirim
+    semua foto yang cocok sebagai satu file ZIP yang di-stream.
+    Arsip dibangun on-the-fly tanpa kompresi, sehingga server tidak pernah
+    menyimpan arsip utuh di memori maupun di disk.
+    """
+    matches = await _find_my_face_matches(db, event_id=event_id, current_user=current_user)
+    if not matches:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No matching photos found to download.")
+
+    entries = [
+        (key_from_public_url(match["url"]), zip_stream_service.safe_archive_name(match["file_name"]))
+        for match in matches
+    ]
+    archive_name = f"fotota-event-{event_id}.zip"
+    return StreamingResponse(
+        zip_stream_service.stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{archive_name}"'}
+    )
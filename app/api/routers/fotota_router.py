@@ -2,6 +2,7 @@
 
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from collections import defaultdict
 
@@ -9,6 +10,8 @@ from app.api import deps
 from app.crud import crud_fotota, crud_image
 from app.db.models import User as UserModel, Image as ImageModel
 from app.schemas import fotota_schema
+from app.services import zip_stream_service
+from app.services.storage_service import key_from_public_url
 
 router = APIRouter()
 
@@ -24,17 +27,11 @@ async def bookmark_photos_in_bulk(
     Menambahkan satu atau lebih foto ke koleksi "Fotota" milik pengguna.
     Kirimkan sebuah JSON dengan key "image_ids" yang berisi array of integer.
     """
-    # TODO: Validasi apakah semua image_ids ada di database
-    
-    new_bookmarks = await crud_fotota.bulk_create_bookmarks(
+    # ID gambar yang tidak ada atau sudah di-bookmark otomatis dilewati.
+    # Data gambar ikut dikembalikan oleh query yang sama, tanpa refresh per bookmark.
+    return await crud_fotota.bulk_create_bookmarks(
         db, user_id=current_user.id, image_ids=bookmarks_in.image_ids
     )
-    
-    # Eager load relasi image untuk setiap bookmark baru sebelum dikembalikan
-    for bm in new_bookmarks:
-        await db.refresh(bm, attribute_names=["image"])
-        
-    return new_bookmarks
 
 @router.get("", response_model=List[fotota_schema.BookmarkedEventGroup], summary="Get My Bookmarked Photos (Grouped by Event)")
 async def get_my_bookmarked_photos(
@@ -61,6 +58,33 @@ async def get_my_bookmarked_photos(
         
     return list(events_dict.values())
 
+@router.get("/download", summary="Download My Bookmarked Photos as ZIP")
+async def download_my_bookmarked_photos(
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """
+    Mengunduh seluruh koleksi "Fotota" milik pengguna sebagai satu file ZIP.
+    Foto dikelompokkan ke dalam folder per event. Arsip di-stream per potongan,
+    sehingga ukuran unduhan tidak memengaruhi pemakaian memori server.
+    """
+    all_bookmarks = await crud_fotota.get_all_bookmarked_by_user(db, user_id=current_user.id)
+    if not all_bookmarks:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="You have no bookmarked photos to download.")
+
+    entries = []
+    for bookmark in all_bookmarks:
+        image = bookmark.image
+        folder_name = zip_stream_service.safe_archive_name(f"{image.event.name} ({image.event.id})")
+        file_name = zip_stream_service.safe_archive_name(image.file_name)
+        entries.append((key_from_public_url(image.url), f"{folder_name}/{file_name}"))
+
+    return StreamingResponse(
+        zip_stream_service.stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="fotota-bookmarks.zip"'}
+    )
+
 @router.delete("", status_code=status.HTTP_200_OK, summary="Remove One or More Bookmarks")
 async def remove_bookmarks_in_bulk(
     *,
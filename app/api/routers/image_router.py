@@ -1,12 +1,11 @@
 # app/api/routers/image_router.py
 
-import os
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.core.config import settings
 from app.db.models import User as UserModel, Image as ImageModel
-from app.crud import crud_image
+from app.crud import crud_image, crud_file_deletion
+from app.services.storage_service import key_from_public_url
 
 router = APIRouter()
 
@@ -17,7 +16,7 @@ async def delete_an_image(
     admin_user: UserModel = Depends(deps.get_current_admin_user)
 ):
     """
-    Menghapus sebuah gambar dari event dan dari storage.
+    Menghapus sebuah gambar dari event dan dari storage (file dihapus di latar belakang).
     Hanya bisa dilakukan oleh admin pemilik event dari gambar tersebut.
     """
     # Kita tetap pakai eager loading untuk verifikasi kepemilikan
@@ -28,13 +27,12 @@ async def delete_an_image(
     if image.event.id_user != admin_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not own this event's images.")
         
-    # Hapus file dari disk
-    relative_path = image.url.replace(f"{settings.API_BASE_URL}/", "").replace("media/", "storage/", 1)
-    if os.path.exists(relative_path):
-        os.remove(relative_path)
+    # File dimasukkan ke antrean penghapusan dan dihapus oleh sweeper di latar belakang
+    crud_file_deletion.enqueue_file_deletions(db, keys=[key_from_public_url(image.url)])
     
-    # Hapus record dari database
-    await db.delete(image)
+    # Hapus record dari database (bersama antrean di atas dalam satu commit)
+    await crud_image.remove_event_image(db, image=image)
     await db.commit()
+    crud_image.invalidate_image_count_cache(image.id_event)
     
     return None
\ No newline at end of file
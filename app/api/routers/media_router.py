@@ -0,0 +1,54 @@
+# app/api/routers/media_router.py
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.db.models import User as UserModel, DriveSearch
+from app.services import media_service
+
+router = APIRouter()
+
+@router.api_route("/events/no_image.png", methods=["GET", "HEAD"], summary="Get Placeholder Image")
+async def get_placeholder_image(request: Request):
+    """Gambar placeholder untuk preview event yang belum memiliki foto. Bersifat publik."""
+    return media_service.build_media_response(request, "events/no_image.png")
+
+@router.api_route("/events/{event_id}/{file_name}", methods=["GET", "HEAD"], summary="Get Event Photo")
+async def get_event_photo(
+    event_id: int,
+    file_name: str,
+    request: Request,
+    _: int = Depends(deps.get_event_media_access)
+):
+    """
+    Menyajikan foto event. Membutuhkan Event Access Token (EAT) untuk event ini,
+    atau access token milik admin pemilik event.
+    """
+    return media_service.build_media_response(request, f"events/{event_id}/{file_name}")
+
+@router.api_route("/selfies/{file_name}", methods=["GET", "HEAD"], summary="Get My Selfie")
+async def get_selfie(
+    file_name: str,
+    request: Request,
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """Menyajikan foto selfie. Hanya bisa diakses oleh pemilik selfie tersebut."""
+    # Nama file selfie selalu diawali dengan 'user_{id}_' (lihat user_router)
+    if not file_name.startswith(f"user_{current_user.id}_"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have access to this file.")
+    return media_service.build_media_response(request, f"selfies/{file_name}")
+
+@router.api_route("/drive-events/{search_id}/{file_name}", methods=["GET", "HEAD"], summary="Get Drive Search Result Photo")
+async def get_drive_search_photo(
+    search_id: int,
+    file_name: str,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: UserModel = Depends(deps.get_current_active_user)
+):
+    """Menyajikan foto hasil pencarian Google Drive. Hanya untuk pemilik sesi pencarian."""
+    search_session = await db.get(DriveSearch, search_id)
+    if not search_session or search_session.id_user != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have access to this file.")
+    return media_service.build_media_response(request, f"drive-events/{search_id}/{file_name}")
@@ -1,21 +1,14 @@
 # app/api/routers/user_router.py
 
-import os
 import uuid
-import aiofiles
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.db.models.user_model import User as UserModel
 from app.schemas import user_schema
-from app.crud import crud_user
-from app.core.config import settings
-
-# Tentukan path di mana Anda ingin menyimpan foto selfie di VM Anda
-# Pastikan direktori ini ada dan FastAPI memiliki izin untuk menulis di sana.
-# Contoh: /var/www/fotota/storage/selfies
-os.makedirs(settings.SELFIE_STORAGE_PATH, exist_ok=True) # Buat direktori jika belum ada
+from app.crud import crud_user, crud_file_deletion
+from app.services.storage_service import get_storage, public_url_for_key, key_from_public_url
 
 router = APIRouter()
 
@@ -46,33 +39,34 @@ async def upload_or_update_selfie(
             detail="Invalid file type. Please upload a JPG, PNG, or WEBP image."
         )
 
-    # 2. Hapus file selfie lama jika ada untuk menghemat ruang
-    if current_user.selfie and os.path.exists(current_user.selfie):
-        print(f"DEBUG: Deleting old selfie file: {current_user.selfie}")
-        os.remove(current_user.selfie)
+    storage = get_storage()
+
+    # 2. File selfie lama (jika ada) akan dihapus di latar belakang setelah user ter-update
+    old_selfie_key = key_from_public_url(current_user.selfie)
 
     # 3. Buat nama file yang unik untuk menghindari konflik
     file_extension = selfie_file.filename.split(".")[-1]
     unique_filename = f"user_{current_user.id}_{uuid.uuid4()}.{file_extension}"
-    file_path = os.path.join(settings.SELFIE_STORAGE_PATH, unique_filename)
-    print(file_path)
+    storage_key = f"selfies/{unique_filename}"
+
+    # 4. Simpan file baru secara asinkron, di-stream per potongan
+    async def _iter_upload():
+        while content := await selfie_file.read(64 * 1024):  # Baca per-chunk
+            yield content
 
-    # 4. Simpan file baru secara asinkron
     try:
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            while content := await selfie_file.read(1024):  # Baca per-chunk
-                await out_file.write(content)
-        print(f"DEBUG: New selfie saved to: {file_path}")
+        await storage.save_stream(storage_key, _iter_upload(), content_type=selfie_file.content_type)
+        print(f"DEBUG: New selfie saved to: {storage_key}")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"There was an error uploading the file: {e}"
         )
 
-    # 5. Update path file di database
-    # Di sini kita hanya menyimpan path lokal. Untuk URL publik, Anda perlu logika tambahan
-    # yang menggabungkan base URL Nginx Anda, contoh:
-    public_url = f"{settings.API_BASE_URL}/media/selfies/{unique_filename}"
+    # 5. Update URL publik file di database
+    public_url = public_url_for_key(storage_key)
+    if old_selfie_key:
+        crud_file_deletion.enqueue_file_deletions(db, keys=[old_selfie_key])
     updated_user = await crud_user.update_user(
         db, user=current_user, data_to_update={"selfie": public_url}
     )
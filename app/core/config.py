@@ -1,8 +1,8 @@
-import os
 from pydantic import PostgresDsn, computed_field
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "FastAPI Google Auth App"
@@ -32,23 +32,89 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_REFRESH_SECRET_KEY: str
     JWT_EVENT_SECRET_KEY: str
+    # Kunci HMAC untuk digest refresh token yang disimpan di DB. Jika kosong, memakai JWT_REFRESH_SECRET_KEY
+    REFRESH_TOKEN_HASH_KEY: Optional[str] = None
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Snapshot user untuk autentikasi disimpan di memori (per worker) selama ini; juga batas
+    # waktu access token lama masih diterima worker lain setelah logout
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_WORKERS: int = 2 # Jumlah thread untuk bcrypt (password event, hash lama)
     
     DEEPFACE_MODEL_NAME: str = "Dlib"
     
-    STORAGE_ROOT_PATH: Path
-    @property
-    def SELFIE_STORAGE_PATH(self) -> Path:
-        return self.STORAGE_ROOT_PATH / "selfies"
-
-    @property
-    def EVENT_STORAGE_PATH(self) -> Path:
-        return self.STORAGE_ROOT_PATH / "events"
+    # --- Storage ---
+    # "local": filesystem di STORAGE_ROOT_PATH, "s3": object storage kompatibel S3 (AWS, MinIO, dll)
+    STORAGE_BACKEND: str = "local"
+    STORAGE_ROOT_PATH: Path = Path("storage")
+    S3_ENDPOINT_URL: Optional[str] = None # Contoh MinIO lokal: http://localhost:9000
+    S3_REGION: str = "us-east-1"
+    S3_BUCKET: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_PRESIGNED_URL_EXPIRE_SECONDS: int = 3600
+    
+    # --- Garbage collection file storage ---
+    GC_SWEEP_INTERVAL_SECONDS: int = 10
+    GC_SWEEP_BATCH_SIZE: int = 100
+    GC_MAX_ATTEMPTS: int = 8
+    GC_RETRY_BASE_DELAY_SECONDS: int = 30
+    GC_RECONCILE_INTERVAL_SECONDS: int = 6 * 3600
+    GC_ORPHAN_GRACE_SECONDS: int = 3600 # File/record yang lebih muda dari ini tidak dianggap yatim
+    GC_DELETE_ORPHAN_ROWS: bool = False # Jika False, record gambar tanpa file hanya dicatat di log
+    
+    # --- Pencarian Google Drive ---
+    DRIVE_HTTP_TIMEOUT_SECONDS: int = 60
+    DRIVE_API_ROOT_URL: Optional[str] = None # Isi untuk memakai server Drive palsu saat pengujian
+    # Penjadwal kuota Drive (dipakai bersama oleh semua pencarian dalam satu proses)
+    DRIVE_REQUESTS_PER_SECOND: float = 10.0
+    DRIVE_REQUEST_BURST: int = 20
+    DRIVE_MAX_CONCURRENT_REQUESTS: int = 16
+    DRIVE_MAX_RETRIES: int = 6
+    DRIVE_BACKOFF_BASE_SECONDS: float = 1.0
+    DRIVE_BACKOFF_MAX_SECONDS: float = 64.0
+    DRIVE_DOWNLOAD_CONCURRENCY: int = 8 # Jumlah file yang di-download bersamaan (disarankan 8-16)
+    DRIVE_INFERENCE_WORKERS: int = 2    # Jumlah thread untuk deteksi wajah
+    DRIVE_MATCH_THRESHOLD: float = 0.5
+    DRIVE_MAX_DEPTH: int = 5            # Kedalaman subfolder maksimum yang ditelusuri
+    DRIVE_MAX_FILES: int = 10000        # Jumlah gambar maksimum per pencarian
+    DRIVE_LIST_CONCURRENCY: int = 4     # Jumlah folder yang di-listing bersamaan
+    DRIVE_INDEX_TTL_SECONDS: int = 3600 # Snapshot folder dianggap segar selama ini; setelahnya delta crawl
+    DRIVE_INDEX_POLL_SECONDS: int = 5   # Interval cek saat menunggu folder yang sedang di-crawl pencarian lain
+    DRIVE_THUMBNAIL_SIZE: int = 1600    # Sisi terpanjang thumbnail untuk deteksi tahap pertama
+    DRIVE_PROGRESS_FLUSH_SECONDS: float = 2.0 # Interval penyimpanan progres pencarian ke database
+    DRIVE_RESULT_BATCH_SIZE: int = 50   # Jumlah hasil yang disimpan per INSERT
+    DRIVE_JOB_LEASE_SECONDS: int = 300  # Lease hilang jika worker tidak memberi heartbeat selama ini
+    DRIVE_JOB_RESUME_INTERVAL_SECONDS: int = 60
+    DRIVE_JOB_MAX_ATTEMPTS: int = 3
+    DRIVE_JOB_MAX_RUNNING: int = 4      # Jumlah pencarian yang berjalan bersamaan per worker
+    
+    # --- Galeri event ---
+    IMAGE_COUNT_CACHE_TTL_SECONDS: int = 60 # Jumlah total gambar (include_total) di-cache selama ini
+    IMAGE_COUNT_CACHE_MAX_ENTRIES: int = 1024
+    EVENT_COUNTER_RECONCILE_INTERVAL_SECONDS: int = 6 * 3600 # Counter event dihitung ulang dari tabel images
+    EVENT_COUNTER_RECONCILE_BATCH_SIZE: int = 500 # Jumlah event yang dikunci & dihitung ulang per transaksi
+    ACTIVITY_FLUSH_SECONDS: float = 2.0 # Akses event disimpan per batch, paling lambat setiap interval ini
+    ACTIVITY_BATCH_SIZE: int = 200
+    ACTIVITY_MAX_BUFFERED_BATCHES: int = 10 # Batas buffer saat database tidak bisa dijangkau
+    EVENT_UNLOCK_CACHE_TTL_SECONDS: int = 600 # Unlock yang berhasil tidak perlu bcrypt lagi selama ini
+    EVENT_UNLOCK_MAX_FAILURES: int = 10       # Batas password salah per IP/per user dalam satu window
+    EVENT_UNLOCK_WINDOW_SECONDS: int = 300
     
     DEEP_LINK_BASE_URL: str #
     
+    # --- Media serving ---
+    # None: file dikirim langsung oleh aplikasi (sendfile + Range/ETag)
+    # "x-accel": offload ke Nginx via header X-Accel-Redirect
+    # "x-sendfile": offload ke Apache/Lighttpd via header X-Sendfile
+    MEDIA_OFFLOAD_MODE: Optional[str] = None
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = "/protected-media"
+    MEDIA_CACHE_MAX_AGE_SECONDS: int = 31536000 # Nama file berbasis UUID, aman di-cache lama
+    
     TF_ENABLE_ONEDNN_OPTS: int = 0
 
     # Opsional: Client ID Google untuk Android/iOS jika perlu validasi audience token Google
@@ -64,8 +130,4 @@ class Settings(BaseSettings):
 def get_settings() -> Settings:
     return Settings()
 
-settings = get_settings()
-
-# Pastikan direktori ini ada saat aplikasi dimulai
-os.makedirs(settings.SELFIE_STORAGE_PATH, exist_ok=True)
-os.makedirs(settings.EVENT_STORAGE_PATH, exist_ok=True)
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
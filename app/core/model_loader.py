@@ -2,6 +2,10 @@
 
 import insightface
 
+# Versi model & parameter deteksi. Ubah nilai ini setiap kali model atau det_size
+# diganti, agar cache embedding (misal drive_file_faces) tidak memakai hasil lama.
+FACE_MODEL_VERSION = "buffalo_l-det640"
+
 class FaceAnalysisService:
     def __init__(self):
         print("Initializing FaceAnalysis service...")
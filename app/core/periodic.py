@@ -0,0 +1,21 @@
+# app/core/periodic.py
+
+import asyncio
+import random
+from typing import Awaitable, Callable
+
+async def run_periodically(name: str, interval_seconds: float, job: Callable[[], Awaitable[object]]) -> None:
+    """
+    Menjalankan sebuah coroutine secara berkala sampai task di-cancel (saat shutdown).
+    Error pada satu putaran hanya dicatat, putaran berikutnya tetap berjalan.
+    Jeda awal diacak agar worker Gunicorn tidak menjalankan job bersamaan.
+    """
+    await asyncio.sleep(random.uniform(0, min(interval_seconds, 5)))
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"BACKGROUND JOB '{name}' FAILED: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -1,3 +1,8 @@
+import hmac
+import uuid
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union, Optional
 from jose import jwt, JWTError
@@ -9,6 +14,10 @@ from app.schemas.token_schema import TokenPayload
 # Atau untuk password jika ada login email/password
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Executor terbatas khusus bcrypt: hashing tidak memblokir event loop,
+# dan lonjakan unlock event tidak bisa menghabiskan thread pool default.
+_password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
 def create_jwt_token(
     subject: Union[str, Any],
     expires_delta: timedelta,
@@ -22,14 +31,38 @@ def create_jwt_token(
     encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def create_access_token(subject: Union[str, Any]) -> str:
+def create_access_token(subject: Union[str, Any], token_version: int = 0) -> str:
     expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return create_jwt_token(subject, expires_delta, settings.JWT_SECRET_KEY)
+    # Klaim 'ver' dicocokkan dengan users.token_version agar token bisa dicabut saat logout
+    return create_jwt_token(subject, expires_delta, settings.JWT_SECRET_KEY, {"ver": token_version})
+
+def new_refresh_token_family() -> str:
+    return uuid.uuid4().hex
 
-def create_refresh_token(subject: Union[str, Any]) -> str:
+def create_refresh_token(subject: Union[str, Any], family: str) -> str:
     expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    # Anda bisa menambahkan klaim 'type': 'refresh' jika ingin membedakan di payload
-    return create_jwt_token(subject, expires_delta, settings.JWT_REFRESH_SECRET_KEY, {"type": "refresh"})
+    # 'jti' membuat setiap token unik, 'fam' menandai rantai rotasi (untuk deteksi pemakaian ulang)
+    return create_jwt_token(
+        subject, expires_delta, settings.JWT_REFRESH_SECRET_KEY,
+        {"type": "refresh", "jti": uuid.uuid4().hex, "fam": family}
+    )
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Digest HMAC-SHA256 dari refresh token untuk disimpan di DB.
+    Refresh token sudah acak dan panjang, jadi tidak perlu bcrypt yang lambat;
+    kunci HMAC mencegah digest dipakai ulang jika database bocor.
+    """
+    key = (settings.REFRESH_TOKEN_HASH_KEY or settings.JWT_REFRESH_SECRET_KEY).encode()
+    return hmac.new(key, token.encode(), hashlib.sha256).hexdigest()
+
+def is_legacy_refresh_token_hash(stored_hash: str) -> bool:
+    """Hash refresh token lama dibuat dengan bcrypt (diawali '$2')."""
+    return stored_hash.startswith("$2")
+
+def verify_refresh_token(token: str, stored_hash: str) -> bool:
+    """Perbandingan constant-time antara digest token dan digest yang tersimpan."""
+    return hmac.compare_digest(hash_refresh_token(token), stored_hash)
 
 def verify_jwt_token(token: str, secret_key: str) -> Optional[TokenPayload]:
     try:
@@ -42,4 +75,14 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash yang dijalankan di executor bcrypt."""
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password yang dijalankan di executor bcrypt."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_executor, verify_password, plain_password, hashed_password
+    )
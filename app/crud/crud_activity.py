@@ -1,65 +1,68 @@
 # app/crud/crud_activity.py
 
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Tuple
 from sqlalchemy import func, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.db.models import Activity as ActivityModel, Event as EventModel
+from app.db.models import Activity as ActivityModel, Event as EventModel, User as UserModel
 
 async def get_recent_accessed_events_for_user(
     db: AsyncSession, *, user_id: int, limit: int = 5
 ) -> List[EventModel]:
     """
     Mengambil event yang paling baru diakses oleh seorang pengguna.
-    Query ini sedikit kompleks:
-    1. Mencari aktivitas unik per event berdasarkan waktu akses terakhir.
-    2. Menggabungkannya dengan tabel event untuk mendapatkan detail.
-    3. Mengurutkan berdasarkan waktu akses terakhir.
+    Karena (id_user, id_event) unik, cukup urutkan aktivitas milik user
+    berdasarkan waktu akses terakhir (index ix_activity_id_user_updated_at).
     """
-    # Subquery untuk mendapatkan id_event unik dan waktu akses terakhirnya
-    subquery = (
-        select(
-            ActivityModel.id_event,
-            func.max(ActivityModel.updated_at).label("last_accessed_at")
-        )
-        .filter(ActivityModel.id_user == user_id)
-        .group_by(ActivityModel.id_event)
-        .subquery()
-    )
-
-    # Query utama untuk mengambil detail event berdasarkan hasil subquery
     query = (
         select(EventModel)
-        .join(subquery, EventModel.id == subquery.c.id_event)
-        .options(
-            selectinload(EventModel.images) # Eager load images untuk preview
-        )
-        .order_by(desc(subquery.c.last_accessed_at))
+        .join(ActivityModel, EventModel.id == ActivityModel.id_event)
+        .filter(ActivityModel.id_user == user_id)
+        .order_by(desc(ActivityModel.updated_at))
         .limit(limit)
     )
 
     result = await db.execute(query)
     return result.scalars().all()
 
-# Kita juga perlu fungsi untuk MEMBUAT record aktivitas, ini akan kita panggil nanti
-async def log_user_activity(db: AsyncSession, *, user_id: int, event_id: int) -> ActivityModel:
-    # Cek apakah sudah ada log untuk user dan event ini
-    existing_activity_stmt = select(ActivityModel).filter_by(id_user=user_id, id_event=event_id)
-    result = await db.execute(existing_activity_stmt)
-    db_activity = result.scalars().first()
-    
-    if db_activity:
-        # Jika sudah ada, kita hanya perbarui timestamp-nya
-        # updated_at akan otomatis terupdate oleh 'onupdate=func.now()' di model
-        # Namun, kita bisa set manual jika ingin lebih eksplisit
-        pass # SQLAlchemy akan handle onupdate saat commit
-    else:
-        # Jika belum ada, buat record baru
-        db_activity = ActivityModel(id_user=user_id, id_event=event_id)
-        db.add(db_activity)
-    
-    await db.commit()
-    await db.refresh(db_activity)
-    return db_activity
\ No newline at end of file
+async def upsert_activities(db: AsyncSession, *, rows: List[dict]) -> None:
+    """
+    Menyimpan banyak akses event ({id_user, id_event, accessed_at}) dalam satu
+    INSERT ... ON CONFLICT (id_user, id_event) DO UPDATE. Tidak melakukan commit.
+    Baris dengan kunci yang sama digabung dulu, diambil waktu akses terbaru.
+    Dipakai sebagai flush_fn AsyncBatchWriter di activity_service.
+    """
+    latest: Dict[Tuple[int, int], datetime] = {}
+    for row in rows:
+        key = (row["id_user"], row["id_event"])
+        if key not in latest or row["accessed_at"] > latest[key]:
+            latest[key] = row["accessed_at"]
+    if not latest:
+        return
+
+    # Lewati event & user yang sudah dihapus sejak diakses, agar satu baris tidak menggagalkan seluruh batch
+    existing_event_ids = set((await db.execute(
+        select(EventModel.id).where(EventModel.id.in_({id_event for _, id_event in latest}))
+    )).scalars().all())
+    existing_user_ids = set((await db.execute(
+        select(UserModel.id).where(UserModel.id.in_({id_user for id_user, _ in latest}))
+    )).scalars().all())
+    latest = {
+        key: accessed_at for key, accessed_at in latest.items()
+        if key[0] in existing_user_ids and key[1] in existing_event_ids
+    }
+    if not latest:
+        return
+
+    stmt = insert(ActivityModel).values([
+        {"id_user": id_user, "id_event": id_event, "created_at": accessed_at, "updated_at": accessed_at}
+        for (id_user, id_event), accessed_at in latest.items()
+    ])
+    # GREATEST agar batch yang terlambat di-flush tidak memundurkan waktu akses
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["id_user", "id_event"],
+        set_={"updated_at": func.greatest(ActivityModel.updated_at, stmt.excluded.updated_at)},
+    ))
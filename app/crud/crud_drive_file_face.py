@@ -0,0 +1,51 @@
+# app/crud/crud_drive_file_face.py
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DriveFileFace
+
+# Batas jumlah pasangan (file_id, versi) per query agar parameter SQL tidak terlalu banyak
+LOOKUP_CHUNK_SIZE = 1000
+
+async def get_cached_faces(
+    db: AsyncSession, *, file_versions: Iterable[Tuple[str, str]], model_versions: Sequence[str]
+) -> Dict[str, DriveFileFace]:
+    """
+    Mengambil cache deteksi wajah untuk daftar (drive_file_id, content_version).
+    model_versions diurutkan dari yang paling diutamakan; jika sebuah file punya
+    cache di beberapa versi, versi yang lebih awal di daftar yang dipakai.
+    Mengembalikan dict {drive_file_id: DriveFileFace} untuk file yang sudah ada di cache.
+    """
+    priority = {version: rank for rank, version in enumerate(model_versions)}
+    pairs = list(file_versions)
+    cached = {}
+    for start in range(0, len(pairs), LOOKUP_CHUNK_SIZE):
+        chunk = pairs[start:start + LOOKUP_CHUNK_SIZE]
+        result = await db.execute(
+            select(DriveFileFace).filter(
+                DriveFileFace.model_version.in_(model_versions),
+                tuple_(DriveFileFace.drive_file_id, DriveFileFace.content_version).in_(chunk)
+            )
+        )
+        for row in result.scalars().all():
+            current = cached.get(row.drive_file_id)
+            if current is None or priority[row.model_version] < priority[current.model_version]:
+                cached[row.drive_file_id] = row
+    return cached
+
+async def save_faces(db: AsyncSession, *, rows: List[dict]) -> None:
+    """
+    Menyimpan hasil deteksi ke cache dalam satu multi-row INSERT (tanpa commit).
+    Baris yang sudah ada (dari pencarian lain yang berjalan bersamaan) diabaikan.
+    """
+    if not rows:
+        return
+    await db.execute(
+        insert(DriveFileFace)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["drive_file_id", "content_version", "model_version"])
+    )
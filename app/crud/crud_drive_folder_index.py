@@ -0,0 +1,66 @@
+# app/crud/crud_drive_folder_index.py
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DriveFolderIndex
+
+async def acquire_folder_index(
+    db: AsyncSession, *, folder_id: str, owner: str, lease_seconds: int, max_age_seconds: int
+) -> Tuple[str, Optional[List[dict]]]:
+    """
+    Menentukan cara sebuah pencarian mendapatkan isi folder:
+    - ("fresh", snapshot): index masih segar, cukup pakai snapshot.
+    - ("acquired", None): pencarian ini memegang lease dan harus meng-crawl folder.
+    - ("busy", None): pencarian lain sedang meng-crawl folder ini, tunggu lalu coba lagi.
+    Baris index dikunci (FOR UPDATE) sehingga hanya satu pencarian yang mendapat lease.
+    """
+    await db.execute(insert(DriveFolderIndex).values(drive_folder_id=folder_id).on_conflict_do_nothing())
+    folder_index = (await db.execute(
+        select(DriveFolderIndex).filter(DriveFolderIndex.drive_folder_id == folder_id).with_for_update()
+    )).scalars().first()
+
+    now = datetime.now(timezone.utc)
+    is_fresh = (
+        folder_index.snapshot is not None
+        and folder_index.indexed_at is not None
+        and folder_index.indexed_at > now - timedelta(seconds=max_age_seconds)
+    )
+    if is_fresh:
+        await db.commit()
+        return "fresh", folder_index.snapshot
+    if folder_index.indexing_expires_at and folder_index.indexing_expires_at > now and folder_index.indexing_owner != owner:
+        await db.commit()
+        return "busy", None
+
+    folder_index.indexing_owner = owner
+    folder_index.indexing_expires_at = now + timedelta(seconds=lease_seconds)
+    await db.commit()
+    return "acquired", None
+
+async def extend_folder_index_lease(db: AsyncSession, *, folder_id: str, owner: str, lease_seconds: int) -> None:
+    """Memperpanjang lease crawl (heartbeat) selama crawl masih berjalan (tanpa commit)."""
+    await db.execute(
+        update(DriveFolderIndex)
+        .where(DriveFolderIndex.drive_folder_id == folder_id, DriveFolderIndex.indexing_owner == owner)
+        .values(indexing_expires_at=datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+    )
+
+async def release_folder_index(db: AsyncSession, *, folder_id: str, owner: str, snapshot: Optional[List[dict]] = None) -> None:
+    """
+    Melepas lease crawl. Jika snapshot diisi (crawl selesai dengan sukses),
+    snapshot disimpan dan index dianggap segar mulai sekarang.
+    """
+    values = {"indexing_owner": None, "indexing_expires_at": None}
+    if snapshot is not None:
+        values.update(snapshot=snapshot, file_count=len(snapshot), indexed_at=datetime.now(timezone.utc))
+    await db.execute(
+        update(DriveFolderIndex)
+        .where(DriveFolderIndex.drive_folder_id == folder_id, DriveFolderIndex.indexing_owner == owner)
+        .values(**values)
+    )
+    await db.commit()
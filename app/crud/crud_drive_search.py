@@ -1,21 +1,26 @@
 # app/crud/crud_drive_search.py
 
-from typing import List
-from sqlalchemy import desc
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set
+from sqlalchemy import desc, update, func, or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
 
-from app.db.models import DriveSearch, FoundDriveImage
+from app.db.models import DriveSearch, FoundDriveImage, DriveSearchCheckpoint
 from app.schemas.drive_search_schema import FoundDriveImagePublic
 
-async def create_drive_search(db: AsyncSession, *, user_id: int, folder_id: str, original_url: str, drive_name: str) -> DriveSearch:
+async def create_drive_search(
+    db: AsyncSession, *, user_id: int, folder_id: str, original_url: str, drive_name: str, selfie_url: str
+) -> DriveSearch:
     """Membuat record baru saat pencarian dimulai."""
     db_search = DriveSearch(
         id_user=user_id,
         drive_folder_id=folder_id,
         drive_name=drive_name,
         drive_url=original_url,
+        selfie_url=selfie_url,
         status="processing"
     )
     db.add(db_search)
@@ -47,24 +52,128 @@ async def get_drive_search_results(db: AsyncSession, search_id: int) -> DriveSea
     )
     return result.scalars().first()
 
-async def add_found_image(db: AsyncSession, *, search_id: int, image_data: dict) -> FoundDriveImage:
-    """Menyimpan satu gambar yang cocok ke database."""
-    db_found_image = FoundDriveImage(
-        id_drive_search=search_id,
-        original_drive_id=image_data["original_drive_id"],
-        file_name=image_data["file_name"],
-        url=image_data["url"],
-        face_coords=image_data["face_coords"],
-        similarity=image_data["similarity"]
+async def add_found_images(db: AsyncSession, *, rows: List[dict]) -> Set[str]:
+    """
+    Menyimpan banyak gambar yang cocok dalam satu multi-row INSERT (tanpa commit).
+    Setiap row berisi id_drive_search, original_drive_id, file_name, url, face_coords, similarity.
+    File Drive yang sudah tercatat di sesi yang sama (misal diproses ulang setelah
+    pencarian dilanjutkan) diabaikan. Mengembalikan URL dari row yang benar-benar tersimpan.
+    """
+    if not rows:
+        return set()
+    result = await db.execute(
+        insert(FoundDriveImage)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["id_drive_search", "original_drive_id"])
+        .returning(FoundDriveImage.url)
+    )
+    return set(result.scalars().all())
+
+async def count_found_images(db: AsyncSession, *, search_id: int) -> int:
+    """Menghitung jumlah gambar yang sudah ditemukan oleh sebuah sesi pencarian."""
+    result = await db.execute(
+        select(func.count(FoundDriveImage.id)).filter(FoundDriveImage.id_drive_search == search_id)
     )
-    db.add(db_found_image)
+    return result.scalar_one()
+
+async def update_drive_search_status(db: AsyncSession, search_id: int, status: str, lease_owner: Optional[str] = None):
+    """
+    Menyelesaikan sebuah sesi pencarian dengan status akhir dan melepas lease-nya.
+    Hanya sesi yang masih 'processing' yang diubah, sehingga status 'cancelled' tidak tertimpa.
+    Jika lease_owner diisi, sesi hanya diubah bila lease masih dipegang worker tersebut.
+    """
+    query = update(DriveSearch).where(DriveSearch.id == search_id, DriveSearch.status == "processing")
+    if lease_owner is not None:
+        query = query.where(DriveSearch.lease_owner == lease_owner)
+    await db.execute(query.values(status=status, finished_at=func.now(), lease_owner=None, lease_expires_at=None))
     await db.commit()
-    await db.refresh(db_found_image)
-    return db_found_image
 
-async def update_drive_search_status(db: AsyncSession, search_id: int, status: str):
-    """Mengubah status sebuah sesi pencarian."""
-    db_search = await db.get(DriveSearch, search_id)
-    if db_search:
-        db_search.status = status
-        await db.commit()
\ No newline at end of file
+async def update_drive_search_progress(
+    db: AsyncSession, *, search_id: int, values: dict, lease_owner: Optional[str] = None, lease_seconds: int = 0
+) -> Optional[str]:
+    """
+    Menyimpan progres sebuah sesi pencarian. Mengembalikan status terkini sesi tersebut.
+    Jika lease_owner diisi, lease sekaligus diperpanjang (heartbeat); None dikembalikan
+    bila lease sudah diambil alih worker lain.
+    """
+    query = update(DriveSearch).where(DriveSearch.id == search_id)
+    if lease_owner is not None:
+        query = query.where(DriveSearch.lease_owner == lease_owner)
+        values = {**values, "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}
+    result = await db.execute(query.values(**values).returning(DriveSearch.status))
+    await db.commit()
+    return result.scalar_one_or_none()
+
+async def claim_drive_search(db: AsyncSession, *, search_id: int, owner: str, lease_seconds: int) -> Optional[DriveSearch]:
+    """
+    Mengambil lease sebuah sesi pencarian yang masih 'processing' dan tidak sedang
+    dijalankan worker lain (lease kosong atau kedaluwarsa). Atomik, sehingga hanya
+    satu worker yang berhasil. Mengembalikan sesi tersebut, atau None jika gagal.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(DriveSearch)
+        .where(
+            DriveSearch.id == search_id,
+            DriveSearch.status == "processing",
+            or_(DriveSearch.lease_expires_at.is_(None), DriveSearch.lease_expires_at < now)
+        )
+        .values(
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=DriveSearch.attempts + 1
+        )
+        .returning(DriveSearch)
+    )
+    db_search = result.scalars().first()
+    await db.commit()
+    return db_search
+
+async def release_drive_search_lease(db: AsyncSession, *, search_id: int, owner: str) -> None:
+    """Melepas lease tanpa mengubah status, agar worker lain bisa langsung melanjutkan pencarian."""
+    await db.execute(
+        update(DriveSearch)
+        .where(DriveSearch.id == search_id, DriveSearch.lease_owner == owner)
+        .values(lease_owner=None, lease_expires_at=None)
+    )
+    await db.commit()
+
+async def get_resumable_search_ids(db: AsyncSession, *, limit: int) -> List[int]:
+    """Mengambil ID sesi 'processing' yang tidak dipegang worker mana pun (lease kosong/kedaluwarsa)."""
+    result = await db.execute(
+        select(DriveSearch.id)
+        .filter(
+            DriveSearch.status == "processing",
+            or_(DriveSearch.lease_expires_at.is_(None), DriveSearch.lease_expires_at < datetime.now(timezone.utc))
+        )
+        .order_by(DriveSearch.created_at)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def add_checkpoints(db: AsyncSession, *, search_id: int, file_ids: Iterable[str]) -> None:
+    """
+    Menandai file yang sudah diproses (tanpa commit).
+    Di-commit bersama penyimpanan progres agar keduanya selalu konsisten.
+    """
+    rows = [{"id_drive_search": search_id, "drive_file_id": file_id} for file_id in file_ids]
+    if rows:
+        await db.execute(insert(DriveSearchCheckpoint).values(rows).on_conflict_do_nothing())
+
+async def get_checkpointed_file_ids(db: AsyncSession, *, search_id: int) -> Set[str]:
+    """Mengambil ID file Drive yang sudah selesai diproses oleh sebuah sesi pencarian."""
+    result = await db.execute(
+        select(DriveSearchCheckpoint.drive_file_id).filter(DriveSearchCheckpoint.id_drive_search == search_id)
+    )
+    return set(result.scalars().all())
+
+async def cancel_drive_search(db: AsyncSession, *, search_id: int) -> bool:
+    """Menandai sesi pencarian sebagai 'cancelled'. False jika sesi sudah tidak berjalan."""
+    result = await db.execute(
+        update(DriveSearch)
+        .where(DriveSearch.id == search_id, DriveSearch.status == "processing")
+        .values(status="cancelled", finished_at=func.now())
+        .returning(DriveSearch.id)
+    )
+    await db.commit()
+    return result.scalar_one_or_none() is not None
\ No newline at end of file
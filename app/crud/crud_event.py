@@ -1,17 +1,19 @@
 # app/crud/crud_event.py
 
 from fastapi import HTTPException, status
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, or_, literal, tuple_, func
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import selectinload
 from app.db.models import Event as EventModel, User as UserModel
 from app.schemas.event_schema import EventCreate, EventUpdate
-from app.core.security import get_password_hash, verify_password
+from app.schemas.pagination_schema import encode_cursor, decode_cursor
+from app.core.security import get_password_hash_async
 
 async def create_event(db: AsyncSession, *, event_in: EventCreate, owner_id: int) -> EventModel:
-    hashed_password = get_password_hash(event_in.password)
+    hashed_password = await get_password_hash_async(event_in.password)
     # Buat instance model DB dengan data dari skema Pydantic
     db_event = EventModel(
         name=event_in.name,
@@ -32,7 +34,6 @@ async def create_event(db: AsyncSession, *, event_in: EventCreate, owner_id: int
 async def get_events_by_owner(db: AsyncSession, *, owner_id: int) -> List[EventModel]:
     result = await db.execute(
         select(EventModel)
-        .options(selectinload(EventModel.images)) # <-- Eager load images
         .filter(EventModel.id_user == owner_id)
         .order_by(EventModel.date.desc())
     )
@@ -41,10 +42,7 @@ async def get_events_by_owner(db: AsyncSession, *, owner_id: int) -> List[EventM
 async def get_event_by_id(db: AsyncSession, event_id: int) -> Optional[EventModel]:
     result = await db.execute(
         select(EventModel)
-        .options(
-            selectinload(EventModel.owner), # <-- Eager load owner
-            selectinload(EventModel.images) # <-- Eager load images
-        )
+        .options(selectinload(EventModel.owner)) # <-- Eager load owner
         .filter(EventModel.id == event_id)
     )
     return result.scalars().first()
@@ -53,28 +51,52 @@ async def get_event_by_share_code(db: AsyncSession, share_code: str) -> Optional
     result = await db.execute(select(EventModel).filter(EventModel.share_code == share_code))
     return result.scalars().first()
 
-async def search_events_by_name(db: AsyncSession, *, query: str) -> List[EventModel]:
-    search_query = f"%{query}%"
-    result = await db.execute(
-        select(EventModel)
-        .options(
-            selectinload(EventModel.owner), # <-- Eager load owner
-            selectinload(EventModel.images) # <-- Eager load images
-        )
-        .filter(EventModel.name.ilike(search_query))
-        .order_by(EventModel.date.desc())
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def search_events_by_name(
+    db: AsyncSession, *, query: str, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[EventModel], Optional[str]]:
+    """
+    Mencari event berdasarkan nama memakai index GIN pg_trgm (ix_events_name_trgm):
+    substring (ILIKE) maupun kemiripan kata (operator <%) sama-sama dilayani index,
+    sehingga tidak ada sequential scan meskipun jumlah event terus bertambah.
+    Hasil diurutkan dari yang paling mirip, dengan cursor atas (skor, id).
+    Mengembalikan tuple (daftar_event, next_cursor). Melempar ValueError jika cursor rusak.
+    """
+    score = func.word_similarity(query, EventModel.name)
+    stmt = (
+        select(EventModel, score.label("score"))
+        .options(selectinload(EventModel.owner)) # <-- Eager load owner
+        .filter(or_(
+            EventModel.name.ilike(f"%{_escape_like(query)}%", escape="\\"),
+            literal(query).op("<%")(EventModel.name),
+        ))
     )
-    return result.scalars().all()
+    if cursor:
+        try:
+            last_score, last_id = decode_cursor(cursor)
+            stmt = stmt.filter(tuple_(score, EventModel.id) < (float(last_score), int(last_id)))
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    result = await db.execute(stmt.order_by(score.desc(), EventModel.id.desc()).limit(limit + 1))
+    rows = result.all()
+    events = [event for event, _ in rows[:limit]]
+    if len(rows) <= limit:
+        return events, None
+    _, last_score = rows[limit - 1]
+    return events, encode_cursor([last_score, events[-1].id])
 
 async def update_event(db: AsyncSession, *, event_db_obj: EventModel, event_in: EventUpdate) -> EventModel:
     """Mengupdate sebuah event."""
     update_data = event_in.model_dump(exclude_unset=True) # Hanya ambil field yang diisi
     
     # Jika password diupdate, hash password baru
-    if "password" in update_data and update_data["password"]:
-        hashed_password = get_password_hash(update_data["password"])
+    if update_data.get("password"):
+        hashed_password = await get_password_hash_async(update_data["password"])
         update_data["hashed_password"] = hashed_password
-        del update_data["password"]
+    update_data.pop("password", None)
 
     for field, value in update_data.items():
         setattr(event_db_obj, field, value)
@@ -89,7 +111,9 @@ async def update_event(db: AsyncSession, *, event_db_obj: EventModel, event_in:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error on event update: {e}")
 
 async def delete_event(db: AsyncSession, event_to_delete: EventModel):
-    await db.delete(event_to_delete)
+    # DELETE langsung di level SQL: gambar, bookmark, dan aktivitas ikut terhapus
+    # lewat ON DELETE CASCADE tanpa harus memuat ribuan objek ke ORM.
+    await db.execute(delete(EventModel).where(EventModel.id == event_to_delete.id))
     await db.commit()
     
 async def set_event_indexed_status(db: AsyncSession, *, event_id: int, status: bool) -> EventModel:
@@ -0,0 +1,54 @@
+# app/crud/crud_file_deletion.py
+
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import FileDeletion
+
+def enqueue_file_deletions(db: AsyncSession, *, keys: Iterable[str] = (), prefixes: Iterable[str] = ()) -> None:
+    """
+    Menambahkan file/prefix ke antrean penghapusan.
+    Sengaja TIDAK melakukan commit: pemanggil meng-commit bersama perubahan datanya,
+    sehingga antrean dan penghapusan record selalu konsisten.
+    """
+    db.add_all(
+        [FileDeletion(storage_key=key, is_prefix=False) for key in keys if key]
+        + [FileDeletion(storage_key=prefix, is_prefix=True) for prefix in prefixes if prefix]
+    )
+
+async def claim_due_deletions(db: AsyncSession, *, limit: int) -> List[FileDeletion]:
+    """
+    Mengambil antrean yang sudah jatuh tempo dan menguncinya (FOR UPDATE SKIP LOCKED),
+    sehingga beberapa worker bisa menjalankan sweeper bersamaan tanpa bentrok.
+    """
+    result = await db.execute(
+        select(FileDeletion)
+        .filter(FileDeletion.next_attempt_at <= datetime.now(timezone.utc))
+        .order_by(FileDeletion.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalars().all()
+
+async def remove_deletions(db: AsyncSession, *, deletion_ids: List[int]) -> None:
+    """Menghapus record antrean yang file-nya sudah berhasil dihapus (tanpa commit)."""
+    if deletion_ids:
+        await db.execute(delete(FileDeletion).where(FileDeletion.id.in_(deletion_ids)))
+
+async def mark_deletion_failed(
+    db: AsyncSession, *, deletion: FileDeletion, error: str, max_attempts: int, base_delay_seconds: int
+) -> None:
+    """Mencatat kegagalan dan menjadwalkan ulang dengan exponential backoff (tanpa commit)."""
+    attempts = deletion.attempts + 1
+    next_attempt_at = None
+    if attempts < max_attempts:
+        delay = min(base_delay_seconds * (2 ** (attempts - 1)), 3600)
+        next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    await db.execute(
+        update(FileDeletion)
+        .where(FileDeletion.id == deletion.id)
+        .values(attempts=attempts, last_error=error[:2000], next_attempt_at=next_attempt_at)
+    )
@@ -1,10 +1,11 @@
 # app/crud/crud_fotota.py
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import selectinload, contains_eager
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import desc, and_, delete
+from sqlalchemy import desc, and_, delete, literal
+from sqlalchemy.dialects.postgresql import insert
 
 from app.db.models import Fotota as FototaModel, Image as ImageModel, Event as EventModel
 
@@ -15,34 +16,38 @@ async def get_bookmark(db: AsyncSession, *, user_id: int, image_id: int) -> Opti
     )
     return result.scalars().first()
 
-async def bulk_create_bookmarks(db: AsyncSession, *, user_id: int, image_ids: List[int]) -> List[FototaModel]:
-    """Membuat beberapa record bookmark sekaligus."""
-    
-    # 1. Cek dulu mana saja gambar yang sudah di-bookmark oleh user ini untuk menghindari duplikasi
-    existing_bookmarks_stmt = select(FototaModel.id_image).filter(
-        and_(FototaModel.id_user == user_id, FototaModel.id_image.in_(image_ids))
-    )
-    result = await db.execute(existing_bookmarks_stmt)
-    existing_image_ids = set(result.scalars().all())
+async def bulk_create_bookmarks(db: AsyncSession, *, user_id: int, image_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Membuat beberapa record bookmark sekaligus dalam satu statement:
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING, lalu di-join dengan
+    data gambarnya. Jumlah round-trip tetap berapa pun banyaknya foto, dan request
+    bersamaan tidak bisa membuat duplikat (constraint uq_fotota_user_image).
+    ID gambar yang tidak ada atau sudah di-bookmark dilewati.
+    Mengembalikan daftar {"id", "created_at", "image"} untuk bookmark yang baru dibuat.
+    """
+    if not image_ids:
+        return []
 
-    # 2. Buat daftar bookmark baru hanya untuk image_id yang belum ada
+    inserted = (
+        insert(FototaModel)
+        .from_select(
+            ["id_user", "id_image"],
+            select(literal(user_id), ImageModel.id).where(ImageModel.id.in_(image_ids)),
+        )
+        .on_conflict_do_nothing(index_elements=["id_user", "id_image"])
+        .returning(FototaModel.id, FototaModel.id_image, FototaModel.created_at)
+        .cte("inserted")
+    )
+    result = await db.execute(
+        select(inserted.c.id, inserted.c.created_at, ImageModel)
+        .join(ImageModel, ImageModel.id == inserted.c.id_image)
+        .order_by(inserted.c.id)
+    )
     new_bookmarks = [
-        FototaModel(id_user=user_id, id_image=image_id)
-        for image_id in image_ids
-        if image_id not in existing_image_ids
+        {"id": bookmark_id, "created_at": created_at, "image": image}
+        for bookmark_id, created_at, image in result.all()
     ]
-
-    if not new_bookmarks:
-        return [] # Kembalikan list kosong jika tidak ada yang baru ditambahkan
-
-    # 3. Simpan semua bookmark baru ke database dalam satu kali operasi
-    db.add_all(new_bookmarks)
     await db.commit()
-    
-    # Refresh setiap objek baru untuk mendapatkan ID dan data relasi
-    for bm in new_bookmarks:
-        await db.refresh(bm)
-        
     return new_bookmarks
 
 async def get_bookmark_by_id(db: AsyncSession, bookmark_id: int) -> Optional[FototaModel]:
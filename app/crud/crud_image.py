@@ -1,20 +1,90 @@
 # app/crud/crud_image.py
 
-import math
-from typing import Optional, Tuple, List
-from sqlalchemy import func
+from datetime import datetime
+from typing import Optional, Tuple, List, Dict, Any
+from cachetools import TTLCache
+from sqlalchemy import Integer, Text, column, func, true, tuple_, update, values
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.db.models.image_model import Image as ImageModel
+from app.db.models.event_model import Event as EventModel
+from app.schemas.pagination_schema import encode_cursor, decode_cursor
 
-async def create_event_image(db: AsyncSession, *, file_name: str, url: str, event_id: int) -> ImageModel:
-    db_image = ImageModel(file_name=file_name, url=url, id_event=event_id)
+async def create_event_image(
+    db: AsyncSession, *, file_name: str, url: str, event_id: int,
+    file_size: Optional[int] = None, metadata: Optional[Dict[str, Any]] = None
+) -> ImageModel:
+    # metadata berisi hasil ekstraksi EXIF (taken_at, orientation, width, height, camera_make, camera_model)
+    db_image = ImageModel(file_name=file_name, url=url, id_event=event_id, file_size=file_size, **(metadata or {}))
     db.add(db_image)
+    # Counter event diperbarui dalam transaksi yang sama dengan INSERT gambar
+    await db.execute(
+        update(EventModel)
+        .where(EventModel.id == event_id)
+        .values(
+            photo_count=EventModel.photo_count + 1,
+            storage_bytes=EventModel.storage_bytes + (file_size or 0),
+        )
+    )
     await db.commit()
     await db.refresh(db_image)
     return db_image
 
+async def remove_event_image(db: AsyncSession, *, image: ImageModel) -> None:
+    """
+    Menghapus record gambar sekaligus mengurangi counter event-nya.
+    Tidak melakukan commit, agar bisa digabung dengan antrean penghapusan file.
+    """
+    await db.execute(
+        update(EventModel)
+        .where(EventModel.id == image.id_event)
+        .values(
+            photo_count=EventModel.photo_count - 1,
+            storage_bytes=EventModel.storage_bytes - (image.file_size or 0),
+            face_count=EventModel.face_count - (image.face_count or 0),
+            indexed_photo_count=EventModel.indexed_photo_count - (1 if image.indexed_at else 0),
+        )
+    )
+    await db.delete(image)
+
+async def record_image_face_counts(db: AsyncSession, *, event_id: int, face_counts: Dict[str, int]) -> int:
+    """
+    Menyimpan jumlah wajah per gambar ({url: jumlah_wajah}) untuk gambar yang belum
+    ter-index, lalu menambah counter event dengan hasilnya, dalam satu transaksi.
+    Gambar yang sudah ter-index dilewati agar counter tidak terhitung dua kali.
+    Mengembalikan jumlah gambar yang baru ter-index.
+    """
+    if not face_counts:
+        return 0
+
+    counts = values(
+        column("url", Text), column("face_count", Integer), name="counts"
+    ).data(list(face_counts.items()))
+    result = await db.execute(
+        update(ImageModel)
+        .where(
+            ImageModel.url == counts.c.url,
+            ImageModel.id_event == event_id,
+            ImageModel.indexed_at.is_(None),
+        )
+        .values(face_count=counts.c.face_count, indexed_at=func.now())
+        .returning(ImageModel.face_count)
+    )
+    newly_indexed = result.scalars().all()
+    if newly_indexed:
+        await db.execute(
+            update(EventModel)
+            .where(EventModel.id == event_id)
+            .values(
+                indexed_photo_count=EventModel.indexed_photo_count + len(newly_indexed),
+                face_count=EventModel.face_count + sum(newly_indexed),
+            )
+        )
+    await db.commit()
+    return len(newly_indexed)
+
 async def get_image_with_event(db: AsyncSession, image_id: int) -> Optional[ImageModel]:
     """
     Mengambil sebuah gambar dan secara eksplisit memuat relasi 'event'-nya
@@ -27,51 +97,132 @@ async def get_image_with_event(db: AsyncSession, image_id: int) -> Optional[Imag
     )
     return result.scalars().first()
 
-async def get_images_by_event_paginated(
+# Cache jumlah total gambar per (event, filter). Cukup untuk ditampilkan di UI,
+# tidak perlu dihitung ulang dengan COUNT(*) di setiap halaman.
+_image_count_cache: TTLCache = TTLCache(
+    maxsize=settings.IMAGE_COUNT_CACHE_MAX_ENTRIES, ttl=settings.IMAGE_COUNT_CACHE_TTL_SECONDS
+)
+
+def _encode_cursor(sort_by: str, sort_order: str, sort_value: Any, image_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    return encode_cursor([sort_by, sort_order, sort_value, image_id])
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """
+    Membaca cursor opaque menjadi (nilai_sort, id) gambar terakhir di halaman sebelumnya.
+    Melempar ValueError jika cursor rusak atau dibuat untuk urutan sorting yang berbeda.
+    """
+    try:
+        cursor_sort_by, cursor_sort_order, sort_value, image_id = decode_cursor(cursor)
+        if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order) or not isinstance(image_id, int):
+            raise ValueError("Cursor does not match the requested sorting")
+        if sort_value is not None and sort_by in ("created_at", "taken_at"):
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, image_id
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _filter_images_by_event(query, *, event_id: int, taken_from: Optional[datetime], taken_to: Optional[datetime]):
+    query = query.filter(ImageModel.id_event == event_id)
+    # Filter rentang waktu pengambilan foto (memakai index id_event + taken_at)
+    if taken_from:
+        query = query.filter(ImageModel.taken_at >= taken_from)
+    if taken_to:
+        query = query.filter(ImageModel.taken_at <= taken_to)
+    return query
+
+async def get_images_by_event_cursor(
     db: AsyncSession,
     *,
     event_id: int,
-    page: int,
     limit: int,
     sort_by: str,
     sort_order: str,
-    # search: Optional[str]
-) -> Tuple[List[ImageModel], int]:
+    cursor: Optional[str] = None,
+    taken_from: Optional[datetime] = None,
+    taken_to: Optional[datetime] = None,
+) -> Tuple[List[ImageModel], Optional[str]]:
     """
-    Mengambil gambar dari event tertentu dengan pagination, sorting, dan search.
-    Mengembalikan tuple berisi (daftar_gambar, jumlah_total_item).
+    Mengambil satu halaman gambar event dengan keyset pagination atas (kolom_sort, id).
+    Tidak memakai OFFSET, sehingga halaman ke-200 sama murahnya dengan halaman pertama
+    (memakai index komposit id_event + kolom_sort + id).
+    Mengembalikan tuple (daftar_gambar, next_cursor); next_cursor None jika sudah habis.
     """
-    # 1. Buat query dasar untuk memfilter berdasarkan event_id
-    query = select(ImageModel).filter(ImageModel.id_event == event_id)
+    base_query = _filter_images_by_event(select(ImageModel), event_id=event_id, taken_from=taken_from, taken_to=taken_to)
+
+    # Default ke created_at jika field tidak valid
+    if sort_by not in ("created_at", "taken_at", "file_name"):
+        sort_by = "created_at"
+    sort_column = getattr(ImageModel, sort_by)
+    descending = sort_order.lower() == "desc"
+    # Hanya taken_at yang bisa NULL (foto tanpa EXIF); kelompok NULL selalu di akhir
+    nullable = sort_by == "taken_at"
+
+    # id dipakai sebagai pemecah seri agar urutan antar halaman stabil
+    id_order = ImageModel.id.desc() if descending else ImageModel.id.asc()
+    column_order = sort_column.desc() if descending else sort_column.asc()
+    if nullable:
+        column_order = column_order.nulls_last()
 
-    # 2. Tambahkan filter pencarian jika ada
-    # if search:
-    #     # Menggunakan ilike untuk pencarian case-insensitive
-    #     query = query.filter(ImageModel.file_name.ilike(f"%{search}%"))
+    last_value, last_id = _decode_cursor(cursor, sort_by, sort_order) if cursor else (None, None)
+    id_after = (ImageModel.id < last_id if descending else ImageModel.id > last_id) if cursor else None
 
-    # 3. Hitung jumlah total item SEBELUM pagination untuk metadata
-    count_query = select(func.count()).select_from(query.subquery())
-    total_items_result = await db.execute(count_query)
-    total_items = total_items_result.scalar_one()
+    # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+    fetch_size = limit + 1
+    items: List[ImageModel] = []
+    if cursor is None or last_value is not None:
+        query = base_query
+        if cursor:
+            row_key = tuple_(sort_column, ImageModel.id)
+            # Perbandingan baris (sort, id) < (v, id) bisa langsung dilayani index komposit
+            query = query.filter(row_key < (last_value, last_id) if descending else row_key > (last_value, last_id))
+            if nullable:
+                query = query.filter(sort_column.is_not(None))
+        items = list((await db.execute(query.order_by(column_order, id_order).limit(fetch_size))).scalars().all())
 
-    # 4. Tentukan kolom untuk sorting
-    sort_column = getattr(ImageModel, sort_by, ImageModel.created_at) # Default ke created_at jika field tidak valid
+    # Lanjut ke kelompok NULL hanya setelah semua foto ber-EXIF habis,
+    # agar query pertama tidak perlu kondisi OR yang mematahkan index.
+    if nullable and cursor and len(items) < fetch_size:
+        null_query = base_query.filter(sort_column.is_(None))
+        if last_value is None:
+            null_query = null_query.filter(id_after)
+        items.extend((await db.execute(
+            null_query.order_by(id_order).limit(fetch_size - len(items))
+        )).scalars().all())
 
-    # 5. Tentukan urutan sorting
-    if sort_order.lower() == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
+    if len(items) <= limit:
+        return items, None
 
-    # 6. Terapkan pagination (offset dan limit)
-    offset = (page - 1) * limit
-    query = query.offset(offset).limit(limit)
+    items = items[:limit]
+    last_item = items[-1]
+    return items, _encode_cursor(sort_by, sort_order, getattr(last_item, sort_by), last_item.id)
 
-    # 7. Eksekusi query final untuk mendapatkan item halaman ini
-    items_result = await db.execute(query)
-    items = items_result.scalars().all()
+async def count_images_in_event(
+    db: AsyncSession, *, event_id: int, taken_from: Optional[datetime] = None, taken_to: Optional[datetime] = None
+) -> int:
+    """Menghitung jumlah gambar event (dengan filter waktu), hasilnya di-cache sebentar."""
+    if taken_from is None and taken_to is None:
+        # Tanpa filter, cukup baca counter denormalisasi di event
+        photo_count = (await db.execute(select(EventModel.photo_count).where(EventModel.id == event_id))).scalar()
+        return photo_count or 0
 
-    return items, total_items
+    cache_key = (event_id, taken_from, taken_to)
+    cached = _image_count_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    query = _filter_images_by_event(
+        select(func.count()).select_from(ImageModel), event_id=event_id, taken_from=taken_from, taken_to=taken_to
+    )
+    total_items = (await db.execute(query)).scalar_one()
+    _image_count_cache[cache_key] = total_items
+    return total_items
+
+def invalidate_image_count_cache(event_id: int) -> None:
+    """Membuang cache jumlah gambar sebuah event, dipanggil setelah gambar ditambah/dihapus."""
+    for cache_key in [key for key in list(_image_count_cache.keys()) if key[0] == event_id]:
+        _image_count_cache.pop(cache_key, None)
 
 async def get_images_by_urls(db: AsyncSession, *, urls: List[str]) -> List[ImageModel]:
     """
@@ -84,4 +235,36 @@ async def get_images_by_urls(db: AsyncSession, *, urls: List[str]) -> List[Image
         
     query = select(ImageModel).filter(ImageModel.url.in_(urls))
     result = await db.execute(query)
-    return result.scalars().all()
\ No newline at end of file
+    return result.scalars().all()
+
+async def get_event_image_previews(
+    db: AsyncSession, *, event_ids: List[int], limit: int = 4
+) -> Dict[int, List[str]]:
+    """
+    Mengambil maksimal `limit` URL preview per event dalam satu query
+    (LATERAL ... LIMIT per event, memakai index id_event + created_at + id),
+    tanpa memuat seluruh objek Image ke ORM. Jumlah gambar dibaca dari event.photo_count.
+    Mengembalikan {event_id: [url, ...]}; event tanpa gambar tidak ada di dict.
+    """
+    if not event_ids:
+        return {}
+
+    preview = (
+        select(ImageModel.url, ImageModel.created_at, ImageModel.id)
+        .where(ImageModel.id_event == EventModel.id)
+        .order_by(ImageModel.created_at, ImageModel.id)
+        .limit(limit)
+        .lateral("preview")
+    )
+    result = await db.execute(
+        select(EventModel.id, preview.c.url)
+        .select_from(EventModel)
+        .join(preview, true())
+        .where(EventModel.id.in_(event_ids))
+        .order_by(EventModel.id, preview.c.created_at, preview.c.id)
+    )
+
+    previews: Dict[int, List[str]] = {}
+    for event_id, url in result.all():
+        previews.setdefault(event_id, []).append(url)
+    return previews
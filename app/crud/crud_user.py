@@ -1,12 +1,49 @@
 from typing import Optional, Union, Dict, Any
+from cachetools import TTLCache
+from sqlalchemy import inspect, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
 from fastapi import HTTPException, status
 
+from app.core.config import settings
 from app.db.models.user_model import User as UserModel
 from app.schemas.user_schema import UserCreateGoogle
 
+# Snapshot kolom user untuk autentikasi, agar tidak ada query user di setiap request.
+# Cache ini per proses: logout langsung berlaku di worker yang menanganinya (cache-nya dihapus),
+# tetapi worker lain masih menerima access token lama sampai snapshot-nya kedaluwarsa, yaitu
+# paling lama USER_CACHE_TTL_SECONDS. Perubahan lain (misal is_admin) juga tertunda selama itu.
+_user_cache: TTLCache = TTLCache(maxsize=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def _snapshot_user(user: UserModel) -> Dict[str, Any]:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(UserModel).column_attrs}
+
+def _user_from_snapshot(snapshot: Dict[str, Any]) -> UserModel:
+    # Objek baru per request (bukan objek bersama), berstatus detached agar bisa di-merge
+    user = UserModel(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def invalidate_user_cache(user_id: int) -> None:
+    _user_cache.pop(user_id, None)
+
+async def get_user_for_auth(db: AsyncSession, *, user_id: int, token_version: int) -> Optional[UserModel]:
+    """
+    Mengambil user untuk dependensi autentikasi, memakai cache berumur pendek.
+    Jika token membawa token_version yang lebih baru dari snapshot, snapshot dianggap basi
+    dan user dibaca ulang dari database. Mengembalikan objek detached.
+    """
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None or snapshot["token_version"] < token_version:
+        user = await get_user_by_id(db, user_id=user_id)
+        if not user:
+            return None
+        snapshot = _snapshot_user(user)
+        _user_cache[user_id] = snapshot
+    return _user_from_snapshot(snapshot)
+
 async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[UserModel]:
     try:
         return await db.get(UserModel, user_id)
@@ -61,14 +98,59 @@ async def update_user(
     data_to_update: Dict[str, Any]
 ) -> UserModel:
     try:
+        # User dari dependensi autentikasi berasal dari cache (detached), gabungkan ke sesi ini dulu
+        if user not in db:
+            user = await db.merge(user, load=False)
         for field, value in data_to_update.items():
             if hasattr(user, field):
                 setattr(user, field, value)
         # user.updated_at = datetime.now(timezone.utc) # Jika tidak pakai onupdate dari model
         await db.commit()
         await db.refresh(user)
+        invalidate_user_cache(user.id)
         return user
     except SQLAlchemyError as e:
         await db.rollback()
         print(f"Database error in update_user: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error updating user data: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error updating user data: {str(e)}")
+
+async def rotate_refresh_token(
+    db: AsyncSession, *, user_id: int, old_hash: str, new_hash: str, family: str
+) -> bool:
+    """
+    Mengganti digest refresh token secara atomik (compare-and-swap):
+    hanya berhasil jika digest yang tersimpan masih sama dengan old_hash.
+    Jika dua request memakai token yang sama bersamaan, hanya satu yang menang.
+    """
+    result = await db.execute(
+        update(UserModel)
+        .where(UserModel.id == user_id, UserModel.internal_refresh_token_hash == old_hash)
+        .values(internal_refresh_token_hash=new_hash, refresh_token_family=family)
+    )
+    await db.commit()
+    invalidate_user_cache(user_id)
+    return result.rowcount == 1
+
+async def _revoke_tokens(db: AsyncSession, *, user_id: int, family: Optional[str] = None) -> None:
+    # token_version dinaikkan di SQL (bukan dari objek user yang mungkin basi dari cache)
+    stmt = update(UserModel).where(UserModel.id == user_id)
+    if family:
+        stmt = stmt.where(UserModel.refresh_token_family == family)
+    await db.execute(stmt.values(
+        internal_refresh_token_hash=None,
+        refresh_token_family=None,
+        token_version=UserModel.token_version + 1,
+    ))
+    await db.commit()
+    invalidate_user_cache(user_id)
+
+async def revoke_refresh_token_family(db: AsyncSession, *, user_id: int, family: Optional[str]) -> None:
+    """
+    Mencabut family refresh token (misal karena token lama dipakai ulang):
+    refresh token dihapus dan token_version dinaikkan agar access token ikut tidak berlaku.
+    """
+    await _revoke_tokens(db, user_id=user_id, family=family)
+
+async def revoke_user_tokens(db: AsyncSession, *, user_id: int) -> None:
+    """Mencabut semua token user (logout): refresh token dihapus dan token_version dinaikkan."""
+    await _revoke_tokens(db, user_id=user_id)
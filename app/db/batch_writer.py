@@ -0,0 +1,122 @@
+# app/db/batch_writer.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+
+FlushFn = Callable[..., Awaitable[Any]]
+OnFlushFn = Callable[[AsyncSession, List[dict], Any], Awaitable[None]]
+OnCommitFn = Callable[[List[dict], Any], None]
+
+class AsyncBatchWriter:
+    """
+    Menampung baris (dict) di memori lalu menyimpannya per batch:
+    setiap `max_rows` baris atau paling lambat setiap `max_seconds` detik.
+
+    Setiap flush memakai sesi database baru yang berumur pendek, sehingga
+    koneksi pool tidak ditahan selama proses panjang berjalan.
+    `flush_fn(db, rows=rows)` biasanya fungsi CRUD multi-row INSERT (tanpa commit);
+    `on_flush(db, rows, result)` opsional, dijalankan di transaksi yang sama sebelum commit.
+    `on_commit(rows, result)` opsional, dijalankan hanya setelah commit berhasil (misal untuk
+    memperbarui state di memori, agar tidak terhitung dua kali jika batch di-flush ulang).
+    `max_buffered_rows` opsional untuk data best-effort: jika database tidak bisa dijangkau,
+    baris tertua di atas batas ini dibuang agar memori tidak tumbuh tanpa batas.
+
+    Gunakan sebagai async context manager:
+        async with AsyncBatchWriter(crud_x.add_many, max_rows=100, max_seconds=2) as writer:
+            await writer.add({...})
+    """
+
+    def __init__(
+        self, flush_fn: FlushFn, *, max_rows: int, max_seconds: float,
+        on_flush: Optional[OnFlushFn] = None, on_commit: Optional[OnCommitFn] = None,
+        max_buffered_rows: Optional[int] = None
+    ):
+        self._flush_fn = flush_fn
+        self._on_flush = on_flush
+        self._on_commit = on_commit
+        self.max_rows = max_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.max_seconds = max_seconds
+        self._rows: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._ticker: Optional[asyncio.Task] = None
+        self._background_flush: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "AsyncBatchWriter":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        # Jika blok gagal, baris yang tersisa tetap dicoba disimpan
+        await self.close()
+
+    def start(self) -> None:
+        """Menjalankan flush berkala berbasis waktu di latar belakang."""
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick())
+
+    async def close(self) -> None:
+        """Menghentikan flush berkala dan menyimpan sisa baris."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        if self._background_flush is not None:
+            await asyncio.gather(self._background_flush, return_exceptions=True)
+        await self.flush()
+
+    async def add(self, row: dict) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.max_rows:
+            await self.flush()
+
+    def add_nowait(self, row: dict) -> None:
+        """
+        Seperti add(), tetapi tidak pernah menunggu database: jika buffer penuh,
+        flush dijalankan sebagai task latar belakang. Cocok dipanggil dari request handler.
+        """
+        self._rows.append(row)
+        self._trim()
+        if len(self._rows) >= self.max_rows and (self._background_flush is None or self._background_flush.done()):
+            self._background_flush = asyncio.create_task(self._flush_logged())
+
+    async def flush(self) -> None:
+        """Menyimpan semua baris yang tertampung. Jika gagal, baris dikembalikan ke buffer lalu error dilempar."""
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await self._flush_fn(db, rows=rows)
+                    if self._on_flush is not None:
+                        await self._on_flush(db, rows, result)
+                    await db.commit()
+            except Exception:
+                self._rows = rows + self._rows
+                self._trim()
+                raise
+            if self._on_commit is not None:
+                self._on_commit(rows, result)
+
+    def _trim(self) -> None:
+        """Membuang baris tertua jika buffer melebihi max_buffered_rows."""
+        if self.max_buffered_rows is None or len(self._rows) <= self.max_buffered_rows:
+            return
+        dropped = len(self._rows) - self.max_buffered_rows
+        self._rows = self._rows[dropped:]
+        print(f"BATCH WRITER: Buffer full, dropped {dropped} oldest row(s).")
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"BATCH WRITER: Flush failed, will retry. Error: {e}")
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.max_seconds)
+            await self._flush_logged()
@@ -7,4 +7,8 @@ from .image_model import Image
 from .activity_model import Activity
 from .fotota_model import Fotota
 from .drive_search_model import DriveSearch
-from .found_drive_image_model import FoundDriveImage
\ No newline at end of file
+from .found_drive_image_model import FoundDriveImage
+from .file_deletion_model import FileDeletion
+from .drive_file_face_model import DriveFileFace
+from .drive_search_checkpoint_model import DriveSearchCheckpoint
+from .drive_folder_index_model import DriveFolderIndex
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/db/models/activity_model.py
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -10,7 +10,7 @@ class Activity(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
     # DIUBAH: Foreign Key ke events.id sekarang adalah Integer
-    id_event = Column(Integer, ForeignKey("events.id"), nullable=False)
+    id_event = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
     # DIUBAH: Foreign Key ke users.id sekarang adalah Integer
     id_user = Column(Integer, ForeignKey("users.id"), nullable=False)
     
@@ -18,4 +18,11 @@ class Activity(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     event = relationship("Event", back_populates="activities")
-    user = relationship("User", back_populates="activities")
\ No newline at end of file
+    user = relationship("User", back_populates="activities")
+
+    __table_args__ = (
+        # Satu record per user per event, diperbarui lewat upsert
+        UniqueConstraint("id_user", "id_event", name="uq_activity_user_event"),
+        # Untuk "event yang terakhir diakses" di beranda
+        Index("ix_activity_id_user_updated_at", "id_user", "updated_at"),
+    )
@@ -0,0 +1,30 @@
+# app/db/models/drive_file_face_model.py
+
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.base_class import Base
+
+class DriveFileFace(Base):
+    """
+    Cache hasil deteksi wajah per file Google Drive.
+    Satu record menyimpan SEMUA wajah di sebuah file (bisa nol wajah), sehingga
+    pencarian ulang pada folder yang sama tidak perlu download & inference lagi.
+    Record dianggap valid selama isi file (md5Checksum/modifiedTime) dan versi model sama.
+    """
+    __tablename__ = "drive_file_faces"
+    __table_args__ = (
+        UniqueConstraint("drive_file_id", "content_version", "model_version", name="uq_drive_file_faces_file_version_model"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    drive_file_id = Column(String(255), nullable=False)
+    content_version = Column(String(255), nullable=False) # md5Checksum, atau modifiedTime jika tidak tersedia
+    model_version = Column(String(64), nullable=False)
+
+    face_count = Column(Integer, nullable=False, default=0)
+    # Matriks embedding float32 (face_count x dimensi embedding) dalam bentuk bytes
+    embeddings = Column(LargeBinary, nullable=False)
+    # List bounding box [{"x", "y", "w", "h"}, ...] sesuai urutan embedding
+    boxes = Column(JSONB, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,29 @@
+# app/db/models/drive_folder_index_model.py
+
+from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.base_class import Base
+
+class DriveFolderIndex(Base):
+    """
+    Index bersama per folder Google Drive, dipakai ulang oleh semua pengguna
+    yang mencari di folder yang sama. Menyimpan snapshot listing folder; hasil
+    deteksi wajah setiap file tersimpan di drive_file_faces.
+    Hanya satu pencarian yang boleh meng-crawl sebuah folder dalam satu waktu
+    (indexing_owner + indexing_expires_at), pencarian lain menunggu hasilnya.
+    """
+    __tablename__ = "drive_folder_indexes"
+
+    drive_folder_id = Column(String(255), primary_key=True)
+
+    # Daftar metadata file gambar (id, name, mimeType, md5Checksum, ...) hasil crawl terakhir
+    snapshot = Column(JSONB, nullable=True)
+    file_count = Column(Integer, nullable=False, default=0, server_default="0")
+    indexed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Lease crawl: pencarian yang sedang meng-index folder ini
+    indexing_owner = Column(String(255), nullable=True)
+    indexing_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,14 @@
+# app/db/models/drive_search_checkpoint_model.py
+
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.db.base_class import Base
+
+class DriveSearchCheckpoint(Base):
+    """
+    Penanda file Drive yang sudah selesai diproses oleh sebuah sesi pencarian.
+    Saat pencarian dilanjutkan setelah restart, file-file ini dilewati.
+    """
+    __tablename__ = "drive_search_checkpoints"
+
+    id_drive_search = Column(Integer, ForeignKey("drive_searches.id", ondelete="CASCADE"), primary_key=True)
+    drive_file_id = Column(String(255), primary_key=True)
@@ -1,6 +1,6 @@
 # app/db/models/drive_search_model.py
 
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text, Float, LargeBinary
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -11,7 +11,25 @@ class DriveSearch(Base):
     drive_folder_id = Column(String(255), nullable=False)
     drive_name = Column(String(255), nullable=True)
     drive_url = Column(Text, nullable=True)
-    status = Column(String(50), nullable=False, default="processing")
+    status = Column(String(50), nullable=False, default="processing") # processing, completed, failed, cancelled
+
+    # Progres & statistik, diperbarui per batch selama pencarian berjalan
+    total_files = Column(Integer, nullable=True)
+    processed_files = Column(Integer, nullable=False, default=0, server_default="0")
+    matches_found = Column(Integer, nullable=False, default=0, server_default="0")
+    download_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    inference_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Snapshot selfie saat pencarian dibuat, agar pencarian bisa dilanjutkan setelah restart
+    selfie_url = Column(Text, nullable=True)
+    selfie_embedding = Column(LargeBinary, nullable=True) # float32, diisi saat pertama kali dijalankan
+
+    # Lease job: worker yang sedang menjalankan pencarian ini & batas waktu heartbeat-nya
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
     
     id_user = Column(Integer, ForeignKey("users.id"), nullable=False)
     
@@ -1,6 +1,6 @@
 # app/db/models/event_model.py
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, BigInteger, Boolean, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, Text, BigInteger, Boolean, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -21,9 +21,22 @@ class Event(Base):
     
     indexed_by_robota = Column(Boolean, default=False, nullable=False)
     
+    # Counter denormalisasi, diperbarui secara atomik saat upload, hapus dan indexing wajah.
+    # Direkonsiliasi berkala oleh event_stats_service jika sempat melenceng.
+    photo_count = Column(Integer, default=0, server_default="0", nullable=False)
+    face_count = Column(Integer, default=0, server_default="0", nullable=False)
+    indexed_photo_count = Column(Integer, default=0, server_default="0", nullable=False)
+    storage_bytes = Column(BigInteger, default=0, server_default="0", nullable=False)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     owner = relationship("User", back_populates="events")
-    images = relationship("Image", back_populates="event", cascade="all, delete-orphan")
-    activities = relationship("Activity", back_populates="event", cascade="all, delete-orphan")
\ No newline at end of file
+    images = relationship("Image", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
+    activities = relationship("Activity", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Index trigram untuk pencarian nama event (ILIKE '%q%' dan word_similarity).
+        # Membutuhkan ekstensi pg_trgm, dibuat otomatis saat startup.
+        Index("ix_events_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
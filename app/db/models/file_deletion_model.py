@@ -0,0 +1,24 @@
+# app/db/models/file_deletion_model.py
+
+from sqlalchemy import Column, Integer, Text, Boolean, DateTime, func
+from app.db.base_class import Base
+
+class FileDeletion(Base):
+    """
+    Antrean penghapusan file di storage.
+    Record dibuat dalam transaksi yang sama dengan penghapusan data di database,
+    lalu file-nya dihapus oleh sweeper di latar belakang (dengan retry).
+    """
+    __tablename__ = "file_deletions"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    storage_key = Column(Text, nullable=False)
+    # True jika storage_key adalah prefix/folder (misal 'events/12/')
+    is_prefix = Column(Boolean, default=False, nullable=False)
+
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    # NULL berarti sudah melewati batas retry dan perlu dicek manual
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True, index=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,6 +1,6 @@
 # app/db/models/fotota_model.py
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -12,10 +12,15 @@ class Fotota(Base):
     # DIUBAH: Foreign Key ke users.id sekarang adalah Integer
     id_user = Column(Integer, ForeignKey("users.id"), nullable=False)
     # DIUBAH: Foreign Key ke images.id sekarang adalah Integer
-    id_image = Column(Integer, ForeignKey("images.id"), nullable=False)
+    id_image = Column(Integer, ForeignKey("images.id", ondelete="CASCADE"), nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     user = relationship("User", back_populates="saved_photos")
-    image = relationship("Image", back_populates="saved_by_users")
\ No newline at end of file
+    image = relationship("Image", back_populates="saved_by_users")
+
+    __table_args__ = (
+        # Satu foto hanya bisa di-bookmark sekali per user (dipakai ON CONFLICT DO NOTHING)
+        UniqueConstraint("id_user", "id_image", name="uq_fotota_user_image"),
+    )
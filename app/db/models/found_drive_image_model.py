@@ -1,12 +1,16 @@
 # app/db/models/found_drive_image_model.py
 
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class FoundDriveImage(Base):
     __tablename__ = "found_drive_images"
+    __table_args__ = (
+        # Satu file Drive hanya dicatat sekali per sesi, walaupun diproses ulang setelah restart
+        UniqueConstraint("id_drive_search", "original_drive_id", name="uq_found_drive_images_search_file"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_drive_search = Column(Integer, ForeignKey("drive_searches.id"), nullable=False)
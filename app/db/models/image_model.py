@@ -1,6 +1,6 @@
 # app/db/models/image_model.py
 
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -12,10 +12,33 @@ class Image(Base):
     url = Column(Text, unique=True, nullable=False)
     
     # DIUBAH: Foreign Key ke events.id sekarang adalah Integer
-    id_event = Column(Integer, ForeignKey("events.id"), nullable=False)
+    id_event = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    
+    # Metadata EXIF, diekstrak sekali saat upload
+    taken_at = Column(DateTime(timezone=True), nullable=True)
+    orientation = Column(SmallInteger, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    camera_make = Column(String(255), nullable=True)
+    camera_model = Column(String(255), nullable=True)
+    
+    file_size = Column(BigInteger, nullable=True) # Ukuran file di storage (byte)
+    # Diisi saat wajah di foto ini pertama kali dideteksi (lihat record_image_face_counts)
+    face_count = Column(Integer, nullable=True)
+    indexed_at = Column(DateTime(timezone=True), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     event = relationship("Event", back_populates="images")
-    saved_by_users = relationship("Fotota", back_populates="image", cascade="all, delete-orphan")
\ No newline at end of file
+    saved_by_users = relationship("Fotota", back_populates="image", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Index komposit untuk keyset pagination galeri (id_event, kolom_sort, id);
+        # ix_images_id_event_taken_at_id juga dipakai filter waktu pengambilan foto
+        Index("ix_images_id_event_created_at_id", "id_event", "created_at", "id"),
+        Index("ix_images_id_event_taken_at_id", "id_event", "taken_at", "id"),
+        # Urutan taken_at DESC NULLS LAST tidak bisa dilayani scan mundur index di atas
+        Index("ix_images_id_event_taken_at_desc_id", id_event, taken_at.desc().nulls_last(), id.desc()),
+        Index("ix_images_id_event_file_name_id", "id_event", "file_name", "id"),
+    )
@@ -21,6 +21,10 @@ class User(Base):
     
     google_refresh_token = Column(Text, nullable=True)
     internal_refresh_token_hash = Column(String(255), nullable=True, index=True)
+    # Family refresh token yang aktif; token dari family lain (atau dipakai ulang) ditolak
+    refresh_token_family = Column(String(64), nullable=True)
+    # Dinaikkan saat logout; access token dengan klaim 'ver' lebih lama ditolak
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,5 +1,8 @@
 -- Hapus tabel jika sudah ada (opsional, untuk memulai dari bersih)
-DROP TABLE IF EXISTS fotota, activity, images, events, users CASCADE;
+DROP TABLE IF EXISTS drive_folder_indexes, drive_search_checkpoints, drive_file_faces, file_deletions, fotota, activity, images, events, users CASCADE;
+
+-- Ekstensi trigram untuk pencarian nama event
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Tabel untuk Pengguna
 CREATE TABLE users (
@@ -11,7 +14,9 @@ CREATE TABLE users (
     is_admin BOOLEAN NOT NULL DEFAULT FALSE,
     google_id VARCHAR(255) NOT NULL UNIQUE,
     google_refresh_token TEXT,
-    internal_refresh_token_hash VARCHAR(255),
+    internal_refresh_token_hash VARCHAR(255), -- Digest HMAC-SHA256 refresh token
+    refresh_token_family VARCHAR(64),
+    token_version INTEGER NOT NULL DEFAULT 0, -- Dinaikkan saat logout (klaim 'ver' di access token)
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
 );
@@ -26,6 +31,10 @@ CREATE TABLE events (
     link VARCHAR(255) UNIQUE,
     share_code VARCHAR(16) UNIQUE,
     indexed_by_robota BOOLEAN NOT NULL DEFAULT FALSE,
+    photo_count INTEGER NOT NULL DEFAULT 0, -- Counter denormalisasi, direkonsiliasi berkala
+    face_count INTEGER NOT NULL DEFAULT 0,
+    indexed_photo_count INTEGER NOT NULL DEFAULT 0,
+    storage_bytes BIGINT NOT NULL DEFAULT 0,
     id_user INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
@@ -37,6 +46,15 @@ CREATE TABLE images (
     file_name VARCHAR(255) NOT NULL,
     url TEXT NOT NULL UNIQUE,
     id_event INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    taken_at TIMESTAMP WITH TIME ZONE, -- Waktu pengambilan foto dari EXIF
+    orientation SMALLINT,
+    width INTEGER,
+    height INTEGER,
+    camera_make VARCHAR(255),
+    camera_model VARCHAR(255),
+    file_size BIGINT,
+    face_count INTEGER, -- Diisi saat wajah di foto pertama kali dideteksi
+    indexed_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
 );
@@ -47,7 +65,8 @@ CREATE TABLE activity (
     id_event INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
     id_user INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
-    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT uq_activity_user_event UNIQUE (id_user, id_event)
 );
 
 -- Tabel untuk foto yang di-bookmark/disimpan oleh pengguna
@@ -56,7 +75,8 @@ CREATE TABLE fotota (
     id_user INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     id_image INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
-    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT uq_fotota_user_image UNIQUE (id_user, id_image)
 );
 
 -- Tabel untuk melacak setiap sesi pencarian dari Google Drive
@@ -65,7 +85,19 @@ CREATE TABLE drive_searches (
     drive_folder_id VARCHAR(255) NOT NULL,
     drive_name VARCHAR(255),
     drive_url TEXT,
-    status VARCHAR(50) NOT NULL DEFAULT 'processing', -- Contoh: processing, completed, failed
+    status VARCHAR(50) NOT NULL DEFAULT 'processing', -- Contoh: processing, completed, failed, cancelled
+    total_files INTEGER,
+    processed_files INTEGER NOT NULL DEFAULT 0,
+    matches_found INTEGER NOT NULL DEFAULT 0,
+    download_seconds REAL NOT NULL DEFAULT 0,
+    inference_seconds REAL NOT NULL DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    selfie_url TEXT,       -- Snapshot selfie saat pencarian dibuat
+    selfie_embedding BYTEA, -- Embedding selfie (float32)
+    lease_owner VARCHAR(255), -- Worker yang sedang menjalankan pencarian
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0,
     id_user INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
@@ -83,9 +115,53 @@ CREATE TABLE found_drive_images (
     face_coords JSONB, -- Menyimpan data x, y, w, h dalam format JSON
     similarity REAL,   -- Menyimpan skor kemiripan (0.0 - 1.0)
 
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT uq_found_drive_images_search_file UNIQUE (id_drive_search, original_drive_id)
+);
+
+-- File Drive yang sudah selesai diproses per sesi pencarian (untuk melanjutkan setelah restart)
+CREATE TABLE drive_search_checkpoints (
+    id_drive_search INTEGER NOT NULL REFERENCES drive_searches(id) ON DELETE CASCADE,
+    drive_file_id VARCHAR(255) NOT NULL,
+    PRIMARY KEY (id_drive_search, drive_file_id)
+);
+
+-- Antrean penghapusan file storage yang diproses oleh sweeper di latar belakang
+CREATE TABLE file_deletions (
+    id SERIAL PRIMARY KEY,
+    storage_key TEXT NOT NULL,
+    is_prefix BOOLEAN NOT NULL DEFAULT FALSE, -- TRUE jika storage_key adalah folder/prefix
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT now(), -- NULL jika sudah melewati batas retry
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
 );
 
+-- Cache deteksi wajah per file Google Drive (dipakai ulang oleh semua pencarian)
+CREATE TABLE drive_file_faces (
+    id SERIAL PRIMARY KEY,
+    drive_file_id VARCHAR(255) NOT NULL,
+    content_version VARCHAR(255) NOT NULL, -- md5Checksum, atau modifiedTime jika tidak tersedia
+    model_version VARCHAR(64) NOT NULL,
+    face_count INTEGER NOT NULL DEFAULT 0,
+    embeddings BYTEA NOT NULL, -- Matriks float32 (face_count x dimensi embedding)
+    boxes JSONB NOT NULL,      -- List bounding box sesuai urutan embedding
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT uq_drive_file_faces_file_version_model UNIQUE (drive_file_id, content_version, model_version)
+);
+
+-- Index bersama per folder Google Drive (snapshot listing + lease crawl)
+CREATE TABLE drive_folder_indexes (
+    drive_folder_id VARCHAR(255) PRIMARY KEY,
+    snapshot JSONB,          -- Metadata file gambar hasil crawl terakhir
+    file_count INTEGER NOT NULL DEFAULT 0,
+    indexed_at TIMESTAMP WITH TIME ZONE, -- Kapan snapshot terakhir selesai dibuat
+    indexing_owner VARCHAR(255),         -- Pencarian yang sedang meng-crawl folder ini
+    indexing_expires_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
 -- Membuat Indeks untuk mempercepat pencarian
 CREATE INDEX ix_users_id ON users(id);
 CREATE INDEX ix_users_email ON users(email);
@@ -94,19 +170,31 @@ CREATE INDEX ix_users_internal_refresh_token_hash ON users(internal_refresh_toke
 
 CREATE INDEX ix_events_id ON events(id);
 CREATE INDEX ix_events_name ON events(name);
+CREATE INDEX ix_events_name_trgm ON events USING gin (name gin_trgm_ops);
 
 CREATE INDEX ix_images_id ON images(id);
+CREATE INDEX ix_images_id_event_created_at_id ON images(id_event, created_at, id);
+CREATE INDEX ix_images_id_event_taken_at_id ON images(id_event, taken_at, id);
+CREATE INDEX ix_images_id_event_taken_at_desc_id ON images(id_event, taken_at DESC NULLS LAST, id DESC);
+CREATE INDEX ix_images_id_event_file_name_id ON images(id_event, file_name, id);
 
 CREATE INDEX ix_activity_id ON activity(id);
+CREATE INDEX ix_activity_id_user_updated_at ON activity(id_user, updated_at);
 
 CREATE INDEX ix_fotota_id ON fotota(id);
 
 -- Membuat Indeks untuk performa query yang lebih baik
 CREATE INDEX ix_drive_searches_id ON drive_searches(id);
 CREATE INDEX ix_drive_searches_id_user ON drive_searches(id_user);
+CREATE INDEX ix_drive_searches_lease_expires_at ON drive_searches(lease_expires_at);
 
 CREATE INDEX ix_found_drive_images_id ON found_drive_images(id);
 CREATE INDEX ix_found_drive_images_id_drive_search ON found_drive_images(id_drive_search);
 
+CREATE INDEX ix_file_deletions_id ON file_deletions(id);
+CREATE INDEX ix_file_deletions_next_attempt_at ON file_deletions(next_attempt_at);
+
+CREATE INDEX ix_drive_file_faces_id ON drive_file_faces(id);
+
 -- Catatan: Fungsi onupdate untuk updated_at akan lebih baik ditangani oleh Trigger di PostgreSQL
 -- jika Anda ingin otomatisasi penuh, namun untuk saat ini model SQLAlchemy akan menanganinya saat update.
\ No newline at end of file
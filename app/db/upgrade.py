@@ -0,0 +1,103 @@
+# app/db/upgrade.py
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# ID advisory lock agar hanya satu proses yang meng-upgrade skema saat beberapa worker start bersamaan
+_UPGRADE_LOCK_ID = 7_301_003
+
+def _cascade_foreign_key(table: str, column: str, referenced: str) -> str:
+    """Mengubah foreign key bawaan (nama default <table>_<column>_fkey) menjadi ON DELETE CASCADE, jika belum."""
+    constraint = f"{table}_{column}_fkey"
+    return f"""
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{constraint}' AND confdeltype <> 'c') THEN
+                ALTER TABLE {table} DROP CONSTRAINT {constraint},
+                    ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) REFERENCES {referenced} ON DELETE CASCADE;
+            END IF;
+        END $$
+    """
+
+def _add_unique_constraint(table: str, constraint: str, columns: str, keep_order: str = "id") -> str:
+    """
+    Menambahkan unique constraint jika belum ada. Baris duplikat dihapus lebih dulu;
+    per grup, baris pertama menurut keep_order yang dipertahankan.
+    """
+    return f"""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{constraint}') THEN
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, row_number() OVER (PARTITION BY {columns} ORDER BY {keep_order}) AS rn FROM {table}
+                    ) ranked WHERE rn > 1
+                );
+                ALTER TABLE {table} ADD CONSTRAINT {constraint} UNIQUE ({columns});
+            END IF;
+        END $$
+    """
+
+# create_all hanya membuat tabel yang belum ada; kolom, constraint dan index baru
+# pada tabel yang sudah ada ditambahkan di sini. Setiap statement harus idempoten
+# (IF NOT EXISTS / dicek dulu), karena dijalankan di setiap startup.
+SCHEMA_UPGRADES = [
+    # Metadata EXIF gambar
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS taken_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS orientation SMALLINT",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS width INTEGER",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS height INTEGER",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS camera_make VARCHAR(255)",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS camera_model VARCHAR(255)",
+    # Penghapusan event/gambar mengandalkan cascade di database (passive_deletes)
+    _cascade_foreign_key("images", "id_event", "events(id)"),
+    _cascade_foreign_key("activity", "id_event", "events(id)"),
+    _cascade_foreign_key("fotota", "id_image", "images(id)"),
+    # Progres & statistik pencarian Drive
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS total_files INTEGER",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS processed_files INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS matches_found INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS download_seconds DOUBLE PRECISION NOT NULL DEFAULT 0",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS inference_seconds DOUBLE PRECISION NOT NULL DEFAULT 0",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS finished_at TIMESTAMP WITH TIME ZONE",
+    # Pencarian Drive sebagai job yang bisa dilanjutkan (snapshot selfie & lease)
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS selfie_url TEXT",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS selfie_embedding BYTEA",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(255)",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE drive_searches ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_drive_searches_lease_expires_at ON drive_searches (lease_expires_at)",
+    _add_unique_constraint("found_drive_images", "uq_found_drive_images_search_file", "id_drive_search, original_drive_id"),
+    # Index keyset pagination galeri
+    "CREATE INDEX IF NOT EXISTS ix_images_id_event_created_at_id ON images (id_event, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_images_id_event_taken_at_id ON images (id_event, taken_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_images_id_event_taken_at_desc_id ON images (id_event, taken_at DESC NULLS LAST, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_images_id_event_file_name_id ON images (id_event, file_name, id)",
+    # Index trigram pencarian nama event (ekstensi pg_trgm dibuat sebelum create_all)
+    "CREATE INDEX IF NOT EXISTS ix_events_name_trgm ON events USING gin (name gin_trgm_ops)",
+    # Counter per event; nilai awalnya diisi oleh rekonsiliasi event_stats_service
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS photo_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS face_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS indexed_photo_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS storage_bytes BIGINT NOT NULL DEFAULT 0",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS file_size BIGINT",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS face_count INTEGER",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS indexed_at TIMESTAMP WITH TIME ZONE",
+    # Bookmark unik per user & foto (dipakai ON CONFLICT DO NOTHING); bookmark tertua dipertahankan
+    _add_unique_constraint("fotota", "uq_fotota_user_image", "id_user, id_image", keep_order="created_at, id"),
+    # Satu record aktivitas per user & event (dipakai upsert); akses terakhir yang dipertahankan
+    _add_unique_constraint("activity", "uq_activity_user_event", "id_user, id_event", keep_order="updated_at DESC, id DESC"),
+    "CREATE INDEX IF NOT EXISTS ix_activity_id_user_updated_at ON activity (id_user, updated_at)",
+    # Versi access token, dinaikkan saat logout
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0",
+    # Family refresh token yang aktif (rotasi & deteksi reuse)
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS refresh_token_family VARCHAR(64)",
+]
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    """
+    Menyesuaikan database lama dengan model terbaru. Dipanggil saat startup setelah create_all,
+    di dalam transaksi yang sama, sehingga upgrade gagal tidak meninggalkan skema setengah jadi.
+    """
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": _UPGRADE_LOCK_ID})
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
@@ -1,11 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
+from sqlalchemy import text
 from app.core.config import settings
 from app.core.model_loader import face_app
 from app.db.database import engine
+from app.db.upgrade import upgrade_schema
 from app.db.models import Base # Base dari user_model jika tidak pakai base_class
-from app.api.routers import auth_router, user_router, event_router, image_router, activity_router, fotota_router, redirect_router, drive_search_router
+from app.services import file_gc_service, drive_job_service, event_stats_service, activity_service
+from app.api.routers import auth_router, user_router, event_router, image_router, activity_router, fotota_router, redirect_router, drive_search_router, media_router
 
 # Fungsi untuk event startup dan shutdown
 @asynccontextmanager
@@ -14,7 +18,11 @@ async def lifespan(app: FastAPI):
     
     print("Application startup: Creating database tables...")
     async with engine.begin() as conn:
+        # Ekstensi untuk index trigram pencarian event, harus ada sebelum create_all
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+        # Kolom/constraint baru untuk tabel yang dibuat oleh versi sebelumnya
+        await upgrade_schema(conn)
     print("Application startup: Database tables checked/created.")
     
     # Panggil salah satu fungsinya untuk memicu inisialisasi awal
@@ -24,9 +32,23 @@ async def lifespan(app: FastAPI):
     if face_app.app is None:
         print("Face analysis model failed to load. Application might not function correctly.")
     
+    # Jalankan sweeper penghapusan file & rekonsiliasi storage di latar belakang
+    background_tasks = file_gc_service.start_file_gc_tasks()
+    # Lanjutkan pencarian Google Drive yang terhenti (misal karena restart)
+    background_tasks += drive_job_service.start_drive_job_tasks()
+    # Rekonsiliasi counter foto/wajah/storage per event
+    background_tasks += event_stats_service.start_event_stats_tasks()
+    # Penulisan log akses event per batch
+    activity_service.start_activity_writer()
+    
     yield # Aplikasi siap
 
-    # ... (kode shutdown)
+    # --- Kode yang berjalan saat SHUTDOWN ---
+    await drive_job_service.stop_running_jobs()
+    await activity_service.stop_activity_writer()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
 
 
 app = FastAPI(
@@ -47,6 +69,7 @@ app.include_router(activity_router.router, prefix="/activity", tags=["Activity"]
 app.include_router(fotota_router.router, prefix="/fotota", tags=["Fotota"])
 app.include_router(drive_search_router.router, prefix="/drive-searches", tags=["Google Drive Search"])
 app.include_router(redirect_router.router, prefix="/r", tags=["Redirect"])
+app.include_router(media_router.router, prefix="/media", tags=["Media"])
 
 @app.get('/', tags=["Welcome"])
 async def welcome_message():
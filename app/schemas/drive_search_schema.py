@@ -48,4 +48,12 @@ class DriveSearchResultResponse(BaseModel):
     drive_name: str = None
     drive_url: Optional[HttpUrl] = None
     created_at: datetime
+    # Progres pencarian (total_files terus bertambah selama subfolder masih ditelusuri)
+    total_files: Optional[int] = None
+    processed_files: int = 0
+    matches_found: int = 0
+    download_seconds: float = 0
+    inference_seconds: float = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     found_images: List[FoundDriveImagePublic] = []
\ No newline at end of file
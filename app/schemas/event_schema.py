@@ -45,6 +45,11 @@ class EventInDBBase(EventBase):
     created_at: datetime
     updated_at: datetime
     images_preview: List[str] = [] # Field baru untuk preview gambar
+    # Statistik event dari counter denormalisasi (tanpa agregasi saat request)
+    photo_count: int = 0
+    face_count: int = 0
+    indexed_photo_count: int = 0
+    storage_bytes: int = 0
 
     class Config:
         from_attributes = True
@@ -1,5 +1,6 @@
 # app/schemas/image_schema.py
 from enum import Enum
+from typing import Optional
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -8,6 +9,12 @@ class ImagePublic(BaseModel):
     file_name: str
     url: str
     id_event: int
+    taken_at: Optional[datetime] = None # Waktu pengambilan foto (EXIF)
+    orientation: Optional[int] = None   # Nilai orientasi EXIF (1-8)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -16,6 +23,7 @@ class ImagePublic(BaseModel):
 # Enum untuk validasi parameter sorting
 class ImageSortBy(str, Enum):
     created_at = "created_at"
+    taken_at = "taken_at"
     file_name = "file_name"
 
 class SortOrder(str, Enum):
@@ -1,6 +1,9 @@
 # app/schemas/pagination_schema.py
 
-from typing import Generic, TypeVar, List, Optional
+import json
+import base64
+import binascii
+from typing import Any, Generic, TypeVar, List, Optional
 from pydantic import BaseModel, Field
 
 # Membuat tipe generik yang bisa menampung skema apapun (misal: ImagePublic)
@@ -17,4 +20,31 @@ class PaginatedResponse(BaseModel, Generic[DataType]):
     total_pages: int = Field(..., description="Jumlah total halaman yang tersedia")
     current_page: int = Field(..., description="Halaman saat ini")
     limit: int = Field(..., description="Jumlah item per halaman")
-    items: List[DataType] = Field(..., description="Daftar item untuk halaman ini")
\ No newline at end of file
+    items: List[DataType] = Field(..., description="Daftar item untuk halaman ini")
+
+class CursorPage(BaseModel, Generic[DataType]):
+    '''
+    Skema untuk respons berbasis cursor (infinite scroll).
+    Klien cukup mengirim kembali `next_cursor` untuk mengambil halaman berikutnya;
+    biayanya sama untuk halaman pertama maupun halaman ke-200.
+    '''
+    limit: int = Field(..., description="Jumlah item per halaman")
+    next_cursor: Optional[str] = Field(None, description="Cursor untuk halaman berikutnya, null jika sudah habis")
+    total_items: Optional[int] = Field(None, description="Jumlah total item, hanya diisi jika include_total=true")
+    items: List[DataType] = Field(..., description="Daftar item untuk halaman ini")
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Membungkus posisi terakhir sebuah halaman (list nilai JSON) menjadi cursor opaque."""
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Kebalikan dari encode_cursor. Melempar ValueError jika cursor rusak."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
@@ -11,6 +11,9 @@ class TokenPayload(BaseModel):
     sub: str = Field(..., description="Subject of the token (usually user ID or email)")
     type: Optional[str] = None      # Untuk membedakan tipe token, misal 'event_access'
     event_id: Optional[int] = None  # Untuk menyimpan ID event di dalam token
+    ver: Optional[int] = None       # token_version user saat access token dibuat
+    jti: Optional[str] = None       # ID unik refresh token
+    fam: Optional[str] = None       # Family (rantai rotasi) refresh token
 
 class GoogleLoginRequest(BaseModel):
     # Client akan mengirim salah satu dari ini:
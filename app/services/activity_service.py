@@ -0,0 +1,33 @@
+# app/services/activity_service.py
+
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.crud import crud_activity
+from app.db.batch_writer import AsyncBatchWriter
+
+# Akses event ditampung di memori lalu di-upsert per batch,
+# sehingga request unlock event tidak menunggu tulisan ke database.
+_activity_writer = AsyncBatchWriter(
+    crud_activity.upsert_activities,
+    max_rows=settings.ACTIVITY_BATCH_SIZE, max_seconds=settings.ACTIVITY_FLUSH_SECONDS,
+    # Log akses bersifat best-effort: saat database mati, simpan paling banyak beberapa batch
+    max_buffered_rows=settings.ACTIVITY_BATCH_SIZE * settings.ACTIVITY_MAX_BUFFERED_BATCHES
+)
+
+def record_event_access(*, user_id: int, event_id: int) -> None:
+    """Mencatat bahwa user mengakses sebuah event. Tidak pernah menunggu database."""
+    _activity_writer.add_nowait({
+        "id_user": user_id, "id_event": event_id, "accessed_at": datetime.now(timezone.utc)
+    })
+
+def start_activity_writer() -> None:
+    """Menjalankan flush berkala aktivitas. Dipanggil saat startup."""
+    _activity_writer.start()
+
+async def stop_activity_writer() -> None:
+    """Menyimpan sisa aktivitas yang masih tertampung. Dipanggil saat shutdown."""
+    try:
+        await _activity_writer.close()
+    except Exception as e:
+        print(f"ACTIVITY: Failed to flush pending activities on shutdown. Error: {e}")
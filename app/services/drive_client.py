@@ -0,0 +1,79 @@
+# app/services/drive_client.py
+
+import json
+import threading
+from functools import lru_cache
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+
+from app.core.config import settings
+from .drive_scheduler import drive_scheduler
+
+DRIVE_DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/drive/v3/rest"
+
+# httplib2 tidak thread-safe: setiap thread memegang client & koneksi HTTP-nya sendiri
+_thread_local = threading.local()
+
+@lru_cache(maxsize=1)
+def _drive_discovery_document() -> str:
+    """
+    Discovery document Drive v3. Memakai salinan statis yang ikut terpasang
+    bersama google-api-python-client, sehingga tidak ada request jaringan.
+    Jika tidak tersedia, dokumen diambil sekali lalu disimpan di memori.
+    """
+    document = get_static_doc("drive", "v3")
+    if document:
+        return document
+    response, content = httplib2.Http(timeout=settings.DRIVE_HTTP_TIMEOUT_SECONDS).request(DRIVE_DISCOVERY_URL, "GET")
+    if response.status != 200:
+        raise Exception(f"Failed to fetch the Drive discovery document (status {response.status}).")
+    # Validasi JSON sebelum disimpan di cache
+    json.loads(content)
+    return content.decode("utf-8") if isinstance(content, bytes) else content
+
+def get_http() -> httplib2.Http:
+    """
+    Koneksi HTTP milik thread saat ini (keep-alive, dipakai ulang antar request).
+    Dipakai juga untuk request non-API seperti thumbnail.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        http = _thread_local.http = httplib2.Http(timeout=settings.DRIVE_HTTP_TIMEOUT_SECONDS)
+    return http
+
+def get_drive_client():
+    """
+    Google Drive v3 client milik thread saat ini. Dibuat sekali per thread dari
+    discovery document yang sudah di-cache, sehingga pemanggilan berikutnya tanpa biaya.
+    Aman dipakai banyak pencarian secara bersamaan.
+    DRIVE_API_ROOT_URL bisa diisi untuk mengarahkan client ke server Drive palsu saat pengujian.
+    """
+    client = getattr(_thread_local, "drive_client", None)
+    if client is None:
+        client_options = {"api_endpoint": settings.DRIVE_API_ROOT_URL} if settings.DRIVE_API_ROOT_URL else None
+        client = _thread_local.drive_client = build_from_document(
+            _drive_discovery_document(),
+            developerKey=settings.GOOGLE_API_KEY,
+            http=get_http(),
+            client_options=client_options
+        )
+    return client
+
+def execute(request):
+    """Menjalankan request Drive API (blocking) melalui penjadwal kuota bersama."""
+    return drive_scheduler.call(request.execute)
+
+def fetch_url(url: str) -> bytes:
+    """
+    Mengambil URL milik Drive di luar API (misal thumbnailLink) melalui penjadwal kuota.
+    Status selain 200 dilempar sebagai HttpError agar bisa di-retry seperti request API.
+    """
+    def _request() -> bytes:
+        response, content = get_http().request(url, "GET")
+        if response.status != 200:
+            raise HttpError(response, content, uri=url)
+        return content
+    return drive_scheduler.call(_request)
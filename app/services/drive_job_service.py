@@ -0,0 +1,75 @@
+# app/services/drive_job_service.py
+
+import asyncio
+import os
+import socket
+import uuid
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.periodic import run_periodically
+from app.crud import crud_drive_search
+from app.db.database import AsyncSessionLocal
+from . import drive_service
+
+# Identitas unik worker ini (host + PID + acak) sebagai pemegang lease pencarian
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Pencarian yang sedang berjalan di proses ini: {search_id: Task}
+_running_jobs: Dict[int, asyncio.Task] = {}
+
+async def _run_job(search_id: int) -> None:
+    """Mengambil lease sebuah pencarian lalu menjalankannya sampai selesai."""
+    try:
+        async with AsyncSessionLocal() as db:
+            search = await crud_drive_search.claim_drive_search(
+                db, search_id=search_id, owner=WORKER_ID, lease_seconds=settings.DRIVE_JOB_LEASE_SECONDS
+            )
+            if search is None:
+                return # Sudah selesai atau sedang dijalankan worker lain
+            if search.attempts > settings.DRIVE_JOB_MAX_ATTEMPTS:
+                print(f"DRIVE SEARCH JOB: search_id {search_id} exceeded {settings.DRIVE_JOB_MAX_ATTEMPTS} attempts.")
+                await crud_drive_search.update_drive_search_status(db, search_id=search_id, status="failed", lease_owner=WORKER_ID)
+                return
+
+        try:
+            await drive_service.run_drive_search_and_save(search_id, lease_owner=WORKER_ID)
+        except asyncio.CancelledError:
+            # Shutdown: lepas lease agar worker lain bisa langsung melanjutkan dari checkpoint
+            async with AsyncSessionLocal() as db:
+                await crud_drive_search.release_drive_search_lease(db, search_id=search_id, owner=WORKER_ID)
+            raise
+    finally:
+        _running_jobs.pop(search_id, None)
+
+def start_drive_search_job(search_id: int) -> None:
+    """Menjalankan sebuah pencarian di proses ini (tidak melakukan apa-apa jika sudah berjalan)."""
+    if search_id not in _running_jobs:
+        _running_jobs[search_id] = asyncio.create_task(_run_job(search_id))
+
+async def resume_stale_drive_searches() -> None:
+    """
+    Melanjutkan pencarian 'processing' yang tidak dipegang worker mana pun,
+    misalnya karena proses sebelumnya mati saat deploy/crash.
+    """
+    capacity = settings.DRIVE_JOB_MAX_RUNNING - len(_running_jobs)
+    if capacity <= 0:
+        return
+    async with AsyncSessionLocal() as db:
+        search_ids = await crud_drive_search.get_resumable_search_ids(db, limit=capacity)
+    for search_id in search_ids:
+        print(f"DRIVE SEARCH JOB: Resuming search_id {search_id}")
+        start_drive_search_job(search_id)
+
+def start_drive_job_tasks() -> List[asyncio.Task]:
+    """Menjalankan loop pelanjut pencarian di latar belakang. Dipanggil saat startup."""
+    return [
+        asyncio.create_task(run_periodically("drive-search-resume", settings.DRIVE_JOB_RESUME_INTERVAL_SECONDS, resume_stale_drive_searches)),
+    ]
+
+async def stop_running_jobs() -> None:
+    """Menghentikan semua pencarian yang berjalan di proses ini. Dipanggil saat shutdown."""
+    jobs = list(_running_jobs.values())
+    for job in jobs:
+        job.cancel()
+    await asyncio.gather(*jobs, return_exceptions=True)
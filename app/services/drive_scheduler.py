@@ -0,0 +1,144 @@
+# app/services/drive_scheduler.py
+
+import random
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+from app.core.config import settings
+
+# Alasan error 403 dari Drive API yang berarti kena rate limit (bukan masalah izin)
+RATE_LIMIT_REASONS = ("userRateLimitExceeded", "rateLimitExceeded", "sharingRateLimitExceeded")
+
+class DriveRequestScheduler:
+    """
+    Penjadwal bersama untuk SEMUA request ke Google Drive dari proses ini (thread-safe):
+    - Token bucket: rata-rata `rate_per_second` request per detik, boleh burst sampai `burst`.
+    - Batas jumlah request yang berjalan bersamaan di semua pencarian (`max_concurrency`).
+    - Retry dengan jittered exponential backoff untuk 403 rate limit, 429, 5xx dan error jaringan.
+      Saat kena rate limit, SEMUA thread ikut menahan request sampai jeda backoff selesai
+      (adaptive), agar kuota tidak terus dihantam.
+    - Metrik sederhana (jumlah request, retry, waktu tertahan) untuk endpoint admin.
+    """
+
+    def __init__(
+        self, *, rate_per_second: float, burst: int, max_concurrency: int,
+        max_retries: int, base_delay_seconds: float, max_delay_seconds: float
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._metrics = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "network_errors": 0,
+            "failures": 0,
+            "throttle_wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def _reserve_token(self) -> float:
+        """Mengambil satu token dan mengembalikan berapa detik harus menunggu sebelum request dikirim."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+            self._refilled_at = now
+            # Token boleh minus (reservasi), sehingga thread dilayani sesuai urutan datang
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate_per_second
+            return max(wait, self._paused_until - now)
+
+    def _record(self, **increments) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self._metrics[key] += value
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        # "Full jitter": acak antara 0 dan batas exponential, agar thread tidak retry bersamaan
+        delay = random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    @staticmethod
+    def _classify(error: Exception) -> Optional[str]:
+        """Mengembalikan jenis error yang boleh di-retry, atau None jika tidak boleh."""
+        if isinstance(error, HttpError):
+            status_code = error.resp.status
+            if status_code == 429:
+                return "rate_limited"
+            if status_code == 403 and any(reason in str(error.content) for reason in RATE_LIMIT_REASONS):
+                return "rate_limited"
+            if status_code >= 500:
+                return "server_errors"
+            return None
+        if isinstance(error, (socket.timeout, ConnectionError, TimeoutError)):
+            return "network_errors"
+        return None
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        if isinstance(error, HttpError):
+            try:
+                return float(error.resp.get("retry-after"))
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Menjalankan satu request Drive (blocking) melalui penjadwal, dengan retry bila perlu."""
+        attempt = 0
+        while True:
+            wait = self._reserve_token()
+            if wait > 0:
+                self._record(throttle_wait_seconds=wait)
+                time.sleep(wait)
+
+            with self._slots:
+                self._record(requests=1)
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    kind = self._classify(e)
+                    if kind is None or attempt >= self.max_retries:
+                        self._record(failures=1)
+                        raise
+                    error = e
+
+            delay = self._retry_delay(attempt, self._retry_after(error))
+            self._record(**{kind: 1, "retries": 1, "backoff_seconds": delay})
+            if kind == "rate_limited":
+                # Tahan semua request (bukan hanya thread ini) sampai jeda selesai
+                with self._lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Salinan metrik saat ini."""
+        with self._lock:
+            return {
+                **self._metrics,
+                "available_tokens": round(max(self._tokens, 0.0), 2),
+                "paused_for_seconds": round(max(self._paused_until - time.monotonic(), 0.0), 2),
+            }
+
+# Satu penjadwal untuk seluruh proses, dipakai bersama oleh semua pencarian
+drive_scheduler = DriveRequestScheduler(
+    rate_per_second=settings.DRIVE_REQUESTS_PER_SECOND,
+    burst=settings.DRIVE_REQUEST_BURST,
+    max_concurrency=settings.DRIVE_MAX_CONCURRENT_REQUESTS,
+    max_retries=settings.DRIVE_MAX_RETRIES,
+    base_delay_seconds=settings.DRIVE_BACKOFF_BASE_SECONDS,
+    max_delay_seconds=settings.DRIVE_BACKOFF_MAX_SECONDS,
+)
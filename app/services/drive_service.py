@@ -1,155 +1,668 @@
 # app/services/drive_service.py
 
+import os
+import re
 import logging
 import io
+import mimetypes
+import time
 import cv2
 import uuid
-import os
+import asyncio
+import threading
 import numpy as np
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set, Tuple
 from fastapi.concurrency import run_in_threadpool
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 
 from app.core.config import settings
-from app.core.model_loader import face_app
+from app.core.model_loader import face_app, FACE_MODEL_VERSION
 from app.db.database import AsyncSessionLocal
-from app.crud import crud_drive_search
-from .face_recognition_service import convert_public_url_to_local_path
-
-def _blocking_drive_search(folder_id: str, selfie_embedding: np.ndarray) -> List[Dict[str, Any]]:
-    """Fungsi sinkron yang berisi logika inti dari pencarian gambar di shared drive."""
-    
-    # 1. Inisialisasi Google Drive service
-    drive_service = build('drive', 'v3', developerKey=settings.GOOGLE_API_KEY)
-    
-    # 2. Ambil daftar file dari folder
-    query = f"'{folder_id}' in parents and mimeType contains 'image/'"
-    results = drive_service.files().list(q=query, pageSize=100, fields="files(id, name)").execute()
-    items = results.get('files', [])
-    
-    if not items:
-        print(f"No images found in Google Drive folder: {folder_id}")
-        return []
-
-    matched_images = []
-    
-    # 3. Loop, download, dan proses setiap gambar
-    for item in items:
-        file_id = item.get('id')
-        file_name = item.get('name')
-        print(f"Processing file: {file_name} (ID: {file_id})")
-        
+from app.crud import crud_drive_search, crud_drive_file_face, crud_drive_folder_index, crud_file_deletion
+from app.db.batch_writer import AsyncBatchWriter
+from app.db.models import DriveSearch
+from .drive_client import get_drive_client, execute, fetch_url
+from .drive_scheduler import drive_scheduler
+from .face_recognition_service import get_selfie_embedding
+from .storage_service import get_storage, public_url_for_key, key_from_public_url
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+SHORTCUT_MIME_TYPE = 'application/vnd.google-apps.shortcut'
+# Field metadata file yang dibutuhkan pencarian
+DRIVE_FILE_FIELDS = "id, name, mimeType, md5Checksum, modifiedTime, thumbnailLink, imageMediaMetadata(width, height)"
+
+# Field yang disimpan di snapshot index folder
+DRIVE_SNAPSHOT_FIELDS = ('id', 'name', 'mimeType', 'md5Checksum', 'modifiedTime', 'imageMediaMetadata')
+
+DRIVE_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.heic', '.gif', '.bmp', '.tif', '.tiff')
+
+# Versi cache deteksi Drive: model + ukuran thumbnail yang dipakai untuk deteksi
+DRIVE_INDEX_VERSION = f"{FACE_MODEL_VERSION}-s{settings.DRIVE_THUMBNAIL_SIZE}"
+# Deteksi dari file asli (fallback jika thumbnail tidak tersedia) disimpan dengan versi terpisah
+DRIVE_ORIGINAL_INDEX_VERSION = f"{FACE_MODEL_VERSION}-orig"
+# Urutan pencarian cache: hasil dari file asli lebih akurat, jadi diutamakan
+DRIVE_CACHED_INDEX_VERSIONS = (DRIVE_ORIGINAL_INDEX_VERSION, DRIVE_INDEX_VERSION)
+
+# Executor khusus pencarian Drive:
+# - download: banyak thread karena sebagian besar waktunya menunggu jaringan
+# - inference: sedikit thread agar model tidak berebut core CPU
+_download_executor = ThreadPoolExecutor(max_workers=settings.DRIVE_DOWNLOAD_CONCURRENCY, thread_name_prefix="drive-download")
+_inference_executor = ThreadPoolExecutor(max_workers=settings.DRIVE_INFERENCE_WORKERS, thread_name_prefix="drive-inference")
+
+# Penanda pembatalan untuk pencarian yang sedang berjalan di proses ini: {search_id: Event}
+_cancel_events: Dict[int, threading.Event] = {}
+
+class DriveSearchCancelled(Exception):
+    """Dilempar di dalam worker saat pencarian dibatalkan oleh pengguna."""
+
+def request_cancel(search_id: int) -> None:
+    """Memberi tanda batal ke pencarian yang sedang berjalan di proses ini (jika ada)."""
+    cancel_event = _cancel_events.get(search_id)
+    if cancel_event is not None:
+        cancel_event.set()
+
+def _blocking_list_folder_page(folder_id: str, page_token: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Mengambil satu halaman isi folder (gambar, subfolder & shortcut). Mengembalikan (files, nextPageToken)."""
+    query = (
+        f"'{folder_id}' in parents and trashed = false and "
+        f"(mimeType contains 'image/' or mimeType = '{FOLDER_MIME_TYPE}' or mimeType = '{SHORTCUT_MIME_TYPE}')"
+    )
+    response = execute(get_drive_client().files().list(
+        q=query,
+        pageSize=1000, # Nilai maksimum yang diizinkan Drive API
+        pageToken=page_token,
+        fields=f"nextPageToken, files({DRIVE_FILE_FIELDS}, shortcutDetails(targetId, targetMimeType))",
+        supportsAllDrives=True,
+        includeItemsFromAllDrives=True
+    ))
+    return response.get('files', []), response.get('nextPageToken')
+
+def _blocking_get_file(file_id: str) -> Dict[str, Any]:
+    """Mengambil metadata satu file (dipakai untuk target shortcut)."""
+    return execute(get_drive_client().files().get(
+        fileId=file_id, fields=DRIVE_FILE_FIELDS, supportsAllDrives=True
+    ))
+
+def _blocking_get_thumbnail_link(file_id: str) -> Optional[str]:
+    """Mengambil thumbnailLink baru untuk file dari snapshot (link lama tidak disimpan karena kedaluwarsa)."""
+    return execute(get_drive_client().files().get(
+        fileId=file_id, fields="thumbnailLink", supportsAllDrives=True
+    )).get('thumbnailLink')
+
+async def _crawl_folder_images(
+    root_folder_id: str, *, run_timed, pages: asyncio.Queue, cancel_event: threading.Event
+) -> None:
+    """
+    Menelusuri folder secara breadth-first sampai DRIVE_MAX_DEPTH, dengan
+    DRIVE_LIST_CONCURRENCY folder di-listing bersamaan. Setiap halaman gambar
+    langsung dikirim ke `pages`, sehingga download sudah bisa dimulai sebelum
+    seluruh pohon folder selesai di-listing.
+    Folder yang sudah dikunjungi dilewati (mencegah siklus lewat shortcut), file
+    yang sama hanya dikirim sekali, dan penelusuran berhenti di DRIVE_MAX_FILES gambar.
+    Error pada folder utama dilempar; error pada subfolder hanya dicatat.
+    """
+    folders = asyncio.Queue()
+    folders.put_nowait((root_folder_id, 0))
+    visited_folders = {root_folder_id}
+    seen_files = set()
+    root_errors = []
+
+    def _is_done() -> bool:
+        return cancel_event.is_set() or len(seen_files) >= settings.DRIVE_MAX_FILES
+
+    def _add_folder(folder_id: str, depth: int):
+        if depth <= settings.DRIVE_MAX_DEPTH and folder_id not in visited_folders:
+            visited_folders.add(folder_id)
+            folders.put_nowait((folder_id, depth))
+
+    async def _lister():
+        while True:
+            folder_id, depth = await folders.get()
+            try:
+                page_token = None
+                while not _is_done():
+                    files, page_token = await run_timed(
+                        _download_executor, "download_seconds", _blocking_list_folder_page, folder_id, page_token
+                    )
+                    images = []
+                    for item in files:
+                        mime_type = item.get('mimeType', '')
+                        if mime_type == SHORTCUT_MIME_TYPE:
+                            target = item.get('shortcutDetails') or {}
+                            if target.get('targetMimeType') == FOLDER_MIME_TYPE:
+                                _add_folder(target.get('targetId'), depth + 1)
+                                continue
+                            if not (target.get('targetMimeType') or '').startswith('image/') or target.get('targetId') in seen_files:
+                                continue
+                            try:
+                                item = await run_timed(_download_executor, "download_seconds", _blocking_get_file, target['targetId'])
+                            except Exception as e:
+                                print(f"Could not resolve Drive shortcut {item.get('name')}. Error: {e}")
+                                continue
+                            mime_type = item.get('mimeType', '')
+                        if mime_type == FOLDER_MIME_TYPE:
+                            _add_folder(item['id'], depth + 1)
+                        elif mime_type.startswith('image/') and item['id'] not in seen_files and not _is_done():
+                            seen_files.add(item['id'])
+                            images.append(item)
+                    if images:
+                        await pages.put(images)
+                    if not page_token:
+                        break
+            except Exception as e:
+                if depth == 0:
+                    root_errors.append(e)
+                else:
+                    print(f"Failed to list Drive subfolder {folder_id}. Error: {e}")
+            finally:
+                folders.task_done()
+
+    listers = [asyncio.create_task(_lister()) for _ in range(settings.DRIVE_LIST_CONCURRENCY)]
+    try:
+        await folders.join()
+    finally:
+        for lister in listers:
+            lister.cancel()
+    if root_errors:
+        raise root_errors[0]
+    print(f"Crawled {len(visited_folders)} folder(s) under {root_folder_id}, found {len(seen_files)} images.")
+
+def _blocking_download_file(file_id: str, cancel_event: Optional[threading.Event] = None) -> bytes:
+    """Men-download satu file dari Drive ke memori. Dihentikan di antara chunk jika pencarian dibatalkan."""
+    request = get_drive_client().files().get_media(fileId=file_id)
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request, chunksize=4 * 1024 * 1024)
+    done = False
+    while done is False:
+        if cancel_event is not None and cancel_event.is_set():
+            raise DriveSearchCancelled()
+        # Setiap chunk adalah satu request, jadi dijadwalkan (dan di-retry) satu per satu
+        status, done = drive_scheduler.call(downloader.next_chunk)
+    return fh.getvalue()
+
+def _timed_call(fn, *args):
+    """Menjalankan fungsi blocking dan mengembalikan (hasil, durasi dalam detik)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def _blocking_download_thumbnail(thumbnail_link: str, size: int) -> bytes:
+    """
+    Men-download thumbnail sebuah file Drive dengan sisi terpanjang `size` px.
+    thumbnailLink berakhiran '=s220', ukurannya bisa diganti langsung di URL.
+    """
+    url = re.sub(r"=s\d+$", "", thumbnail_link) + f"=s{size}"
+    return fetch_url(url)
+
+def _original_size(item: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """Ukuran (width, height) file asli menurut metadata Drive, None jika tidak tersedia."""
+    metadata = item.get('imageMediaMetadata') or {}
+    if metadata.get('width') and metadata.get('height'):
+        return int(metadata['width']), int(metadata['height'])
+    return None
+
+def _scale_boxes(boxes: List[dict], detected_size: Tuple[int, int], original_size: Tuple[int, int]) -> List[dict]:
+    """
+    Memetakan bounding box dari thumbnail ke ukuran asli.
+    Metadata Drive mencatat ukuran sebelum rotasi EXIF, sedangkan thumbnail
+    (dan hasil decode OpenCV) sudah dirotasi, jadi sisi asli ditukar jika
+    orientasi thumbnail berbeda dengan orientasi file asli.
+    """
+    original_w, original_h = original_size
+    detected_w, detected_h = detected_size
+    if (detected_w > detected_h) != (original_w > original_h) and detected_w != detected_h:
+        original_w, original_h = original_h, original_w
+    scale_x, scale_y = original_w / detected_w, original_h / detected_h
+    return [
+        {"x": int(b["x"] * scale_x), "y": int(b["y"] * scale_y), "w": int(b["w"] * scale_x), "h": int(b["h"] * scale_y)}
+        for b in boxes
+    ]
+
+def _content_version(item: Dict[str, Any]) -> str:
+    """Penanda isi file Drive: md5Checksum, atau modifiedTime untuk file yang tidak punya checksum."""
+    return item.get('md5Checksum') or item.get('modifiedTime') or ""
+
+def _blocking_detect_faces(image_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Mendeteksi SEMUA wajah di sebuah gambar.
+    Mengembalikan matriks embedding float32, bounding box dan ukuran gambar,
+    atau None jika gambar tidak bisa di-decode.
+    """
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+
+    height, width = img.shape[:2]
+    faces = face_app.app.get(img)
+    boxes = [
+        {"x": int(f.bbox[0]), "y": int(f.bbox[1]), "w": int(f.bbox[2]-f.bbox[0]), "h": int(f.bbox[3]-f.bbox[1])}
+        for f in faces
+    ]
+    embeddings = np.array([f.normed_embedding for f in faces], dtype=np.float32)
+    return {"embeddings": embeddings, "boxes": boxes, "size": (width, height)}
+
+def _best_match(embeddings: np.ndarray, boxes: List[dict], selfie_embedding: np.ndarray, threshold: float) -> Optional[Dict[str, Any]]:
+    """Mengambil wajah dengan kemiripan tertinggi terhadap selfie jika melewati threshold."""
+    if len(boxes) == 0:
+        return None
+    # Cosine similarity semua wajah sekaligus (embedding sudah ternormalisasi)
+    similarities = embeddings.reshape(len(boxes), -1) @ selfie_embedding
+    best = int(np.argmax(similarities))
+    if similarities[best] > threshold: # Threshold kemiripan
+        return {"face_coords": boxes[best], "similarity": float(similarities[best])}
+    return None
+
+def _storage_extension(file_name: Optional[str], mime_type: Optional[str]) -> str:
+    """Menentukan ekstensi file hasil pencarian dari nama file Drive atau mimeType-nya."""
+    extension = os.path.splitext(file_name or "")[1].lower()
+    if extension in DRIVE_IMAGE_EXTENSIONS:
+        return extension
+    return mimetypes.guess_extension(mime_type or "") or ".jpg"
+
+async def _store_found_image(search_id: int, match: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Menyimpan file ASLI (tanpa re-encode) ke storage.
+    Mengembalikan row FoundDriveImage yang siap disimpan oleh batch writer.
+    """
+    unique_filename = f"{uuid.uuid4()}{_storage_extension(match['original_file_name'], match['mime_type'])}"
+    storage_key = f"drive-events/{search_id}/{unique_filename}"
+    await get_storage().save_bytes(storage_key, match["image_bytes"], content_type=match["mime_type"] or "image/jpeg")
+    return {
+        "id_drive_search": search_id,
+        "original_drive_id": match["original_drive_id"],
+        "file_name": unique_filename,
+        "url": public_url_for_key(storage_key),
+        "face_coords": match["face_coords"],
+        "similarity": match["similarity"]
+    }
+
+def _snapshot_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metadata file yang disimpan di snapshot index folder.
+    thumbnailLink tidak disimpan karena URL-nya hanya berlaku sementara;
+    _detect mengambil link baru untuk item yang belum ada di cache deteksi.
+    """
+    return {key: item[key] for key in DRIVE_SNAPSHOT_FIELDS if key in item}
+
+async def _get_folder_snapshot(
+    *, search_id: int, folder_id: str, index_owner: str, lease_owner: str, cancel_event: threading.Event
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Mengambil snapshot index folder yang masih segar (DRIVE_INDEX_TTL_SECONDS).
+    Mengembalikan None jika pencarian ini mendapat lease dan harus meng-crawl folder.
+    Jika pencarian lain sedang meng-crawl folder yang sama, tunggu sampai selesai
+    lalu pakai hasilnya, sehingga crawl pertama yang bersamaan digabung menjadi satu.
+    """
+    while True:
+        async with AsyncSessionLocal() as db:
+            state, snapshot = await crud_drive_folder_index.acquire_folder_index(
+                db, folder_id=folder_id, owner=index_owner,
+                lease_seconds=settings.DRIVE_JOB_LEASE_SECONDS, max_age_seconds=settings.DRIVE_INDEX_TTL_SECONDS
+            )
+        if state == "fresh":
+            return snapshot
+        if state == "acquired":
+            return None
+
+        print(f"Folder {folder_id} is being indexed by another search, search {search_id} is waiting.")
+        await asyncio.sleep(settings.DRIVE_INDEX_POLL_SECONDS)
+        # Heartbeat lease job selama menunggu, sekaligus menangkap pembatalan
+        async with AsyncSessionLocal() as db:
+            current_status = await crud_drive_search.update_drive_search_progress(
+                db, search_id=search_id, values={},
+                lease_owner=lease_owner, lease_seconds=settings.DRIVE_JOB_LEASE_SECONDS
+            )
+        if current_status != "processing" or cancel_event.is_set():
+            cancel_event.set()
+            return []
+
+async def _search_drive_folder(
+    *, search: DriveSearch, selfie_embedding: np.ndarray, cancel_event: threading.Event, lease_owner: str
+) -> Tuple[int, int]:
+    """
+    Inti pencarian gambar di folder Drive.
+    Jika index folder (drive_folder_indexes) masih segar, isi folder diambil dari
+    snapshot-nya tanpa listing ulang. Jika tidak, folder beserta subfolder-nya
+    ditelusuri oleh crawler (delta crawl: file yang tidak berubah tetap memakai
+    cache deteksi), dan setiap halaman hasil listing langsung diproses: hasil deteksi yang sudah ada di cache
+    (drive_file_faces) dicocokkan dengan selfie tanpa download maupun inference. File yang belum ada di cache dideteksi dari thumbnail-nya,
+    dan file asli hanya di-download untuk gambar yang cocok. Semua download
+    dijalankan oleh sejumlah worker (DRIVE_DOWNLOAD_CONCURRENCY) secara paralel.
+    Deteksi wajah berjalan di executor terpisah, sehingga selagi satu worker
+    menjalankan model, worker lain tetap men-download file berikutnya.
+    Setiap gambar yang cocok langsung disimpan ke storage oleh satu coroutine penulis;
+    record-nya dan hasil deteksi baru disimpan per batch (AsyncBatchWriter) dengan
+    sesi database berumur pendek, sehingga hasil parsial sudah terlihat selagi
+    pencarian berjalan tanpa menahan koneksi pool sepanjang pencarian.
+    Penulis juga mencatat progres & checkpoint file secara berkala (sekaligus
+    memperpanjang lease job); worker berhenti setelah file yang sedang diproses
+    jika cancel_event di-set atau lease diambil alih worker lain.
+    File yang sudah di-checkpoint pada percobaan sebelumnya dilewati.
+    Mengembalikan jumlah gambar yang cocok dan jumlah file yang gagal diproses
+    (file tersebut tidak di-checkpoint, sehingga dicoba lagi pada percobaan berikutnya).
+    """
+    loop = asyncio.get_running_loop()
+    search_id, folder_id = search.id, search.drive_folder_id
+    stats = {"total_files": 0, "processed_files": 0, "download_seconds": search.download_seconds or 0.0, "inference_seconds": search.inference_seconds or 0.0}
+    failed_files: List[str] = []
+
+    async def _run_timed(executor, stat: str, fn, *args):
+        result, elapsed = await loop.run_in_executor(executor, _timed_call, fn, *args)
+        stats[stat] += elapsed
+        return result
+
+    threshold = settings.DRIVE_MATCH_THRESHOLD
+    async with AsyncSessionLocal() as db:
+        # Lanjutkan dari checkpoint percobaan sebelumnya (jika ada)
+        done_file_ids = await crud_drive_search.get_checkpointed_file_ids(db, search_id=search_id)
+        match_count = await crud_drive_search.count_found_images(db, search_id=search_id)
+    if done_file_ids:
+        print(f"Resuming search {search_id}: {len(done_file_ids)} images already processed.")
+
+    # Pemegang lease crawl folder: unik per pencarian, walaupun satu worker menjalankan beberapa pencarian
+    index_owner = f"{lease_owner}:{search_id}"
+    snapshot = await _get_folder_snapshot(
+        search_id=search_id, folder_id=folder_id, index_owner=index_owner, lease_owner=lease_owner, cancel_event=cancel_event
+    )
+    crawled_items = [] if snapshot is None else None
+    if snapshot:
+        print(f"Using the shared index of folder {folder_id} ({len(snapshot)} images).")
+
+    pages = asyncio.Queue(maxsize=settings.DRIVE_LIST_CONCURRENCY * 2)
+    pending = asyncio.Queue()
+
+    async def _dispatch():
+        """
+        Menerima halaman gambar dari crawler (atau snapshot index folder): file yang
+        sudah di-checkpoint dilewati, file yang ada di cache dicocokkan langsung,
+        sisanya diteruskan ke worker.
+        """
+        async def _crawl():
+            try:
+                if snapshot is not None:
+                    for start in range(0, len(snapshot), 1000):
+                        await pages.put(snapshot[start:start + 1000])
+                else:
+                    await _crawl_folder_images(folder_id, run_timed=_run_timed, pages=pages, cancel_event=cancel_event)
+            finally:
+                await pages.put(None) # Tanda crawl selesai
+
+        crawl_task = asyncio.create_task(_crawl())
         try:
-            # Download file ke memori
-            request = drive_service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            # Ubah byte data menjadi gambar OpenCV
-            fh.seek(0)
-            image_bytes = np.frombuffer(fh.read(), np.uint8)
-            img = cv2.imdecode(image_bytes, cv2.IMREAD_COLOR)
-
-            if img is None: continue
-            
-            # Deteksi wajah di gambar dari Drive
-            faces_in_image = face_app.app.get(img)
-
-            # Bandingkan setiap wajah dengan embedding selfie
-            for face in faces_in_image:
-                similarity = np.dot(selfie_embedding, face.normed_embedding)
-                if similarity > 0.5: # Threshold kemiripan
-                    bbox = face.bbox
-                    matched_images.append({
-                        "original_drive_id": file_id,
-                        "original_file_name": file_name,
-                        "face_coords": {"x": int(bbox[0]), "y": int(bbox[1]), "w": int(bbox[2]-bbox[0]), "h": int(bbox[3]-bbox[1])},
-                        "similarity": float(similarity),
-                        "image_bytes": cv2.imencode('.jpg', img)[1].tobytes() # Simpan gambar sebagai bytes
-                    })
-                    print(f"✅ Match found in {file_name} with similarity {similarity:.2f}")
-                    break # Lanjut ke gambar berikutnya setelah menemukan 1 wajah cocok
-        except Exception as e:
-            print(f"Failed to process file {file_name} from Drive. Error: {e}")
-            continue
-            
-    return matched_images
-
-async def run_drive_search_and_save(search_id: int, folder_id: str, user_selfie_url: str):
-    """Fungsi pembungkus asinkron untuk dijalankan sebagai background task."""
+            while (items := await pages.get()) is not None:
+                if crawled_items is not None:
+                    crawled_items.extend(_snapshot_item(item) for item in items)
+                stats["total_files"] += len(items)
+                stats["processed_files"] += sum(1 for item in items if item['id'] in done_file_ids)
+                items = [item for item in items if item['id'] not in done_file_ids]
+                async with AsyncSessionLocal() as db:
+                    cached_faces = await crud_drive_file_face.get_cached_faces(
+                        db,
+                        file_versions=[(item['id'], _content_version(item)) for item in items],
+                        model_versions=DRIVE_CACHED_INDEX_VERSIONS
+                    )
+                for item in items:
+                    cached = cached_faces.get(item['id'])
+                    if cached is None:
+                        pending.put_nowait((item, None))
+                        continue
+                    match = _best_match(np.frombuffer(cached.embeddings, dtype=np.float32), cached.boxes, selfie_embedding, threshold)
+                    if match:
+                        # Sudah diketahui cocok, tinggal download file aslinya untuk disimpan
+                        pending.put_nowait((item, match))
+                    else:
+                        stats["processed_files"] += 1
+            await crawl_task # Melempar error listing folder utama (jika ada)
+        finally:
+            crawl_task.cancel()
+            for _ in range(settings.DRIVE_DOWNLOAD_CONCURRENCY):
+                pending.put_nowait(None) # Tanda selesai untuk setiap worker
+
+    # Antrean hasil dibatasi agar memori tetap konstan walaupun penulis tertinggal
+    results = asyncio.Queue(maxsize=settings.DRIVE_DOWNLOAD_CONCURRENCY)
+
+    async def _detect(item: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[bytes]]:
+        """
+        Tahap 1: deteksi wajah pada thumbnail (~DRIVE_THUMBNAIL_SIZE px), koordinat dipetakan
+        ke ukuran asli. Jika thumbnail tidak tersedia/gagal, file asli di-download dan
+        dideteksi langsung. Mengembalikan (hasil deteksi, bytes file asli jika sudah di-download).
+        """
+        original_size = _original_size(item)
+        if original_size:
+            try:
+                thumbnail_link = item.get('thumbnailLink')
+                if not thumbnail_link:
+                    # Item dari snapshot index folder: ambil link baru agar tetap lewat tahap thumbnail
+                    thumbnail_link = await _run_timed(
+                        _download_executor, "download_seconds", _blocking_get_thumbnail_link, item['id']
+                    )
+                if not thumbnail_link:
+                    raise ValueError("Drive returned no thumbnailLink")
+                thumbnail_bytes = await _run_timed(
+                    _download_executor, "download_seconds",
+                    _blocking_download_thumbnail, thumbnail_link, settings.DRIVE_THUMBNAIL_SIZE
+                )
+                detection = await _run_timed(_inference_executor, "inference_seconds", _blocking_detect_faces, thumbnail_bytes)
+                if detection is not None:
+                    detection["boxes"] = _scale_boxes(detection["boxes"], detection["size"], original_size)
+                    return detection, None
+            except Exception as e:
+                print(f"Thumbnail for {item.get('name')} unavailable, falling back to the original. Error: {e}")
+
+        if cancel_event.is_set():
+            raise DriveSearchCancelled()
+        image_bytes = await _run_timed(_download_executor, "download_seconds", _blocking_download_file, item['id'], cancel_event)
+        return await _run_timed(_inference_executor, "inference_seconds", _blocking_detect_faces, image_bytes), image_bytes
+
+    async def _worker():
+        while not cancel_event.is_set():
+            task = await pending.get()
+            if task is None:
+                return
+            item, match = task
+            file_id, file_name = item.get('id'), item.get('name')
+            image_bytes = None
+            try:
+                if match is None:
+                    detection, image_bytes = await _detect(item)
+                    if detection is None:
+                        stats["processed_files"] += 1
+                        await results.put(("done", file_id))
+                        continue
+                    await results.put(("index", {
+                        "drive_file_id": file_id,
+                        "content_version": _content_version(item),
+                        # image_bytes terisi berarti deteksi dilakukan pada file asli, bukan thumbnail
+                        "model_version": DRIVE_INDEX_VERSION if image_bytes is None else DRIVE_ORIGINAL_INDEX_VERSION,
+                        "face_count": len(detection["boxes"]),
+                        "embeddings": detection["embeddings"].tobytes(),
+                        "boxes": detection["boxes"]
+                    }))
+                    match = _best_match(detection["embeddings"], detection["boxes"], selfie_embedding, threshold)
+                # Tahap 2: file asli hanya di-download untuk gambar yang cocok
+                if match and image_bytes is None:
+                    image_bytes = await _run_timed(
+                        _download_executor, "download_seconds", _blocking_download_file, file_id, cancel_event
+                    )
+            except DriveSearchCancelled:
+                return
+            except Exception as e:
+                # Tanpa checkpoint & tidak dihitung selesai: file (termasuk match dari cache yang
+                # gagal di-download) dicoba lagi pada percobaan berikutnya, bukan dilewati selamanya.
+                print(f"Failed to process file {file_name} from Drive, it will be retried on resume. Error: {e}")
+                failed_files.append(file_id)
+                continue
+            stats["processed_files"] += 1
+            if match:
+                print(f"✅ Match found in {file_name} with similarity {match['similarity']:.2f}")
+                await results.put(("match", {
+                    "original_drive_id": file_id,
+                    "original_file_name": file_name,
+                    "mime_type": item.get('mimeType'),
+                    "image_bytes": image_bytes,
+                    **match
+                }))
+            # Checkpoint dikirim SETELAH hasilnya, sehingga file hanya ditandai selesai jika hasilnya tersimpan
+            await results.put(("done", file_id))
+
+    async def _on_found_images_flushed(db, rows: List[dict], inserted_urls: Set[str]):
+        # Duplikat (file sudah tercatat sebelum restart): file yang baru disimpan tidak dipakai
+        duplicate_keys = [key_from_public_url(row["url"]) for row in rows if row["url"] not in inserted_urls]
+        crud_file_deletion.enqueue_file_deletions(db, keys=duplicate_keys)
+
+    def _on_found_images_committed(rows: List[dict], inserted_urls: Set[str]):
+        # Dihitung setelah commit, agar batch yang gagal lalu di-flush ulang tidak terhitung dua kali
+        nonlocal match_count
+        match_count += len(inserted_urls)
+
+    found_images_writer = AsyncBatchWriter(
+        crud_drive_search.add_found_images, on_flush=_on_found_images_flushed, on_commit=_on_found_images_committed,
+        max_rows=settings.DRIVE_RESULT_BATCH_SIZE, max_seconds=settings.DRIVE_PROGRESS_FLUSH_SECONDS
+    )
+    faces_writer = AsyncBatchWriter(
+        crud_drive_file_face.save_faces, max_rows=100, max_seconds=settings.DRIVE_PROGRESS_FLUSH_SECONDS
+    )
+
+    async def _flush_progress(checkpoint_ids: List[str]):
+        """
+        Menyimpan progres & checkpoint ke database sekaligus memperpanjang lease.
+        Hasil & cache deteksi disimpan lebih dulu, sehingga file hanya ditandai selesai
+        jika hasilnya sudah tersimpan. Juga menangkap pembatalan dari proses lain dan
+        lease yang diambil alih worker lain.
+        """
+        await found_images_writer.flush()
+        await faces_writer.flush()
+        async with AsyncSessionLocal() as db:
+            await crud_drive_search.add_checkpoints(db, search_id=search_id, file_ids=checkpoint_ids)
+            if crawled_items is not None:
+                await crud_drive_folder_index.extend_folder_index_lease(
+                    db, folder_id=folder_id, owner=index_owner, lease_seconds=settings.DRIVE_JOB_LEASE_SECONDS
+                )
+            current_status = await crud_drive_search.update_drive_search_progress(
+                db, search_id=search_id, values={**stats, "matches_found": match_count},
+                lease_owner=lease_owner, lease_seconds=settings.DRIVE_JOB_LEASE_SECONDS
+            )
+        if current_status != "processing":
+            cancel_event.set()
+
+    async def _writer():
+        checkpoint_ids = []
+        last_flush = loop.time()
+        while True:
+            try:
+                result = await asyncio.wait_for(results.get(), timeout=settings.DRIVE_PROGRESS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                result = ("tick", None)
+            if result is None:
+                await _flush_progress(checkpoint_ids)
+                return
+            kind, data = result
+            if kind == "index":
+                await faces_writer.add(data)
+            elif kind == "done":
+                checkpoint_ids.append(data)
+            elif kind == "match":
+                await found_images_writer.add(await _store_found_image(search_id, data))
+            # Progres & checkpoint disimpan per interval waktu, bukan per file
+            if loop.time() - last_flush >= settings.DRIVE_PROGRESS_FLUSH_SECONDS:
+                await _flush_progress(checkpoint_ids)
+                checkpoint_ids = []
+                last_flush = loop.time()
+
+    completed = False
+    writer_task = asyncio.create_task(_writer())
+    producers = [asyncio.create_task(_dispatch())]
+    producers += [asyncio.create_task(_worker()) for _ in range(settings.DRIVE_DOWNLOAD_CONCURRENCY)]
+    try:
+        # Jika penulis gagal (mis. storage/DB error) atau folder utama gagal di-listing, pencarian dihentikan
+        all_producers = asyncio.gather(*producers)
+        done, _ = await asyncio.wait([writer_task, all_producers], return_when=asyncio.FIRST_COMPLETED)
+        if writer_task in done:
+            writer_task.result()
+        await all_producers
+        await results.put(None) # Tanda selesai untuk penulis
+        await writer_task
+        completed = not cancel_event.is_set()
+    finally:
+        for task in (*producers, writer_task):
+            task.cancel()
+        if crawled_items is not None:
+            # Simpan snapshot hanya jika crawl & deteksi selesai; jika tidak, cukup lepas lease
+            async with AsyncSessionLocal() as db:
+                await crud_drive_folder_index.release_folder_index(
+                    db, folder_id=folder_id, owner=index_owner, snapshot=crawled_items if completed else None
+                )
+    return match_count, len(failed_files)
+
+async def run_drive_search_and_save(search_id: int, lease_owner: str):
+    """
+    Menjalankan satu sesi pencarian. Dipanggil oleh drive_job_service setelah
+    lease sesi tersebut berhasil diambil oleh worker ini (lease_owner).
+    Setiap akses database memakai sesi berumur pendek.
+    """
     print(f"DRIVE SEARCH TASK: Starting for search_id: {search_id}")
-    db = AsyncSessionLocal()
+    cancel_event = _cancel_events.setdefault(search_id, threading.Event())
     try:
-        # Dapatkan embedding dari selfie user
-        selfie_path = convert_public_url_to_local_path(user_selfie_url)
-        img_selfie = cv2.imread(selfie_path)
-        faces = face_app.app.get(img_selfie)
-        if not faces:
-            raise ValueError("No face found in user's selfie.")
-        selfie_embedding = faces[0].normed_embedding
-
-        # Jalankan pencarian di thread terpisah
-        matched_results = await run_in_threadpool(_blocking_drive_search, folder_id, selfie_embedding)
-        
-        # Simpan setiap hasil ke storage dan database
-        for result in matched_results:
-            unique_filename = f"{uuid.uuid4()}.jpg"
-            file_path_on_disk = settings.STORAGE_ROOT_PATH / "drive-events" / str(search_id) / unique_filename
-            os.makedirs(file_path_on_disk.parent, exist_ok=True)
-            
-            with open(file_path_on_disk, 'wb') as f:
-                f.write(result["image_bytes"])
-            
-            public_url = f"{settings.API_BASE_URL}/media/drive-events/{search_id}/{unique_filename}"
-            
-            await crud_drive_search.add_found_image(
-                db, 
-                search_id=search_id, 
-                image_data={
-                    **result, # Menggabungkan face_coords, similarity, dll
-                    "file_name": unique_filename,
-                    "url": public_url
-                }
-            )
-        
-        # Update status pencarian menjadi 'completed'
-        await crud_drive_search.update_drive_search_status(db, search_id=search_id, status="completed")
-        print(f"✅ DRIVE SEARCH TASK: Finished for search_id: {search_id}. Found {len(matched_results)} matches.")
+        async with AsyncSessionLocal() as db:
+            search = await db.get(DriveSearch, search_id)
+        values = {} if search.started_at else {"started_at": datetime.now(timezone.utc)}
+
+        # Dapatkan embedding dari selfie user (disimpan agar percobaan berikutnya tidak perlu selfie lagi)
+        if search.selfie_embedding:
+            selfie_embedding = np.frombuffer(search.selfie_embedding, dtype=np.float32)
+        else:
+            selfie_embedding = (await get_selfie_embedding(search.selfie_url)).astype(np.float32)
+            values["selfie_embedding"] = selfie_embedding.tobytes()
+        if values:
+            async with AsyncSessionLocal() as db:
+                await crud_drive_search.update_drive_search_progress(
+                    db, search_id=search_id, values=values,
+                    lease_owner=lease_owner, lease_seconds=settings.DRIVE_JOB_LEASE_SECONDS
+                )
+
+        # Jalankan pencarian (listing penuh + download & deteksi paralel),
+        # setiap hasil langsung disimpan ke storage dan database
+        match_count, failed_count = await _search_drive_folder(
+            search=search, selfie_embedding=selfie_embedding, cancel_event=cancel_event, lease_owner=lease_owner
+        )
+        if failed_count and not cancel_event.is_set():
+            # Sesi tetap 'processing' & lease dilepas: loop pelanjut mengulang hanya file yang gagal
+            # (file lain sudah di-checkpoint), dibatasi DRIVE_JOB_MAX_ATTEMPTS sebelum ditandai 'failed'
+            async with AsyncSessionLocal() as db:
+                await crud_drive_search.release_drive_search_lease(db, search_id=search_id, owner=lease_owner)
+            print(f"⚠️ DRIVE SEARCH TASK: {failed_count} files failed for search_id: {search_id}, will be retried on resume.")
+            return
+
+        # Update status pencarian menjadi 'completed' (status 'cancelled' atau lease yang
+        # sudah diambil alih worker lain tidak ditimpa)
+        async with AsyncSessionLocal() as db:
+            await crud_drive_search.update_drive_search_status(db, search_id=search_id, status="completed", lease_owner=lease_owner)
+        print(f"✅ DRIVE SEARCH TASK: Finished for search_id: {search_id}. Found {match_count} matches.")
 
     except Exception as e:
-        await crud_drive_search.update_drive_search_status(db, search_id=search_id, status="failed")
-        print(f"❌ DRIVE SEARCH TASK FAILED for search_id: {search_id}. Error: {e}", exc_info=True)
+        async with AsyncSessionLocal() as db:
+            await crud_drive_search.update_drive_search_status(db, search_id=search_id, status="failed", lease_owner=lease_owner)
+        print(f"❌ DRIVE SEARCH TASK FAILED for search_id: {search_id}. Error: {e}")
     finally:
-        await db.close()
+        _cancel_events.pop(search_id, None)
         
 
-# Kita definisikan service Google Drive di sini
-# API_KEY diambil dari settings yang kita muat dari .env
-try:
-    drive_service = build('drive', 'v3', developerKey=settings.GOOGLE_API_KEY)
-except Exception as e:
-    print(f"Gagal membangun service Google Drive. Pastikan GOOGLE_API_KEY valid. Error: {e}")
-    drive_service = None
-
 def _blocking_get_folder_details(folder_id: str) -> dict:
     """Fungsi sinkron untuk memanggil Google Drive API & mendapatkan metadata folder."""
-    if not drive_service:
-        raise Exception("Google Drive service is not initialized.")
-        
     try:
+        # Client Drive per thread (API_KEY diambil dari settings yang kita muat dari .env)
         # Meminta hanya field 'id' dan 'name' untuk efisiensi
-        file_metadata = drive_service.files().get(
+        file_metadata = execute(get_drive_client().files().get(
             fileId=folder_id,
-            fields='id, name'
-        ).execute()
+            fields='id, name',
+            supportsAllDrives=True
+        ))
         
         return file_metadata
     except Exception as e:
-        print(f"Gagal mendapatkan detail folder Google Drive untuk ID {folder_id}", exc_info=True)
+        print(f"Gagal mendapatkan detail folder Google Drive untuk ID {folder_id}. Error: {e}")
         # Melempar kembali error agar bisa ditangkap oleh fungsi pemanggil
         raise e
 
@@ -0,0 +1,70 @@
+# app/services/event_access_service.py
+
+import hmac
+import time
+import hashlib
+from typing import Optional, Tuple
+from cachetools import TTLCache
+from fastapi import HTTPException, status
+
+from app.core import security
+from app.core.config import settings
+
+# Unlock yang berhasil, dikunci dengan (event_id, hashed_password, HMAC password).
+# hashed_password ikut jadi kunci sehingga entri otomatis basi saat password event diganti;
+# password asli tidak pernah disimpan di memori.
+_unlock_cache: TTLCache = TTLCache(maxsize=10000, ttl=settings.EVENT_UNLOCK_CACHE_TTL_SECONDS)
+
+# Jumlah percobaan gagal per IP / per user: {kunci: (awal_window, jumlah)}
+_failed_attempts: TTLCache = TTLCache(maxsize=100000, ttl=settings.EVENT_UNLOCK_WINDOW_SECONDS)
+
+def _password_digest(event_id: int, password: str) -> str:
+    key = settings.JWT_EVENT_SECRET_KEY.encode()
+    return hmac.new(key, f"{event_id}:{password}".encode(), hashlib.sha256).hexdigest()
+
+def _attempt_keys(client_ip: Optional[str], user_id: int) -> Tuple[str, ...]:
+    keys = (f"user:{user_id}",)
+    return keys + (f"ip:{client_ip}",) if client_ip else keys
+
+def _failures(key: str, now: float) -> int:
+    window_start, count = _failed_attempts.get(key, (now, 0))
+    return count if now - window_start < settings.EVENT_UNLOCK_WINDOW_SECONDS else 0
+
+def check_unlock_allowed(*, client_ip: Optional[str], user_id: int) -> None:
+    """
+    Menolak (429) jika IP atau user sudah terlalu banyak salah password,
+    sebelum bcrypt sempat dijalankan.
+    """
+    now = time.monotonic()
+    if any(_failures(key, now) >= settings.EVENT_UNLOCK_MAX_FAILURES for key in _attempt_keys(client_ip, user_id)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many incorrect password attempts. Please try again later.",
+            headers={"Retry-After": str(settings.EVENT_UNLOCK_WINDOW_SECONDS)},
+        )
+
+def record_failed_unlock(*, client_ip: Optional[str], user_id: int) -> None:
+    now = time.monotonic()
+    for key in _attempt_keys(client_ip, user_id):
+        window_start, count = _failed_attempts.get(key, (now, 0))
+        if now - window_start >= settings.EVENT_UNLOCK_WINDOW_SECONDS:
+            window_start, count = now, 0
+        _failed_attempts[key] = (window_start, count + 1)
+
+async def verify_event_password(*, event_id: int, hashed_password: str, password: str) -> bool:
+    """
+    Memverifikasi password event. Unlock yang pernah berhasil dilayani dari cache;
+    selain itu bcrypt dijalankan di executor terbatas, tidak di event loop.
+    """
+    cache_key = (event_id, hashed_password, _password_digest(event_id, password))
+    if cache_key in _unlock_cache:
+        return True
+    if not await security.verify_password_async(password, hashed_password):
+        return False
+    _unlock_cache[cache_key] = True
+    return True
+
+def invalidate_event_unlocks(event_id: int) -> None:
+    """Membuang unlock yang tersimpan untuk sebuah event, dipanggil saat password event diganti."""
+    for cache_key in [key for key in list(_unlock_cache.keys()) if key[0] == event_id]:
+        _unlock_cache.pop(cache_key, None)
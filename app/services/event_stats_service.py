@@ -0,0 +1,116 @@
+# app/services/event_stats_service.py
+
+import asyncio
+from typing import List, Optional
+from sqlalchemy import func, or_, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.periodic import run_periodically
+from app.db.database import AsyncSessionLocal
+from app.db.models import Event, Image
+
+# ID advisory lock PostgreSQL agar rekonsiliasi counter hanya berjalan di satu worker
+EVENT_STATS_ADVISORY_LOCK_ID = 7_301_002
+
+async def _reconcile_event_batch(db: AsyncSession, *, after_id: int) -> Optional[int]:
+    """
+    Merekonsiliasi satu batch event (id > after_id) dalam satu transaksi, tanpa commit.
+    Mengembalikan id event terakhir di batch, atau None jika sudah tidak ada event lagi.
+    """
+    # Kunci hanya baris event di batch ini (statement terpisah), agar agregat di bawah dihitung
+    # SETELAH upload/hapus yang sedang berjalan di event tersebut commit, dan tidak menimpa +/-1 mereka.
+    # Diurutkan berdasarkan id agar urutan penguncian konsisten.
+    event_ids = (await db.execute(
+        select(Event.id)
+        .where(Event.id > after_id)
+        .order_by(Event.id)
+        .limit(settings.EVENT_COUNTER_RECONCILE_BATCH_SIZE)
+        .with_for_update()
+    )).scalars().all()
+    if not event_ids:
+        return None
+
+    stats = (
+        select(
+            Image.id_event.label("id_event"),
+            func.count().label("photo_count"),
+            func.coalesce(func.sum(Image.face_count), 0).label("face_count"),
+            func.count(Image.indexed_at).label("indexed_photo_count"),
+            func.coalesce(func.sum(Image.file_size), 0).label("storage_bytes"),
+        )
+        .where(Image.id_event.in_(event_ids))
+        .group_by(Image.id_event)
+        .subquery()
+    )
+    photo_count = func.coalesce(stats.c.photo_count, 0)
+    face_count = func.coalesce(stats.c.face_count, 0)
+    indexed_photo_count = func.coalesce(stats.c.indexed_photo_count, 0)
+    storage_bytes = func.coalesce(stats.c.storage_bytes, 0)
+
+    # LEFT JOIN agar event yang sudah tidak punya gambar ikut kembali ke 0
+    actual = (
+        select(
+            Event.id.label("id"),
+            photo_count.label("photo_count"),
+            face_count.label("face_count"),
+            indexed_photo_count.label("indexed_photo_count"),
+            storage_bytes.label("storage_bytes"),
+        )
+        .select_from(Event)
+        .outerjoin(stats, stats.c.id_event == Event.id)
+        .where(Event.id.in_(event_ids))
+        .subquery()
+    )
+    result = await db.execute(
+        update(Event)
+        .where(
+            Event.id == actual.c.id,
+            or_(
+                Event.photo_count != actual.c.photo_count,
+                Event.face_count != actual.c.face_count,
+                Event.indexed_photo_count != actual.c.indexed_photo_count,
+                Event.storage_bytes != actual.c.storage_bytes,
+            ),
+        )
+        .values(
+            photo_count=actual.c.photo_count,
+            face_count=actual.c.face_count,
+            indexed_photo_count=actual.c.indexed_photo_count,
+            storage_bytes=actual.c.storage_bytes,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        print(f"EVENT STATS: Reconciled counters of {result.rowcount} event(s).")
+    return event_ids[-1]
+
+async def reconcile_event_counters_once() -> None:
+    """
+    Menghitung ulang counter denormalisasi event (photo_count, face_count,
+    indexed_photo_count, storage_bytes) dari tabel images, dan hanya menulis
+    event yang nilainya melenceng (misal karena record dihapus oleh GC).
+    Diproses per batch EVENT_COUNTER_RECONCILE_BATCH_SIZE event, masing-masing
+    dalam transaksi sendiri, sehingga upload/hapus hanya tertahan sebentar
+    dan hanya di event yang sedang dihitung.
+    """
+    last_id = 0
+    while last_id is not None:
+        async with AsyncSessionLocal() as db:
+            # Dicek per batch karena advisory lock transaksi dilepas setiap commit
+            got_lock = (await db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": EVENT_STATS_ADVISORY_LOCK_ID}
+            )).scalar()
+            if not got_lock:
+                return
+            last_id = await _reconcile_event_batch(db, after_id=last_id)
+            await db.commit()
+
+def start_event_stats_tasks() -> List[asyncio.Task]:
+    """Menjalankan rekonsiliasi counter event sebagai task latar belakang. Dipanggil saat startup."""
+    return [
+        asyncio.create_task(run_periodically(
+            "event-counter-reconcile", settings.EVENT_COUNTER_RECONCILE_INTERVAL_SECONDS, reconcile_event_counters_once
+        )),
+    ]
@@ -0,0 +1,79 @@
+# app/services/exif_service.py
+
+import io
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from PIL import Image, ExifTags, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Tag EXIF yang kita butuhkan
+_TAG_ORIENTATION = 0x0112
+_TAG_MAKE = 0x010F
+_TAG_MODEL = 0x0110
+_TAG_DATETIME = 0x0132
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_DATETIME_DIGITIZED = 0x9004
+_TAG_OFFSET_TIME_ORIGINAL = 0x9011
+
+def _parse_exif_datetime(value: Any, offset: Any = None) -> Optional[datetime]:
+    """
+    Mengubah string EXIF 'YYYY:MM:DD HH:MM:SS' menjadi datetime ber-timezone.
+    Jika kamera tidak menyimpan offset zona waktu, waktu dianggap UTC agar
+    urutan pemotretan tetap konsisten di dalam satu event.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.strptime(value.strip().rstrip("\x00")[:19], "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+    tz = timezone.utc
+    if isinstance(offset, str) and len(offset.strip()) >= 6:
+        try:
+            sign = -1 if offset.strip()[0] == "-" else 1
+            hours, minutes = offset.strip()[1:6].split(":")
+            tz = timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+        except ValueError:
+            pass
+    return parsed.replace(tzinfo=tz)
+
+def _clean_text(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    cleaned = value.strip().rstrip("\x00").strip()
+    return cleaned[:255] or None
+
+def extract_image_metadata(image_bytes: bytes) -> Dict[str, Any]:
+    """
+    Membaca metadata EXIF dari sebuah gambar: waktu pengambilan, orientasi,
+    ukuran (width/height) dan kamera. Fungsi ini blocking, jalankan di thread pool.
+    Hanya header gambar yang dibaca, piksel tidak di-decode.
+    Mengembalikan dict kosong jika gambar tidak bisa dibaca.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            width, height = img.size
+            exif = img.getexif()
+            exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Could not read image metadata: {e}")
+        return {}
+
+    taken_at = (
+        _parse_exif_datetime(exif_ifd.get(_TAG_DATETIME_ORIGINAL), exif_ifd.get(_TAG_OFFSET_TIME_ORIGINAL))
+        or _parse_exif_datetime(exif_ifd.get(_TAG_DATETIME_DIGITIZED))
+        or _parse_exif_datetime(exif.get(_TAG_DATETIME))
+    )
+    orientation = exif.get(_TAG_ORIENTATION)
+
+    return {
+        "taken_at": taken_at,
+        "orientation": orientation if isinstance(orientation, int) and 1 <= orientation <= 8 else None,
+        "width": width,
+        "height": height,
+        "camera_make": _clean_text(exif.get(_TAG_MAKE)),
+        "camera_model": _clean_text(exif.get(_TAG_MODEL)),
+    }
@@ -2,56 +2,86 @@
 
 import logging
 import cv2
-import os
 import numpy as np
 from typing import List, Dict, Any, Optional
 from fastapi.concurrency import run_in_threadpool
 
 from app.core.model_loader import face_app # Model yang sudah di-load saat startup
-from app.core.config import settings
+from app.services.storage_service import get_storage, key_from_public_url
 
 logger = logging.getLogger(__name__)
 
-def convert_public_url_to_local_path(url: str) -> Optional[str]:
-    """Mengubah URL publik kembali menjadi path disk lokal yang absolut."""
-    if not url or not url.startswith(settings.API_BASE_URL):
-        return None
-    relative_path_from_media = url.replace(f"{settings.API_BASE_URL}/media/", "", 1)
-    return str(settings.STORAGE_ROOT_PATH / relative_path_from_media)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def decode_image(image_bytes: bytes) -> Optional[np.ndarray]:
+    """Mengubah byte gambar menjadi gambar OpenCV. None jika tidak bisa di-decode."""
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+async def get_selfie_embedding(selfie_url: str) -> np.ndarray:
+    """
+    Mengambil embedding wajah (normed_embedding) dari foto selfie pengguna.
+    Melempar ValueError jika selfie tidak bisa dibaca atau tidak ada wajah.
+    """
+    selfie_key = key_from_public_url(selfie_url)
+    if not selfie_key:
+        raise ValueError("Selfie URL is not valid")
+    try:
+        selfie_bytes = await get_storage().read_bytes(selfie_key)
+    except FileNotFoundError:
+        raise ValueError("Selfie file not found")
+
+    img_selfie = await run_in_threadpool(decode_image, selfie_bytes)
+    if img_selfie is None:
+        raise ValueError("Selfie file not readable")
+
+    # Jalankan di thread terpisah
+    faces = await run_in_threadpool(face_app.app.get, img_selfie)
+    if not faces:
+        raise ValueError("No face found in selfie")
+
+    # Gunakan normed_embedding untuk perbandingan cosine similarity
+    return faces[0].normed_embedding
 
 async def find_similar_faces_in_folder_blocking(
-    target_embedding: np.ndarray, 
-    event_storage_path: str,
-    threshold: float = 0.5 # Ambang batas Cosine Similarity
+    target_embedding: np.ndarray,
+    storage_prefix: str,
+    threshold: float = 0.5, # Ambang batas Cosine Similarity
+    face_counts: Optional[Dict[str, int]] = None
 ) -> List[Dict[str, Any]]:
     """
     Fungsi yang melakukan pekerjaan berat:
-    Memindai folder, mengekstrak wajah, dan membandingkan embedding.
+    Memindai folder di storage, mengekstrak wajah, dan membandingkan embedding.
+    Jika `face_counts` diberikan, jumlah wajah per key ikut dicatat di dict tersebut.
     """
-    
+    storage = get_storage()
+
     def _blocking_search():
         matched_results = []
-        image_files = [f for f in os.listdir(event_storage_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+        image_keys = [
+            obj.key for obj in storage.iter_objects(storage_prefix)
+            if obj.key.lower().endswith(IMAGE_EXTENSIONS)
+        ]
 
-        for filename in image_files:
-            file_path = os.path.join(event_storage_path, filename)
-            
+        for key in image_keys:
             try:
-                img = cv2.imread(file_path)
+                with storage.open_read(key) as source:
+                    img = decode_image(source.read())
                 if img is None:
                     continue
 
                 # Deteksi semua wajah di gambar saat ini
                 faces_in_image = face_app.app.get(img)
+                if face_counts is not None:
+                    face_counts[key] = len(faces_in_image)
 
                 for face in faces_in_image:
                     # Hitung cosine similarity (dot product dari embedding ternormalisasi)
                     similarity = np.dot(target_embedding, face.normed_embedding)
-                    
+
                     if similarity > threshold:
                         bbox = face.bbox
                         matched_results.append({
-                            "disk_path": file_path.replace("\\", "/"),
+                            "key": key,
                             "face_coords": {
                                 "x": int(bbox[0]),
                                 "y": int(bbox[1]),
@@ -61,9 +91,9 @@ async def find_similar_faces_in_folder_blocking(
                             "similarity": similarity # Kirim juga skor kemiripan
                         })
                         # Kita hanya ambil satu wajah yang paling cocok per gambar
-                        break 
+                        break
             except Exception as e:
-                logger.warning(f"Could not process image {filename}: {e}")
+                logger.warning(f"Could not process image {key}: {e}")
                 continue
 
         # Urutkan hasil berdasarkan kemiripan tertinggi
@@ -71,4 +101,4 @@ async def find_similar_faces_in_folder_blocking(
         return matched_results
 
     # Jalankan fungsi blocking di thread terpisah
-    return await run_in_threadpool(_blocking_search)
\ No newline at end of file
+    return await run_in_threadpool(_blocking_search)
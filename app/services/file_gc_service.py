@@ -0,0 +1,161 @@
+# app/services/file_gc_service.py
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set
+from sqlalchemy import delete, text
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.periodic import run_periodically
+from app.crud import crud_file_deletion
+from app.db.database import AsyncSessionLocal
+from app.db.models import Event, Image, User, DriveSearch, FoundDriveImage
+from app.services.storage_service import StoredObject, get_storage, key_from_public_url
+
+# ID advisory lock PostgreSQL agar rekonsiliasi hanya berjalan di satu worker
+RECONCILE_ADVISORY_LOCK_ID = 7_301_001
+
+async def sweep_file_deletions_once() -> int:
+    """
+    Memproses satu batch antrean penghapusan file.
+    Mengembalikan jumlah record antrean yang berhasil diproses.
+    """
+    storage = get_storage()
+    async with AsyncSessionLocal() as db:
+        deletions = await crud_file_deletion.claim_due_deletions(db, limit=settings.GC_SWEEP_BATCH_SIZE)
+        if not deletions:
+            await db.rollback()
+            return 0
+
+        done_ids = []
+
+        # File tunggal dihapus sekaligus dalam satu bulk delete
+        single_deletions = [d for d in deletions if not d.is_prefix]
+        if single_deletions:
+            try:
+                await storage.delete_many([d.storage_key for d in single_deletions])
+                done_ids.extend(d.id for d in single_deletions)
+            except Exception as e:
+                for deletion in single_deletions:
+                    await crud_file_deletion.mark_deletion_failed(
+                        db, deletion=deletion, error=str(e),
+                        max_attempts=settings.GC_MAX_ATTEMPTS, base_delay_seconds=settings.GC_RETRY_BASE_DELAY_SECONDS
+                    )
+
+        # Folder/prefix dihapus satu per satu
+        for deletion in (d for d in deletions if d.is_prefix):
+            try:
+                await storage.delete_prefix(deletion.storage_key)
+                done_ids.append(deletion.id)
+            except Exception as e:
+                print(f"FILE GC: Failed to delete prefix {deletion.storage_key} (attempt {deletion.attempts + 1}). Error: {e}")
+                await crud_file_deletion.mark_deletion_failed(
+                    db, deletion=deletion, error=str(e),
+                    max_attempts=settings.GC_MAX_ATTEMPTS, base_delay_seconds=settings.GC_RETRY_BASE_DELAY_SECONDS
+                )
+
+        await crud_file_deletion.remove_deletions(db, deletion_ids=done_ids)
+        await db.commit()
+        return len(done_ids)
+
+async def run_file_deletion_sweeper() -> None:
+    """Satu putaran sweeper: terus memproses batch selama antrean masih penuh."""
+    while await sweep_file_deletions_once() >= settings.GC_SWEEP_BATCH_SIZE:
+        await asyncio.sleep(0)
+
+def _group_by_folder_id(objects: List[StoredObject]) -> Dict[int, List[StoredObject]]:
+    """Mengelompokkan objek 'folder/{id}/file' berdasarkan {id}."""
+    grouped = defaultdict(list)
+    for obj in objects:
+        parts = obj.key.split("/")
+        if len(parts) >= 3 and parts[1].isdigit():
+            grouped[int(parts[1])].append(obj)
+    return grouped
+
+def _orphan_keys(objects: List[StoredObject], referenced_keys: Set[str], cutoff: datetime) -> List[str]:
+    return [obj.key for obj in objects if obj.key not in referenced_keys and obj.modified_at < cutoff]
+
+async def reconcile_storage_once() -> None:
+    """
+    Rekonsiliasi berkala antara storage dan database:
+    - File tanpa record (yatim) dimasukkan ke antrean penghapusan.
+    - Record gambar tanpa file dicatat di log (atau dihapus jika GC_DELETE_ORPHAN_ROWS=True).
+    File/record yang lebih muda dari GC_ORPHAN_GRACE_SECONDS diabaikan,
+    karena bisa jadi upload-nya sedang berlangsung.
+    """
+    storage = get_storage()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.GC_ORPHAN_GRACE_SECONDS)
+
+    async with AsyncSessionLocal() as db:
+        got_lock = (await db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": RECONCILE_ADVISORY_LOCK_ID}
+        )).scalar()
+        if not got_lock:
+            return
+
+        orphan_keys: List[str] = []
+        orphan_prefixes: List[str] = []
+
+        # 1. Foto event: events/{event_id}/{file}
+        event_objects = await storage.list_objects("events/")
+        objects_by_event = _group_by_folder_id(event_objects)
+        existing_event_ids = set((await db.execute(
+            select(Event.id).where(Event.id.in_(list(objects_by_event.keys())))
+        )).scalars().all()) if objects_by_event else set()
+
+        for event_id, objects in objects_by_event.items():
+            if event_id not in existing_event_ids:
+                if all(obj.modified_at < cutoff for obj in objects):
+                    orphan_prefixes.append(f"events/{event_id}/")
+                continue
+            urls = (await db.execute(select(Image.url).where(Image.id_event == event_id))).scalars().all()
+            orphan_keys.extend(_orphan_keys(objects, {key_from_public_url(url) for url in urls}, cutoff))
+
+        # 2. Record gambar yang file-nya tidak ada di storage
+        stored_event_keys = {obj.key for obj in event_objects}
+        orphan_rows = [
+            (image_id, url)
+            for image_id, url in (await db.execute(
+                select(Image.id, Image.url).where(Image.created_at < cutoff)
+            )).all()
+            if key_from_public_url(url) not in stored_event_keys
+        ]
+        if orphan_rows:
+            print(f"FILE GC: Found {len(orphan_rows)} image record(s) without a file, e.g. {orphan_rows[:5]}")
+            if settings.GC_DELETE_ORPHAN_ROWS:
+                await db.execute(delete(Image).where(Image.id.in_([image_id for image_id, _ in orphan_rows])))
+
+        # 3. Selfie: selfies/{file}
+        selfie_objects = await storage.list_objects("selfies/")
+        selfie_urls = (await db.execute(select(User.selfie).where(User.selfie.is_not(None)))).scalars().all()
+        orphan_keys.extend(_orphan_keys(selfie_objects, {key_from_public_url(url) for url in selfie_urls}, cutoff))
+
+        # 4. Hasil pencarian Drive: drive-events/{search_id}/{file}
+        objects_by_search = _group_by_folder_id(await storage.list_objects("drive-events/"))
+        existing_search_ids = set((await db.execute(
+            select(DriveSearch.id).where(DriveSearch.id.in_(list(objects_by_search.keys())))
+        )).scalars().all()) if objects_by_search else set()
+
+        for search_id, objects in objects_by_search.items():
+            if search_id not in existing_search_ids:
+                if all(obj.modified_at < cutoff for obj in objects):
+                    orphan_prefixes.append(f"drive-events/{search_id}/")
+                continue
+            urls = (await db.execute(
+                select(FoundDriveImage.url).where(FoundDriveImage.id_drive_search == search_id)
+            )).scalars().all()
+            orphan_keys.extend(_orphan_keys(objects, {key_from_public_url(url) for url in urls}, cutoff))
+
+        if orphan_keys or orphan_prefixes:
+            print(f"FILE GC: Queueing {len(orphan_keys)} orphan file(s) and {len(orphan_prefixes)} orphan folder(s) for deletion.")
+            crud_file_deletion.enqueue_file_deletions(db, keys=orphan_keys, prefixes=orphan_prefixes)
+        await db.commit()
+
+def start_file_gc_tasks() -> List[asyncio.Task]:
+    """Menjalankan sweeper dan rekonsiliasi sebagai task latar belakang. Dipanggil saat startup."""
+    return [
+        asyncio.create_task(run_periodically("file-deletion-sweeper", settings.GC_SWEEP_INTERVAL_SECONDS, run_file_deletion_sweeper)),
+        asyncio.create_task(run_periodically("storage-reconcile", settings.GC_RECONCILE_INTERVAL_SECONDS, reconcile_storage_once)),
+    ]
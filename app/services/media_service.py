@@ -0,0 +1,73 @@
+# app/services/media_service.py
+
+import os
+import mimetypes
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from app.core.config import settings
+from app.services.storage_service import get_storage
+
+def _build_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Mencocokkan header If-None-Match (bisa berisi beberapa ETag, weak/strong)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+def build_media_response(request: Request, relative_path: str) -> Response:
+    """
+    Menyajikan sebuah file media SETELAH pemeriksaan akses dilakukan oleh router.
+
+    - Jika If-None-Match cocok, kembalikan 304 tanpa body.
+    - Jika MEDIA_OFFLOAD_MODE diatur, transfer diserahkan ke proxy
+      (X-Accel-Redirect untuk Nginx, X-Sendfile untuk Apache/Lighttpd).
+    - Jika tidak, gunakan FileResponse yang mendukung Range request dan
+      zero-copy sendfile bila server ASGI mendukungnya.
+    - Untuk backend object storage (S3), klien diarahkan ke presigned URL.
+    """
+    storage = get_storage()
+    try:
+        file_path = storage.local_path(relative_path)
+    except ValueError: # Path traversal keluar dari storage root
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+
+    if file_path is None:
+        presigned_url = storage.presigned_url(relative_path)
+        if not presigned_url:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+        return RedirectResponse(url=presigned_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+    if not file_path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+
+    etag = _build_etag(stat_result)
+    # 'private' karena file dilindungi token, tidak boleh disimpan oleh cache bersama
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.MEDIA_CACHE_MAX_AGE_SECONDS}, immutable",
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+    offload_mode = (settings.MEDIA_OFFLOAD_MODE or "").lower()
+
+    if offload_mode == "x-accel":
+        internal_uri = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative_path.lstrip('/')}"
+        return Response(media_type=media_type, headers={**cache_headers, "X-Accel-Redirect": internal_uri})
+    if offload_mode == "x-sendfile":
+        return Response(media_type=media_type, headers={**cache_headers, "X-Sendfile": str(file_path)})
+
+    return FileResponse(file_path, media_type=media_type, stat_result=stat_result, headers=cache_headers)
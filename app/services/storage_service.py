@@ -0,0 +1,348 @@
+# app/services/storage_service.py
+
+import os
+import shutil
+import asyncio
+import aiofiles
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, Optional
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# Jumlah key yang dihapus per batch (S3 DeleteObjects maksimal 1000 key per request)
+DELETE_BATCH_SIZE = 1000
+
+@dataclass
+class StoredObject:
+    """Informasi singkat sebuah file/objek di storage."""
+    key: str
+    size: int
+    modified_at: datetime
+
+def _chunked(items: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+async def _iter_bytes(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+class StorageBackend(ABC):
+    """
+    Antarmuka storage yang dipakai oleh semua router dan service.
+    Semua file diidentifikasi dengan 'key' relatif, misal 'events/12/abc.jpg',
+    yang sama dengan path setelah '/media/' pada URL publik.
+    Method abstrak wajib diimplementasikan; backend yang belum lengkap gagal saat dibuat.
+    """
+
+    @abstractmethod
+    async def save_stream(self, key: str, stream: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        """Menyimpan data dari async iterator per potongan. Mengembalikan jumlah byte yang ditulis."""
+        raise NotImplementedError
+
+    async def save_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> int:
+        return await self.save_stream(key, _iter_bytes(data), content_type=content_type)
+
+    @abstractmethod
+    async def read_bytes(self, key: str) -> bytes:
+        """Membaca seluruh isi file. Melempar FileNotFoundError jika tidak ada."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def open_read(self, key: str) -> BinaryIO:
+        """Membuka file untuk dibaca per potongan (blocking). Melempar FileNotFoundError jika tidak ada."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    async def delete(self, key: str) -> None:
+        await self.delete_many([key])
+
+    @abstractmethod
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Menghapus banyak file sekaligus secara paralel. Mengembalikan jumlah key yang diproses."""
+        raise NotImplementedError
+
+    async def delete_prefix(self, prefix: str) -> int:
+        """Menghapus semua file di bawah sebuah prefix (misal 'events/12/')."""
+        objects = await self.list_objects(prefix)
+        return await self.delete_many([obj.key for obj in objects])
+
+    @abstractmethod
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        """Daftar file di bawah sebuah prefix (blocking)."""
+        raise NotImplementedError
+
+    async def list_objects(self, prefix: str) -> List[StoredObject]:
+        return await run_in_threadpool(lambda: list(self.iter_objects(prefix)))
+
+    def presigned_url(self, key: str, expires_in: Optional[int] = None) -> Optional[str]:
+        """URL GET bertanda tangan untuk akses langsung. None jika backend tidak mendukungnya."""
+        return None
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path absolut di disk lokal. None jika backend bukan filesystem lokal."""
+        return None
+
+class LocalStorageBackend(StorageBackend):
+    """Backend yang menyimpan file di filesystem lokal (STORAGE_ROOT_PATH)."""
+
+    def __init__(self, root_path: Path):
+        self.root = Path(root_path).resolve()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        full_path = (self.root / key.lstrip("/")).resolve()
+        if full_path != self.root and self.root not in full_path.parents:
+            raise ValueError(f"Storage key escapes storage root: {key}")
+        return full_path
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    async def save_stream(self, key: str, stream: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        path = self._path(key)
+        await run_in_threadpool(os.makedirs, path.parent, exist_ok=True)
+        # Tulis ke file sementara lalu rename, agar pembaca tidak pernah melihat file setengah jadi
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out_file:
+                async for chunk in stream:
+                    await out_file.write(chunk)
+                    size += len(chunk)
+            await run_in_threadpool(os.replace, tmp_path, path)
+        except BaseException:
+            await run_in_threadpool(self._remove_quietly, tmp_path)
+            raise
+        return size
+
+    async def read_bytes(self, key: str) -> bytes:
+        async with aiofiles.open(self._path(key), "rb") as in_file:
+            return await in_file.read()
+
+    def open_read(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            stat_result = await run_in_threadpool(os.stat, self._path(key))
+        except (FileNotFoundError, ValueError):
+            return None
+        return StoredObject(
+            key=key,
+            size=stat_result.st_size,
+            modified_at=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+        )
+
+    @staticmethod
+    def _remove_quietly(path: Path) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _delete_batch(self, keys: List[str]) -> None:
+        for key in keys:
+            self._remove_quietly(self._path(key))
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        # Bagi ke beberapa batch agar tidak menjadwalkan ribuan tugas thread pool sekaligus
+        await asyncio.gather(*(run_in_threadpool(self._delete_batch, batch) for batch in _chunked(keys, 200)))
+        return len(keys)
+
+    def _delete_tree(self, prefix: str) -> int:
+        path = self._path(prefix)
+        if not path.is_dir():
+            return 0
+        count = sum(1 for _ in self.iter_objects(prefix))
+        shutil.rmtree(path, ignore_errors=True)
+        return count
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return await run_in_threadpool(self._delete_tree, prefix)
+
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        base = self._path(prefix)
+        if not base.is_dir():
+            return
+        for dir_path, _, file_names in os.walk(base):
+            for file_name in file_names:
+                if file_name.endswith(".part"):
+                    continue
+                full_path = Path(dir_path) / file_name
+                stat_result = full_path.stat()
+                yield StoredObject(
+                    key=full_path.relative_to(self.root).as_posix(),
+                    size=stat_result.st_size,
+                    modified_at=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+                )
+
+class S3StorageBackend(StorageBackend):
+    """
+    Backend untuk object storage yang kompatibel dengan S3 (AWS S3, MinIO, R2, dll).
+    boto3 client bersifat thread-safe, jadi satu client dipakai bersama dan
+    setiap panggilan blocking dijalankan di thread pool.
+    """
+
+    def __init__(self):
+        # Import di sini agar boto3 hanya dibutuhkan jika backend S3 dipakai
+        import boto3
+        from botocore.config import Config as BotoConfig
+
+        if not settings.S3_BUCKET:
+            raise RuntimeError("S3_BUCKET must be set when STORAGE_BACKEND is 's3'.")
+
+        self.bucket = settings.S3_BUCKET
+        self.part_size = max(settings.S3_MULTIPART_CHUNK_SIZE, 5 * 1024 * 1024) # Minimal part S3 adalah 5 MB
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            config=BotoConfig(
+                signature_version="s3v4",
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                # MinIO dan sebagian besar server lokal membutuhkan path-style addressing
+                s3={"addressing_style": "path" if settings.S3_ENDPOINT_URL else "auto"},
+            ),
+        )
+
+    def _is_not_found(self, error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    async def save_stream(self, key: str, stream: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        extra_args = {"ContentType": content_type} if content_type else {}
+        buffer = bytearray()
+        size = 0
+        upload_id = None
+        parts = []
+
+        try:
+            async for chunk in stream:
+                buffer.extend(chunk)
+                size += len(chunk)
+                if len(buffer) >= self.part_size:
+                    # Data sudah melebihi satu part, beralih ke multipart upload
+                    if upload_id is None:
+                        response = await run_in_threadpool(
+                            self.client.create_multipart_upload, Bucket=self.bucket, Key=key, **extra_args
+                        )
+                        upload_id = response["UploadId"]
+                    part_number = len(parts) + 1
+                    part = await run_in_threadpool(
+                        self.client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                        PartNumber=part_number, Body=bytes(buffer)
+                    )
+                    parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+                    buffer.clear()
+
+            if upload_id is None:
+                # File kecil: cukup satu PutObject
+                await run_in_threadpool(self.client.put_object, Bucket=self.bucket, Key=key, Body=bytes(buffer), **extra_args)
+                return size
+
+            if buffer:
+                part_number = len(parts) + 1
+                part = await run_in_threadpool(
+                    self.client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=part_number, Body=bytes(buffer)
+                )
+                parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+            await run_in_threadpool(
+                self.client.complete_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            return size
+        except BaseException:
+            if upload_id is not None:
+                await run_in_threadpool(self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def open_read(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        except Exception as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    async def read_bytes(self, key: str) -> bytes:
+        def _read():
+            body = self.open_read(key)
+            try:
+                return body.read()
+            finally:
+                body.close()
+        return await run_in_threadpool(_read)
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            response = await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return StoredObject(key=key, size=response["ContentLength"], modified_at=response["LastModified"])
+
+    def _delete_batch(self, keys: List[str]) -> None:
+        response = self.client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+        errors = response.get("Errors", [])
+        if errors:
+            raise RuntimeError(f"Failed to delete {len(errors)} object(s), first error: {errors[0]}")
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        # Setiap batch 1000 key dikirim paralel
+        await asyncio.gather(*(run_in_threadpool(self._delete_batch, batch) for batch in _chunked(keys, DELETE_BATCH_SIZE)))
+        return len(keys)
+
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield StoredObject(key=item["Key"], size=item["Size"], modified_at=item["LastModified"])
+
+    def presigned_url(self, key: str, expires_in: Optional[int] = None) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in or settings.S3_PRESIGNED_URL_EXPIRE_SECONDS
+        )
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    """Mengembalikan satu instance backend storage sesuai STORAGE_BACKEND di .env."""
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "s3":
+        return S3StorageBackend()
+    if backend == "local":
+        return LocalStorageBackend(settings.STORAGE_ROOT_PATH)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+def public_url_for_key(key: str) -> str:
+    """Membangun URL publik dari sebuah storage key."""
+    return f"{settings.API_BASE_URL}/media/{key}"
+
+def key_from_public_url(url: Optional[str]) -> Optional[str]:
+    """Mengubah URL publik kembali menjadi storage key. None jika URL bukan milik API ini."""
+    prefix = f"{settings.API_BASE_URL}/media/"
+    if not url or not url.startswith(prefix):
+        return None
+    return url[len(prefix):]
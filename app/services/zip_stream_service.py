@@ -0,0 +1,91 @@
+# app/services/zip_stream_service.py
+
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple
+
+from app.services.storage_service import get_storage
+
+# Ukuran potongan baca file. Memori yang dipakai per unduhan kira-kira sebesar ini.
+ZIP_CHUNK_SIZE = 1024 * 1024 # 1 MB
+
+class _ZipChunkBuffer:
+    """
+    Objek mirip file yang hanya bisa ditulis (tidak bisa di-seek).
+    zipfile menulis ke sini, lalu generator mengambil potongan byte yang
+    sudah terkumpul dan meneruskannya ke klien.
+    """
+    def __init__(self):
+        self._chunks = deque()
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # zipfile butuh tell() untuk mencatat offset setiap entri
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        while self._chunks:
+            yield self._chunks.popleft()
+
+def safe_archive_name(name: str) -> str:
+    """Membersihkan nama folder/file agar aman dipakai di dalam arsip ZIP."""
+    cleaned = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', "_", name or "").strip(" .")
+    return cleaned or "untitled"
+
+def stream_zip(entries: Iterable[Tuple[Optional[str], str]], chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Membangun arsip ZIP secara on-the-fly dari daftar (storage_key, nama_di_arsip).
+
+    File disimpan tanpa kompresi (ZIP_STORED) karena JPEG memang tidak bisa
+    dikompres lagi. Arsip tidak pernah dibentuk utuh di memori: setiap potongan
+    langsung di-yield, sehingga unduhan berukuran GB hanya memakai beberapa MB RAM.
+
+    Generator ini sinkron (membaca file secara blocking), jadi StreamingResponse
+    akan menjalankannya di thread pool.
+    """
+    storage = get_storage()
+    buffer = _ZipChunkBuffer()
+    used_names = set()
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for storage_key, arcname in entries:
+            if not storage_key:
+                continue
+            try:
+                source = storage.open_read(storage_key)
+            except FileNotFoundError:
+                print(f"ZIP STREAM: Skipping missing file {storage_key}")
+                continue
+
+            # Hindari nama duplikat di dalam arsip (tanpa membedakan huruf besar/kecil,
+            # agar tidak saling menimpa saat diekstrak di Windows/macOS)
+            base, ext = os.path.splitext(arcname)
+            unique_name, counter = arcname, 1
+            while unique_name.lower() in used_names:
+                unique_name = f"{base} ({counter}){ext}"
+                counter += 1
+            used_names.add(unique_name.lower())
+
+            zinfo = zipfile.ZipInfo(unique_name, date_time=time.localtime()[:6])
+            zinfo.compress_type = zipfile.ZIP_STORED
+            zinfo.external_attr = 0o644 << 16 # Izin file rw-r--r-- saat diekstrak
+            with source, archive.open(zinfo, mode="w", force_zip64=True) as dest:
+                while chunk := source.read(chunk_size):
+                    dest.write(chunk)
+                    yield from buffer.drain()
+            yield from buffer.drain()
+
+    # Central directory ditulis saat arsip ditutup
+    yield from buffer.drain()